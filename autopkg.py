@@ -4,6 +4,8 @@ import argparse
 from src.log import logger
 from src.config.config import configuration
 from src.yaml_maker import YamlMaker
+from src.batch import run_batch
+from src.utils.file_util import set_output_dir
 
 sys.path.append(os.path.dirname(__file__))
 
@@ -27,12 +29,6 @@ def check_arg_mode(**kwargs):
         sys.exit(1)
 
 
-def set_output_dir(path):
-    if os.path.exists(path):
-        os.system("rm -rf " + path)
-    os.makedirs(path, exist_ok=True)
-
-
 def set_yaml_path():
     """设置yaml路径，取自epkg build工具"""
     if os.path.exists(configuration.yaml_path):
@@ -52,6 +48,8 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-g", "--git-url", dest="git_url", default="",
                         help="git URL of downloading package")
+    parser.add_argument("--git-ref", dest="git_ref", default="",
+                        help="branch, tag or commit to check out with -g, default branch of the remote if empty")
     parser.add_argument("-t", "--tar-url", dest="tarball_url", default="",
                         help="http URL of downloading package")
     parser.add_argument("-d", "--dir", dest="directory", default="",
@@ -68,6 +66,14 @@ def main():
                         help="Target location to create or reuse")
     parser.add_argument("-c", "--config", dest="config", action="store", default="",
                         help="Set configuration file to use")
+    parser.add_argument("-m", "--manifest", dest="manifest", default="",
+                        help="yaml/csv manifest of packages (name/url/version/language) to run in batch")
+    parser.add_argument("--offline", dest="offline", action="store_true",
+                        help="only use the local snapshot of failure patterns, never query the database")
+    parser.add_argument("--no-early-abort", dest="early_abort", action="store_false",
+                        help="analyse build.log after the build finishes instead of stopping at the first fixable error")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=0,
+                        help="max number of packages running concurrently in batch mode, default cpu count")
     args = parser.parse_args()
     name = args.name
     language = args.language
@@ -78,15 +84,21 @@ def main():
     need_build = build_param == "true"
     directory = args.directory
     output = args.output
+    configuration.offline = args.offline
+    configuration.stream_build_log = args.early_abort
     os.makedirs(output, exist_ok=True)
+    if args.manifest:
+        set_yaml_path()
+        summary = run_batch(args.manifest, output, jobs=args.jobs, need_build=need_build)
+        sys.exit(0 if summary["failed"] == 0 else 1)
     check_arg_mode(name=name, git_url=git_url, tarball_url=tarball_url, directory=directory, version=version,
                    language=language)
     # config_file = args.config
     configuration.download_path = output
     set_output_dir(output)
     set_yaml_path()
-    yaml_maker = YamlMaker(name=name, git_url=git_url, tarball_url=tarball_url, directory=directory,
-                           need_build=need_build, language=language, version=version)
+    yaml_maker = YamlMaker(name=name, git_url=git_url, git_ref=args.git_ref, tarball_url=tarball_url,
+                           directory=directory, need_build=need_build, language=language, version=version)
     yaml_maker.create_yaml()
 
 
@@ -0,0 +1,117 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+"""
+构建日志规则匹配的性能对比
+    python3 benchmark/bench_pattern_engine.py [--lines 200000]
+before: 逐行对每条规则调用re.compile再匹配(原LogParser的做法)
+after:  PatternEngine预编译加字面量预过滤，逐行匹配以及整段日志单次扫描
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.pattern_engine import PatternEngine  # noqa: E402
+
+
+def make_tables(size):
+    words = [f"lib{i:03d}x" for i in range(size)]
+    simple_pats = {f"No package '{word}' found": word for word in words}
+    simple_pats.update({f"checking for {word}\\.\\.\\. no": word for word in words[:size // 2]})
+    make_pats = [r"([\w.+-]+): command not found", r"error: ([\w.+-]+)\.h: No such file or directory"]
+    make_pats += [f"/usr/bin/ld: cannot find -l({word})" for word in words[:size // 2]]
+    return simple_pats, make_pats
+
+
+def make_log(lines, size):
+    rnd = random.Random(42)
+    normal = [
+        "gcc -DHAVE_CONFIG_H -I. -I.. -O2 -g -pipe -Wall -c src/module{0}.c -o src/module{0}.o\n",
+        "checking for stdlib.h... yes\n",
+        "  CC       libfoo_la-file{0}.lo\n",
+        "[ {0}%] Building CXX object CMakeFiles/foo.dir/src/file{0}.cpp.o\n",
+        "make[2]: Entering directory '/root/workspace/src/dir{0}'\n",
+    ]
+    errors = [
+        "No package 'lib{0:03d}x' found\n",
+        "./configure: line 4242: bison: command not found\n",
+        "/usr/bin/ld: cannot find -llib{0:03d}x\n",
+    ]
+    result = []
+    for i in range(lines):
+        if rnd.random() < 0.001:
+            result.append(rnd.choice(errors).format(rnd.randrange(size)))
+        else:
+            result.append(rnd.choice(normal).format(i % 100))
+    return result
+
+
+def before(log_lines, simple_pats, make_pats):
+    hits = 0
+    for line in log_lines:
+        for pattern in simple_pats:
+            if re.compile(pattern).search(line):
+                hits += 1
+        for pattern in make_pats:
+            if re.compile(pattern).search(line):
+                hits += 1
+    return hits
+
+
+def after_lines(log_lines, engine):
+    hits = 0
+    tables = ["simple", "make"]
+    for line in log_lines:
+        if not engine.may_match(line, tables):
+            continue
+        hits += len(engine.search_all(line, tables))
+    return hits
+
+
+def after_scan(text, engine):
+    return sum(len(matches) for _, matches in engine.scan(text, ["simple", "make"]))
+
+
+def measure(name, lines, func, *args):
+    start = time.perf_counter()
+    hits = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28}{lines / elapsed:>14,.0f} lines/s  {elapsed:8.3f}s  hits={hits}")
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--patterns", type=int, default=200)
+    args = parser.parse_args()
+    simple_pats, make_pats = make_tables(args.patterns)
+    log_lines = make_log(args.lines, args.patterns)
+    text = "".join(log_lines)
+    print(f"log: {args.lines} lines, {len(text) / 1024 / 1024:.1f} MB, "
+          f"{len(simple_pats) + len(make_pats)} patterns")
+    start = time.perf_counter()
+    engine = PatternEngine()
+    engine.add_table("simple", simple_pats)
+    engine.add_table("make", make_pats)
+    engine.prefilter(["simple", "make"])
+    print(f"engine build: {time.perf_counter() - start:.3f}s")
+    expected = measure("before (re.compile/line)", args.lines, before, log_lines, simple_pats, make_pats)
+    assert measure("after (per line)", args.lines, after_lines, log_lines, engine) == expected
+    assert measure("after (single pass scan)", args.lines, after_scan, text, engine) == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import re
+import csv
+import time
+import multiprocessing
+import yaml
+from src.log import logger
+from src.config.config import configuration
+from src.core.context import JobContext
+from src.yaml_maker import YamlMaker
+from src.utils.file_util import set_output_dir
+from src.utils.download_cache import DownloadCache
+from src.utils.download_manager import create_manager
+
+manifest_fields = ["name", "url", "git_url", "git_ref", "tarball_url", "directory", "version", "language"]
+summary_file = "summary.yaml"
+
+
+def read_manifest(path):
+    """读取批量加包清单，支持yaml(列表或packages字段)和带表头的csv"""
+    if not os.path.exists(path):
+        raise FileNotFoundError("no such file: " + path)
+    if path.endswith(".csv"):
+        with open(path, "r", newline="") as f:
+            entries = [row for row in csv.DictReader(f)]
+    else:
+        with open(path, "r") as f:
+            data = yaml.safe_load(f.read())
+        entries = data.get("packages", []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("manifest must be a list of packages: " + path)
+    result = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        result.append({k: str(entry.get(k) or "").strip() for k in manifest_fields})
+    return result
+
+
+def manifest_to_args(entry):
+    """把清单中的一项转换为YamlMaker的参数"""
+    args = {
+        "name": "",
+        "git_url": entry.get("git_url", ""),
+        "git_ref": entry.get("git_ref", ""),
+        "tarball_url": entry.get("tarball_url", ""),
+        "directory": entry.get("directory", ""),
+        "version": entry.get("version", ""),
+        "language": entry.get("language", ""),
+    }
+    url = entry.get("url", "")
+    if url.endswith(".git") or url.startswith("git@"):
+        args["git_url"] = url
+    elif url:
+        args["tarball_url"] = url
+    inputs = [value for value in [args["git_url"], args["tarball_url"], args["directory"]] if value]
+    if len(inputs) > 1:
+        raise ValueError("only one of url/git_url/tarball_url/directory is allowed")
+    if not inputs:
+        if not entry.get("name"):
+            raise ValueError("need name or url/directory")
+        if args["version"] == "" or args["language"] == "":
+            raise ValueError("need version and language with name " + entry["name"])
+        args["name"] = entry["name"]
+    return args
+
+
+def package_label(entry):
+    """生成包的输出目录名"""
+    label = entry.get("name")
+    if not label:
+        source_path = entry.get("url") or entry.get("git_url") or entry.get("tarball_url") or entry.get("directory")
+        label = os.path.basename(source_path.rstrip("/"))
+        label = re.sub(r"(\.git|\.zip|\.tgz|\.tar(\.\w+)?)$", "", label)
+    label = re.sub(r"[^\w.+-]", "_", label)
+    return label or "package"
+
+
+def run_package(job):
+    """在工作进程中为单个包执行加包流程，每个包使用独立的上下文"""
+    entry, output, yaml_path, need_build = job
+    result = {
+        "name": package_label(entry),
+        "output": output,
+        "status": "failed",
+        "error": "",
+    }
+    start = time.time()
+    try:
+        args = manifest_to_args(entry)
+        context = JobContext()
+        context.config.download_path = output
+        context.config.yaml_path = yaml_path
+        set_output_dir(output)
+        yaml_maker = YamlMaker(need_build=need_build, context=context, **args)
+        if yaml_maker.create_yaml():
+            result["status"] = "success"
+    except SystemExit as e:
+        result["error"] = f"exit with code {e.code}"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed"] = round(time.time() - start, 2)
+    return result
+
+
+def write_summary(output, results):
+    summary = {
+        "total": len(results),
+        "success": len([r for r in results if r["status"] == "success"]),
+        "failed": len([r for r in results if r["status"] != "success"]),
+        "packages": sorted(results, key=lambda r: r["output"]),
+    }
+    with open(os.path.join(output, summary_file), "w") as f:
+        f.write(yaml.safe_dump(summary, sort_keys=False))
+    return summary
+
+
+def prefetch_sources(tasks, config):
+    """在父进程中通过连接池并发下载所有源码包到下载缓存，工作进程直接命中缓存"""
+    urls = []
+    for entry, _, _, _ in tasks:
+        try:
+            urls.append(manifest_to_args(entry)["tarball_url"])
+        except ValueError:
+            continue
+    urls = [url for url in urls if url]
+    if not urls or config.offline:
+        return None
+    cache = DownloadCache(config.download_cache_path, revalidate=config.download_cache_revalidate)
+    return create_manager(config, workers=config.download_workers).prefetch(urls, cache)
+
+
+def run_batch(manifest, output, jobs=0, need_build=True):
+    """
+    并发执行清单中的所有包，每个包使用独立的输出目录
+    :return: 汇总信息
+    """
+    entries = read_manifest(manifest)
+    os.makedirs(output, exist_ok=True)
+    jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+    tasks = []
+    used_labels = set()
+    for i, entry in enumerate(entries):
+        label = package_label(entry)
+        if label in used_labels:
+            label = f"{label}-{i}"
+        used_labels.add(label)
+        tasks.append((entry, os.path.join(output, label), configuration.yaml_path, need_build))
+    # 在父进程中加载一次错误匹配规则，工作进程直接继承；没有规则时无法自修复，直接失败
+    if not configuration.setup_patterns() and need_build:
+        raise RuntimeError("failed to load build-log patterns from ES or the local snapshot, "
+                           "check the network or run once online to create " + configuration.pattern_cache_path)
+    prefetch_sources(tasks, configuration)
+    logger.info(f"start to run {len(tasks)} packages with {jobs} workers")
+    results = []
+    with multiprocessing.Pool(processes=min(jobs, max(len(tasks), 1))) as pool:
+        for result in pool.imap_unordered(run_package, tasks):
+            logger.info(f"[{len(results) + 1}/{len(tasks)}] {result['name']}: {result['status']} {result['error']}")
+            results.append(result)
+    summary = write_summary(output, results)
+    logger.info(f"batch finished, total: {summary['total']}, success: {summary['success']}, "
+                f"failed: {summary['failed']}")
+    return summary
@@ -8,32 +8,75 @@
 # See the Mulan PSL v2 for more details.
 
 import os
+import signal
+import shutil
+import subprocess
 import yaml
 
 from src.log import logger
-from src.config.config import configuration
+from src.core.context import get_config
 
 
-def run_docker_script(build_system, metadata, num):
-    write_skel_shell(metadata, build_system)
-    cmd = "source /root/.bashrc && epkg build {0}/package.yaml 2>&1 | tee {0}/{1}-build.log".format(
-        configuration.download_path, num)
-    result = os.popen(cmd).read()
-    os.system("\\cp {0}/{1}-build.log {0}/build.log".format(configuration.download_path, num))
-    logger.info(result)
-    return result
+def stop_build(process, timeout=10):
+    """结束构建命令及其子进程"""
+    for sig in [signal.SIGTERM, signal.SIGKILL]:
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            process.wait(timeout=timeout)
+            return
+        except subprocess.TimeoutExpired:
+            continue
 
 
-def get_build_result(metadata):
-    with open(os.path.join(configuration.download_path, "package.yaml"), "w") as f:
+def stream_build(cmd, log_path, on_line=None):
+    """
+    执行构建命令，边执行边写日志并把每一行交给on_line处理
+    on_line返回True时立即终止构建，返回是否提前终止
+    """
+    aborted = False
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(["bash", "-c", cmd], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   universal_newlines=True, errors="replace", start_new_session=True)
+        try:
+            for line in process.stdout:
+                log.write(line)
+                if on_line is not None and on_line(line):
+                    aborted = True
+                    break
+        finally:
+            if aborted:
+                logger.info("found a failure to fix, stop the running build")
+                stop_build(process)
+            process.stdout.close()
+            process.wait()
+    return aborted
+
+
+def run_docker_script(build_system, metadata, num, context=None, on_line=None):
+    config = get_config(context)
+    write_skel_shell(metadata, build_system, context)
+    cmd = "source /root/.bashrc && epkg build {0}/package.yaml 2>&1".format(config.download_path)
+    log_path = "{0}/{1}-build.log".format(config.download_path, num)
+    aborted = stream_build(cmd, log_path, on_line)
+    shutil.copyfile(log_path, os.path.join(config.download_path, config.logfile))
+    logger.info("build log: " + log_path)
+    return aborted
+
+
+def get_build_result(metadata, context=None):
+    config = get_config(context)
+    with open(os.path.join(config.download_path, "package.yaml"), "w") as f:
         f.write(yaml.safe_dump(metadata))
     # TODO(run epkg build command)
-    os.system("\cp /root/.cache/epkg/build-workspace/epkg/* " + configuration.download_path)
+    os.system("\cp /root/.cache/epkg/build-workspace/epkg/* " + config.download_path)
     pass
 
 
-def write_skel_shell(metadata, build_system):
-    work_space = os.path.join(configuration.download_path, "workspace")
+def write_skel_shell(metadata, build_system, context=None):
+    work_space = os.path.join(get_config(context).download_path, "workspace")
     license_type = metadata.get("license")
     homepage = metadata.get("homepage")
     name = metadata.get("name")
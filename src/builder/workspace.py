@@ -0,0 +1,188 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import errno
+import fcntl
+import shlex
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.log import logger
+from src.utils.cmd_util import call
+
+# linux/fs.h: FICLONE = _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+trash_prefix = ".trash-"
+# 这些错误表示文件系统不支持reflink，改为普通复制
+reflink_unsupported = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM}
+
+
+def remove_in_background(path, rename=True):
+    """把目录改名后在后台线程中删除，返回删除线程，调用方可以在退出前等待删除完成"""
+    if not os.path.lexists(path):
+        return None
+    trash = path
+    if rename:
+        trash = os.path.join(os.path.dirname(path), trash_prefix + uuid.uuid4().hex)
+        os.rename(path, trash)
+    thread = threading.Thread(target=shutil.rmtree, args=(trash, True), name="remove-workspace", daemon=True)
+    thread.start()
+    return thread
+
+
+def reflink_file(src, dst):
+    with open(src, "rb") as src_f, open(dst, "wb") as dst_f:
+        fcntl.ioctl(dst_f.fileno(), FICLONE, src_f.fileno())
+    shutil.copystat(src, dst)
+
+
+class TreeCopier:
+    """
+    复制整个目录树，目录按顺序创建，文件由线程池并行复制
+    reflink为True时优先使用FICLONE共享数据块，文件系统不支持时自动改为普通复制
+    """
+    def __init__(self, workers=8, reflink=True):
+        self.workers = max(workers, 1)
+        self.reflink = reflink
+
+    def copy_file(self, src, dst):
+        if self.reflink:
+            try:
+                reflink_file(src, dst)
+                return
+            except OSError as e:
+                if e.errno not in reflink_unsupported:
+                    raise
+                logger.info(f"reflink is not supported: {e}, fall back to copy")
+                self.reflink = False
+        shutil.copy2(src, dst)
+
+    def copy_tree(self, src, dst):
+        files = []
+        dirs = []
+        for dir_path, dir_names, file_names in os.walk(src):
+            rel_dir = os.path.relpath(dir_path, src)
+            target_dir = os.path.normpath(os.path.join(dst, rel_dir))
+            os.makedirs(target_dir, exist_ok=True)
+            dirs.append((dir_path, target_dir))
+            for name in dir_names + file_names:
+                src_path = os.path.join(dir_path, name)
+                dst_path = os.path.join(target_dir, name)
+                if os.path.islink(src_path):
+                    os.symlink(os.readlink(src_path), dst_path)
+                    if name in dir_names:
+                        dir_names.remove(name)
+                elif name in file_names and os.path.isfile(src_path):
+                    files.append((src_path, dst_path))
+        if files:
+            # 第一个文件单独复制，确定是否支持reflink后再并行
+            self.copy_file(*files[0])
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for future in [executor.submit(self.copy_file, s, d) for s, d in files[1:]]:
+                    future.result()
+        for src_dir, target_dir in reversed(dirs):
+            shutil.copystat(src_dir, target_dir)
+        return len(files)
+
+
+class WorkspaceProvider:
+    """
+    每轮构建前提供与源码完全一致的workspace
+    依次尝试overlay挂载(只需重置upper目录)、reflink复制和并行复制，旧的workspace在后台删除
+    """
+    def __init__(self, source_path, target, method="auto", workers=8):
+        self.source_path = os.path.abspath(source_path)
+        self.target = os.path.abspath(target)
+        self.method = method
+        self.workers = workers
+        self.state_dir = os.path.join(os.path.dirname(self.target), ".workspace")
+        self.mounted = False
+        self.used_method = ""
+        self.deleters = []
+        self.swept = False
+
+    def remove(self, path, rename=True):
+        thread = remove_in_background(path, rename)
+        if thread is not None:
+            self.deleters.append(thread)
+
+    def sweep_trash(self):
+        """删除之前的进程退出时没有删完的目录"""
+        parent = os.path.dirname(self.target)
+        if not os.path.isdir(parent):
+            return
+        for name in os.listdir(parent):
+            if name.startswith(trash_prefix):
+                self.remove(os.path.join(parent, name), rename=False)
+
+    def methods(self):
+        if self.method != "auto":
+            return [self.method]
+        methods = ["reflink", "copy"]
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            methods.insert(0, "overlay")
+        return methods
+
+    def prepare(self):
+        """重置workspace，返回使用的方式"""
+        if not self.swept:
+            self.sweep_trash()
+            self.swept = True
+        self.unmount()
+        self.remove(self.target)
+        for method in self.methods():
+            if method == "overlay" and self.mount_overlay():
+                self.used_method = method
+                break
+            if method in ("reflink", "copy"):
+                count = TreeCopier(self.workers, reflink=method == "reflink").copy_tree(self.source_path, self.target)
+                logger.info(f"copied {count} files into workspace")
+                self.used_method = method
+                break
+        logger.info(f"workspace is prepared by {self.used_method}")
+        return self.used_method
+
+    def mount_overlay(self):
+        upper = os.path.join(self.state_dir, "upper")
+        work = os.path.join(self.state_dir, "work")
+        self.remove(self.state_dir)
+        os.makedirs(upper)
+        os.makedirs(work)
+        os.makedirs(self.target, exist_ok=True)
+        options = f"lowerdir={self.source_path},upperdir={upper},workdir={work}"
+        try:
+            ret = call(f"mount -t overlay overlay -o {shlex.quote(options)} {shlex.quote(self.target)}",
+                       stderr=subprocess.DEVNULL)
+        except OSError as e:
+            logger.info(f"can't mount overlay: {e}")
+            ret = -1
+        if ret != 0:
+            os.rmdir(self.target)
+            self.remove(self.state_dir)
+            return False
+        self.mounted = True
+        return True
+
+    def unmount(self):
+        if not self.mounted:
+            return
+        if call(f"umount {shlex.quote(self.target)}") != 0:
+            call(f"umount -l {shlex.quote(self.target)}")
+        self.mounted = False
+        self.remove(self.state_dir)
+
+    def release(self):
+        """卸载overlay并等待后台删除完成，构建流程结束时调用，进程退出时不会留下删了一半的目录"""
+        self.unmount()
+        for thread in self.deleters:
+            thread.join()
+        self.deleters = []
@@ -7,10 +7,13 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
+import os
+import copy
 import json
 import inspect
 import requests
 from src.log import logger
+from src.config.pattern_store import PatternStore
 
 
 class EsClient:
@@ -67,7 +70,7 @@ class EsClient:
         return json_response['data']
 
     def query_whole_index(self, index_name, size):
-        response = requests.get(self.url(), params={"index_name": index_name, "size": size})
+        response = requests.get(self.url(), params={"index_name": index_name, "size": size}, timeout=30)
         json_response = json.loads(response.content)
         return json_response['data']
 
@@ -145,41 +148,110 @@ class BuildConfig:
     maven_remove_plugins = set()
     maven_disable_modules = set()
     maven_delete_dirs = set()
+    maven_parse_workers = os.cpu_count() or 1
+    # 第0轮之前静态分析构建文件时是否添加可选的依赖
+    static_requires_optional = False
     buildrequires_analysis_compilations = ["autotools", "cmake", "maven", "meson"]
+    pattern_cache_path = os.path.expanduser("~/.cache/autopkg/patterns.db")
+    pattern_cache_ttl = 24 * 3600
+    offline = False
+    patterns_loaded = False
+    # 已经读取成功的规则表，读取失败的表在下次调用setup_patterns时重试
+    loaded_pattern_tables = set()
+    stream_build_log = True
+    # 每轮收集日志中所有可修复的错误后再重新构建
+    collect_all_fixes = True
+    # 边构建边分析时，发现错误后继续读取的行数和秒数，用于收集紧随其后的其他错误
+    early_abort_grace_lines = 2000
+    early_abort_grace_seconds = 2.0
+    log_parallel_threshold = 64 * 1024 * 1024
+    log_tail_bytes = 4 * 1024 * 1024
+    log_scan_workers = os.cpu_count() or 1
+    # workspace准备方式: auto/overlay/reflink/copy
+    workspace_method = "auto"
+    workspace_copy_workers = 8
+    download_cache_path = os.path.expanduser("~/.cache/autopkg/downloads")
+    download_cache_revalidate = True
+    # 跨运行的失败到修复的知识库，得分达到knowledge_min_score的修复在第0轮之前预先应用
+    knowledge_base_enabled = True
+    knowledge_base_path = os.path.expanduser("~/.cache/autopkg/knowledge.db")
+    knowledge_min_score = 1.5
+    # 文件到软件包的本地索引，从package_index_repos中各仓库的repodata导入
+    package_index_path = os.path.expanduser("~/.cache/autopkg/packages.db")
+    package_index_repos = []
+    package_index_ttl = 24 * 3600
+    git_mirror_path = os.path.expanduser("~/.cache/autopkg/git")
+    # 批量模式预下载的并发数、单个主机的并发数和失败重试
+    download_workers = 16
+    download_per_host = 4
+    download_retries = 3
+    download_backoff = 1.0
+    # 下载失败时尝试的镜像，{url前缀: [镜像前缀]}
+    download_mirrors = {}
+    # 解压源码包时跳过的成员，如测试数据目录"*/testdata/*"
+    extract_skip_patterns = []
+
+    def __init__(self):
+        # 类属性中的可变容器复制到实例上，避免不同的配置对象共享同一份数据
+        for key, value in vars(BuildConfig).items():
+            if isinstance(value, (list, dict, set)):
+                setattr(self, key, copy.deepcopy(value))
+
+    def copy(self):
+        """复制出一份独立的配置，用于单个包的加包流程"""
+        new_config = BuildConfig()
+        new_config.__dict__.update(copy.deepcopy(self.__dict__))
+        return new_config
 
     def setup_patterns(self):
-        """Read each pattern configuration file and assign to the appropriate variable."""
-        self.read_pattern_conf("failed_commands", self.failed_commands)
-        self.read_pattern_conf("failed_flags", self.failed_flags)
-        # self.read_pattern_conf("gems", self.gems)
-        self.read_pattern_conf("qt_modules", self.qt_modules)
-        self.read_pattern_conf("cmake_modules", self.cmake_modules)
-        self.read_pattern_conf("pkgconfig_patterns", self.pkgconfig_pats)
-        self.read_pattern_conf("simple_patterns", self.simple_pats)
-        self.read_pattern_conf("make_failed_patterns", self.make_failed_pats)
-        self.read_pattern_conf("pkgconfig_failed_patterns", self.pkgconfig_failed_pats)
-
-        for k, v in self.qt_modules.items():
-            self.qt_modules[k] = "Qt5" + v
+        """
+        Read each pattern configuration file and assign to the appropriate variable.
+        所有规则表都读取成功后才标记为已加载，返回是否已加载
+        """
+        if self.patterns_loaded:
+            return True
+        tables = [
+            ("failed_commands", self.failed_commands),
+            ("failed_flags", self.failed_flags),
+            # ("gems", self.gems),
+            ("qt_modules", self.qt_modules),
+            ("cmake_modules", self.cmake_modules),
+            ("pkgconfig_patterns", self.pkgconfig_pats),
+            ("simple_patterns", self.simple_pats),
+            ("make_failed_patterns", self.make_failed_pats),
+            ("pkgconfig_failed_patterns", self.pkgconfig_failed_pats),
+        ]
+        for file_name, param in tables:
+            if file_name in self.loaded_pattern_tables or not self.read_pattern_conf(file_name, param):
+                continue
+            self.loaded_pattern_tables.add(file_name)
+            if file_name == "qt_modules":
+                for k, v in self.qt_modules.items():
+                    self.qt_modules[k] = "Qt5" + v
+        missing = [file_name for file_name, _ in tables if file_name not in self.loaded_pattern_tables]
+        if missing:
+            logger.warning("failed to load patterns, retry later: " + ", ".join(missing))
+            return False
+        self.patterns_loaded = True
+        return True
+
+    def pattern_store(self):
+        return PatternStore(self.pattern_cache_path, lambda index_name: EsClient().query_whole_index(index_name, 1500),
+                            ttl=self.pattern_cache_ttl, offline=self.offline)
 
     def read_pattern_conf(self, file_name, param):
-        esclient = EsClient()
         index_name = f"autopkg_openeuler_2403_{file_name}"
-        result = esclient.query_whole_index(index_name, 1500)
-        if not isinstance(result, list):
-            logger.error(f"can't parse database table {index_name}!")
-            return
-        if len(result) != 2:
-            logger.error(f"no data in database table {index_name}!")
-            return
-        mappings = result[1]
+        mappings = self.pattern_store().get(index_name)
+        if mappings is None:
+            return False
         for item in mappings:
             if not isinstance(item, list):
                 continue
             if isinstance(param, dict) and len(item) > 2 and item[1] != "":
                 param[item[0]] = item[1]
-            elif isinstance(param, list):
+            elif isinstance(param, list) and item[0] not in param:
                 param.append(item[0])
+        return True
 
 
 configuration = BuildConfig()
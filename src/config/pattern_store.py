@@ -0,0 +1,109 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from src.log import logger
+
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+class PatternStore:
+    """
+    错误匹配规则表的本地快照
+    规则表保存在sqlite中并记录版本和拉取时间，过期后在后台线程中刷新，离线模式下只读取本地快照
+    """
+    def __init__(self, path, fetch, ttl=24 * 3600, offline=False):
+        self.path = path
+        self.fetch = fetch
+        self.ttl = ttl
+        self.offline = offline
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS patterns (index_name TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                     "version TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        return conn
+
+    def load(self, index_name):
+        """读取本地快照，返回(规则数据, 版本, 拉取时间)，没有快照时返回None"""
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT data, version, fetched_at FROM patterns WHERE index_name = ?",
+                               (index_name,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def save(self, index_name, mappings):
+        data = json.dumps(mappings, sort_keys=True)
+        version = hashlib.sha1(data.encode("utf-8")).hexdigest()
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO patterns (index_name, data, version, fetched_at) "
+                             "VALUES (?, ?, ?, ?)", (index_name, data, version, time.time()))
+        finally:
+            conn.close()
+        return version
+
+    def refresh(self, index_name):
+        """从数据库拉取规则表并更新本地快照，失败时返回None"""
+        try:
+            result = self.fetch(index_name)
+        except Exception as e:
+            logger.warning(f"can't query database table {index_name}: {e}")
+            return None
+        if not isinstance(result, list):
+            logger.error(f"can't parse database table {index_name}!")
+            return None
+        if len(result) != 2:
+            logger.error(f"no data in database table {index_name}!")
+            return None
+        mappings = result[1]
+        version = self.save(index_name, mappings)
+        logger.info(f"pattern table {index_name} refreshed, version: {version[:12]}")
+        return mappings
+
+    def refresh_in_background(self, index_name):
+        with _refresh_lock:
+            if (self.path, index_name) in _refreshing:
+                return
+            _refreshing.add((self.path, index_name))
+
+        def run():
+            try:
+                self.refresh(index_name)
+            finally:
+                with _refresh_lock:
+                    _refreshing.discard((self.path, index_name))
+
+        threading.Thread(target=run, name=f"refresh-{index_name}", daemon=True).start()
+
+    def get(self, index_name):
+        """获取规则表，优先使用本地快照"""
+        snapshot = self.load(index_name)
+        if snapshot is None:
+            if self.offline:
+                logger.error(f"no local snapshot of {index_name} in offline mode")
+                return None
+            return self.refresh(index_name)
+        mappings, version, fetched_at = snapshot
+        if not self.offline and time.time() - fetched_at > self.ttl:
+            logger.info(f"pattern table {index_name} is expired, refresh in background")
+            self.refresh_in_background(index_name)
+        return mappings
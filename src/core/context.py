@@ -0,0 +1,39 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+from src.config.config import configuration
+from src.core.source import Source, source as global_source
+
+
+class JobContext:
+    """
+    单个包加包流程的上下文
+    每个包持有独立的配置和源码信息，同一进程中处理多个包时互不影响
+    """
+    def __init__(self, config=None, source=None):
+        self.config = config if config is not None else configuration.copy()
+        self.source = source if source is not None else Source()
+        # 编译后的日志规则引擎，由LogParser在首次使用时构建
+        self.pattern_engine = None
+        # 解析后的pom信息，只在加包流程中使用，不写入package.yaml
+        self.pom_reactor = None
+        # 本地软件包索引，构建流程开始时打开，供静态分析和日志分析查找依赖
+        self.package_index = None
+
+
+def default_context(source=None):
+    """没有传入上下文时，使用全局的配置和源码信息"""
+    return JobContext(config=configuration, source=source if source is not None else global_source)
+
+
+def get_config(context=None):
+    """获取上下文中的配置，没有上下文时使用全局配置"""
+    if context is None:
+        return configuration
+    return context.config
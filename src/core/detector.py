@@ -0,0 +1,207 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import re
+import json
+from src.log import logger
+from src.utils.yaml_loader import load_yaml
+from src.utils.cmd_util import infer_language
+
+# 编译类型对应的模板文件名，未列出的与编译类型同名
+template_names = {
+    "javascript": "nodejs",
+}
+autogen_files = ["autogen.sh", "build.sh", "compile.sh"]
+perl_min_files = 10
+# 只做探测时需要读取内容的小文件，用于识别名称和版本
+detection_files = ["CMakeLists.txt", "meson.build", "pom.xml", "setup.py", "setup.cfg", "pyproject.toml",
+                   "configure.ac", "package.json"]
+detection_file_max_size = 1024 * 1024
+name_version_pats = {
+    "CMakeLists.txt": [r"project\(\s*([\w.+-]+)[^)]*?VERSION\s+([\w.]+)"],
+    "meson.build": [r"project\(\s*'([\w.+-]+)'.*?version\s*:\s*'([\w.]+)'"],
+    "configure.ac": [r"AC_INIT\(\s*\[?([\w.+-]+)\]?\s*,\s*\[?([\w.]+)\]?"],
+    "setup.py": [r"name\s*=\s*['\"]([\w.+-]+)['\"].*?version\s*=\s*['\"]([\w.]+)['\"]"],
+    "setup.cfg": [r"^name\s*=\s*([\w.+-]+).*?^version\s*=\s*([\w.]+)"],
+    "pyproject.toml": [r"^name\s*=\s*['\"]([\w.+-]+)['\"].*?^version\s*=\s*['\"]([\w.]+)['\"]"],
+    "pom.xml": [r"<artifactId>([\w.+-]+)</artifactId>\s*<version>([\w.-]+)</version>"],
+}
+
+
+class Candidate:
+    """探测到的构建系统，evidence为判断依据，metadata为需要写入package.yaml的路径信息"""
+    def __init__(self, compilation, evidence, metadata=None):
+        self.compilation = compilation
+        self.evidence = evidence
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"{self.compilation}({', '.join(self.evidence)})"
+
+
+def load_build_system_files(config, compilations):
+    """从各编译类型的模板中读取buildSystemFiles"""
+    result = {}
+    for compilation in compilations:
+        template = os.path.join(config.yaml_path, template_names.get(compilation, compilation) + ".yaml")
+        if not os.path.exists(template):
+            logger.warning("no such file: " + template)
+            result[compilation] = ""
+            continue
+        content = load_yaml(template) or {}
+        result[compilation] = str(content.get("autopkg", {}).get("buildSystemFiles", "") or "")
+    return result
+
+
+def probe_build_file(index, compilation, build_system_file, path_key=None, file_name=None):
+    """顶层存在构建文件，或在子目录中找到同名文件"""
+    if not build_system_file:
+        return None
+    if index.has_file(build_system_file, depth=0):
+        return Candidate(compilation, [build_system_file])
+    paths = index.find(file_name or build_system_file)
+    if not paths:
+        return None
+    metadata = {path_key: paths[0]} if path_key else {}
+    return Candidate(compilation, [paths[0]], metadata)
+
+
+def probe_cmake(index, build_system_file):
+    return probe_build_file(index, "cmake", build_system_file, "cmakePath")
+
+
+def probe_make(index, build_system_file):
+    return probe_build_file(index, "make", build_system_file, "makePath", "Makefile")
+
+
+def probe_meson(index, build_system_file):
+    return probe_build_file(index, "meson", build_system_file, "mesonPath")
+
+
+def probe_maven(index, build_system_file):
+    return probe_build_file(index, "maven", build_system_file, file_name="pom.xml")
+
+
+def probe_autotools(index, build_system_file):
+    if not build_system_file:
+        return None
+    if index.has_file(build_system_file, depth=0):
+        return Candidate("autotools", [build_system_file])
+    if index.has_file("configure", depth=0):
+        return Candidate("autotools", ["configure"])
+    return probe_build_file(index, "autotools", build_system_file, "configurePath", "configure")
+
+
+def probe_autogen(index, build_system_file):
+    evidence = [file for file in autogen_files if index.has_file(file, depth=0)]
+    return Candidate("autogen", evidence) if evidence else None
+
+
+def probe_ruby(index, build_system_file):
+    gemspecs = index.with_ext("gemspec")
+    return Candidate("ruby", gemspecs[:1]) if gemspecs else None
+
+
+def probe_go(index, build_system_file):
+    if not index.with_ext("go"):
+        return None
+    mods = index.with_ext("mod", depth=0)
+    sums = index.with_ext("sum", depth=0)
+    if len(mods) == 1 and len(sums) == 1:
+        return Candidate("go", mods + sums)
+    return None
+
+
+def probe_python(index, build_system_file):
+    if not index.with_ext("py"):
+        return None
+    evidence = [file for file in ["requirements.txt", "setup.py"] if index.has_file(file, depth=0)]
+    return Candidate("python", evidence) if evidence else None
+
+
+def probe_perl(index, build_system_file):
+    scripts = index.with_ext("pl")
+    if len(scripts) > perl_min_files:
+        return Candidate("perl", [f"{len(scripts)} .pl files"])
+    return None
+
+
+def probe_javascript(index, build_system_file):
+    if not build_system_file or not index.with_ext("js"):
+        return None
+    if index.has_file(build_system_file, depth=0):
+        return Candidate("javascript", [build_system_file])
+    paths = index.find(build_system_file)
+    if paths and infer_language(index.files) == "nodejs":
+        return Candidate("javascript", [paths[0]])
+    return None
+
+
+probes = {
+    "cmake": probe_cmake,
+    "autotools": probe_autotools,
+    "meson": probe_meson,
+    "maven": probe_maven,
+    "autogen": probe_autogen,
+    "ruby": probe_ruby,
+    "go": probe_go,
+    "make": probe_make,
+    "python": probe_python,
+    "perl": probe_perl,
+    "javascript": probe_javascript,
+}
+
+
+def detect_build_systems(index, build_system_files, compilations=None):
+    """
+    基于源码索引一次性执行所有构建系统的探测
+    :return: 按compilations顺序排列的候选构建系统列表
+    """
+    candidates = []
+    for compilation in compilations if compilations is not None else probes:
+        probe = probes.get(compilation)
+        if probe is None:
+            continue
+        candidate = probe(index, build_system_files.get(compilation, ""))
+        if candidate is not None:
+            candidates.append(candidate)
+    return candidates
+
+
+def read_build_files(index, names=None, max_size=detection_file_max_size):
+    """读取源码中的小构建文件，返回{相对路径: 内容}"""
+    contents = {}
+    for name in names or detection_files:
+        for path in index.find(name):
+            full_path = os.path.join(index.root, path)
+            if path.count("/") > 1 or index.size(path) > max_size or not os.path.isfile(full_path):
+                continue
+            with open(full_path, "r", errors="replace") as f:
+                contents[path] = f.read()
+    return contents
+
+
+def guess_name_version(contents):
+    """从构建文件内容中识别名称和版本，优先使用顶层目录中的文件"""
+    for path in sorted(contents, key=lambda item: item.count("/")):
+        name = os.path.basename(path)
+        if name == "package.json":
+            try:
+                data = json.loads(contents[path])
+            except ValueError:
+                continue
+            if isinstance(data, dict) and data.get("name") and data.get("version"):
+                return str(data["name"]), str(data["version"])
+            continue
+        for pattern in name_version_pats.get(name, []):
+            match = re.search(pattern, contents[path], re.S | re.M)
+            if match:
+                return match.group(1), match.group(2)
+    return "", ""
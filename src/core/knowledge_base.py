@@ -0,0 +1,154 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import re
+import json
+import time
+import sqlite3
+from src.log import logger
+
+# 可以在第0轮之前直接应用的修复类型
+seed_types = ["buildRequires", "makeFlags", "cmakeFlags", "maven_remove_plugins", "maven_disable_modules",
+              "maven_delete_dirs"]
+source_exts = {"c", "cc", "cpp", "cxx", "h", "hpp", "py", "go", "rs", "java", "kt", "scala", "rb", "pl", "js",
+               "ts", "vala", "f90", "cu", "qml", "ui", "proto", "y", "l"}
+
+
+def failure_signature(line):
+    """归一化失败日志行，去掉行号、路径和版本号等变化的部分"""
+    line = re.sub(r"(/[\w.+-]+)+/", "/", line.strip())
+    line = re.sub(r"\d+", "#", line)
+    return re.sub(r"\s+", " ", line)[:200]
+
+
+def package_features(metadata, index=None):
+    """
+    第0轮之前就能得到的包特征：声明的依赖、源码文件类型和顶层构建文件
+    用于在知识库中查找相似的包
+    """
+    features = {"req:" + str(req) for req in metadata.get("buildRequires") or []}
+    if index is not None:
+        features.update("ext:" + ext.lstrip(".") for ext in index.by_ext if ext.lstrip(".") in source_exts)
+        features.update("file:" + os.path.basename(path) for path in index.at_depth(0))
+    return features
+
+
+def similarity(left, right):
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class KnowledgeBase:
+    """
+    跨运行的失败到修复的知识库
+    记录每个包在构建中被证实有效的修复，新包构建前根据构建系统和特征的相似度预先应用常见的修复
+    """
+    def __init__(self, path, min_score=1.5):
+        self.path = path
+        self.min_score = min_score
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS packages (name TEXT NOT NULL, compilation TEXT NOT NULL, "
+            "features TEXT NOT NULL, success INTEGER NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (name, compilation));"
+            "CREATE TABLE IF NOT EXISTS fixes (name TEXT NOT NULL, compilation TEXT NOT NULL, "
+            "signature TEXT NOT NULL, fix_type TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (name, compilation, fix_type, value));"
+            "CREATE INDEX IF NOT EXISTS fixes_compilation ON fixes (compilation);")
+        return conn
+
+    def learn(self, name, compilation, features, fixes, success):
+        """记录一个包的有效修复，同一个包再次运行时覆盖之前的记录"""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO packages (name, compilation, features, success, updated_at) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (name, compilation, json.dumps(sorted(features)), int(success), time.time()))
+                conn.execute("DELETE FROM fixes WHERE name = ? AND compilation = ?", (name, compilation))
+                conn.executemany("INSERT OR IGNORE INTO fixes (name, compilation, signature, fix_type, value) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                                 [(name, compilation, failure_signature(fix.get("line", "")), fix["type"],
+                                   str(fix["value"])) for fix in fixes])
+        finally:
+            conn.close()
+
+    def suggest(self, compilation, features, name=""):
+        """
+        为同一构建系统的包推荐修复
+        每个修复的得分为学到该修复的相似包(相似度大于0)与当前包的相似度之和，
+        包自身上次被证实有效的修复直接计为min_score；同一失败有多个修复时只推荐得分最高的
+        :return: [(修复类型, 值, 得分)]，按得分从高到低
+        """
+        conn = self.connect()
+        try:
+            packages = {row[0]: set(json.loads(row[1])) for row in conn.execute(
+                "SELECT name, features FROM packages WHERE compilation = ?", (compilation,))}
+            rows = conn.execute("SELECT name, signature, fix_type, value FROM fixes WHERE compilation = ?",
+                                (compilation,)).fetchall()
+        finally:
+            conn.close()
+        scores = {}
+        signatures = {}
+        for package, signature, fix_type, value in rows:
+            if fix_type not in seed_types or package not in packages:
+                continue
+            score = self.min_score if name and package == name else similarity(features, packages[package])
+            if score <= 0:
+                continue
+            scores[(fix_type, value)] = scores.get((fix_type, value), 0.0) + score
+            if signature:
+                signatures.setdefault((fix_type, value), set()).add(signature)
+        result = []
+        covered = set()
+        for (fix_type, value), score in sorted(scores.items(), key=lambda item: (-item[1], item[0])):
+            if score < self.min_score:
+                continue
+            keys = {(fix_type, signature) for signature in signatures.get((fix_type, value), ())}
+            if keys and keys <= covered:
+                continue
+            covered |= keys
+            result.append((fix_type, value, round(score, 3)))
+        return result
+
+
+def open_knowledge_base(config):
+    if not config.knowledge_base_enabled:
+        return None
+    return KnowledgeBase(config.knowledge_base_path, min_score=config.knowledge_min_score)
+
+
+def apply_fixes(metadata, config, suggestions):
+    """把推荐的修复应用到第0轮的metadata和maven配置中，返回实际应用的修复"""
+    applied = []
+    for fix_type, value, _ in suggestions:
+        if fix_type == "buildRequires":
+            build_requires = metadata.setdefault("buildRequires", [])
+            if value in build_requires:
+                continue
+            build_requires.append(value)
+        elif fix_type in ("makeFlags", "cmakeFlags"):
+            current = metadata.get(fix_type) or ""
+            if value in current.split():
+                continue
+            metadata[fix_type] = f"{current} {value}".strip()
+        else:
+            target = getattr(config, fix_type)
+            if value in target:
+                continue
+            target.add(value)
+        applied.append((fix_type, value))
+    if applied:
+        logger.info("pre-seed fixes from knowledge base: " + ", ".join(f"{t}={v}" for t, v in applied))
+    return applied
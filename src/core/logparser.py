@@ -10,19 +10,50 @@
 
 import os
 import re
+import time
 from src.log import logger
-from src.config.config import configuration
+from src.core.context import default_context
 from src.utils.cmd_util import get_package_by_file, call
-from src.core.maven_log_analysis import MavenLogAnalysis
+from src.core.maven_log_analysis import MavenLogAnalysis, maven_failed_pats
+from src.core.pattern_engine import PatternEngine
+from src.utils.log_reader import BuildLog
 
+patch_name_pattern = r'^Patch #[0-9]+ \((.*)\):$'
+patch_fail_pattern = r'^Skipping patch.$'
 
-def get_req_by_pat(s):
+
+def build_pattern_engine(config):
+    """把配置中的所有错误规则表编译进同一个匹配引擎，每个加包流程只构建一次"""
+    engine = PatternEngine()
+    engine.add_table("patch", [patch_name_pattern, patch_fail_pattern])
+    engine.add_table("simple", config.simple_pats)
+    engine.add_table("make", config.make_failed_pats)
+    engine.add_table("make_flags", config.make_failed_flags)
+    engine.add_table("cmake_search", [config.cmake_search_failed])
+    engine.add_table("cmake", config.cmake_failed_pats)
+    engine.add_table("cmake_flags", config.cmake_failed_flags)
+    engine.add_table("python", config.pypi_failed_pats)
+    engine.add_table("ruby", config.ruby_failed_pats)
+    engine.add_table("nodejs", config.nodejs_failed_pats)
+    engine.add_table("meson", config.meson_failed_pats)
+    engine.add_table("go", config.go_failed_pats)
+    engine.add_table("maven", maven_failed_pats)
+    return engine
+
+
+maven_fix_types = ["maven_remove_plugins", "maven_disable_modules", "maven_delete_dirs"]
+
+
+def get_req_by_pat(s, index):
+    """日志中缺失的库(-lxxx)、头文件或命令，按文件路径在本地索引中查找所属的软件包"""
     file_path = s
     if s.startswith('-l'):
         file_path = '/usr/lib64/lib' + s[2:] + '.so'
     elif s.endswith('.h') or s.endswith('hpp') or s.endswith('hxx') or s.endswith('h++'):
         file_path = '/usr/include/' + s
-    req = get_package_by_file(file_path)
+    elif '/' not in s:
+        file_path = '/usr/bin/' + s
+    req = get_package_by_file(file_path, index=index, use_dnf=False)
     return req
 
 
@@ -66,15 +97,17 @@ def cleanup_req(s: str) -> str:
 
 
 class LogParser:
-    def __init__(self, metadata: dict, scripts: dict, compilation=None):
+    def __init__(self, metadata: dict, scripts: dict, compilation=None, context=None):
+        self.context = context if context is not None else default_context()
+        self.config = self.context.config
         self.metadata = metadata
         self.scripts = scripts
         self.compilation = compilation
         self.name = metadata.get("name")
         self.version = metadata.get("version")
         self.release = metadata.get("release")
-        self.patch_name_line = re.compile(r'^Patch #[0-9]+ \((.*)\):$')
-        self.patch_fail_line = re.compile(r'^Skipping patch.$')
+        self.patch_name_line = re.compile(patch_name_pattern)
+        self.patch_fail_line = re.compile(patch_fail_pattern)
         self.failed_type = "other"
         self.parse_funcs = {
             "autotools": self.parse_make_pattern,
@@ -88,10 +121,45 @@ class LogParser:
             "autogen": self.parse_make_pattern,
             "maven": self.parse_maven_pattern,
         }
+        # 各编译类型逐行匹配时用到的规则表，None表示不能用预过滤跳过
+        self.line_tables = {
+            "autotools": ["make", "make_flags"],
+            "make": ["make", "make_flags"],
+            "cmake": ["make", "make_flags", "cmake_search"],
+            "python": ["python"],
+            "ruby": ["ruby"],
+            "nodejs": ["nodejs"],
+            "meson": ["meson"],
+            "go": ["go"],
+            "autogen": ["make", "make_flags"],
+            "maven": ["maven"],
+        }
         self.searched_cmake_failed = False
         self.cmake_error_message = ""
-        configuration.setup_patterns()
+        self.config.setup_patterns()
+        if self.context.pattern_engine is None:
+            self.context.pattern_engine = build_pattern_engine(self.config)
+        self.engine = self.context.pattern_engine
+        self.maven_analysis = None
+        self.patch_name = ""
         self.restart = False
+        # 本轮收集到的修复项，每项为{"type", "value", "line"}
+        self.fixes = []
+        self.fix_keys = set()
+        # 已经应用过、但本轮仍然出现的修复，说明该修复没有效果
+        self.repeated = set()
+        self.collect_all = self.config.collect_all_fixes
+        self.grace_lines = 0
+        self.grace_deadline = 0
+
+    def record_fix(self, fix_type, value, line=""):
+        """记录一项修复，重复的修复返回False"""
+        key = (fix_type, str(value))
+        if key in self.fix_keys:
+            return False
+        self.fix_keys.add(key)
+        self.fixes.append({"type": fix_type, "value": value, "line": line.strip()})
+        return True
 
     def add_buildreq(self, req, req_type=""):
         """Add req to the global buildreqs set if req is not banned."""
@@ -101,7 +169,22 @@ class LogParser:
             req = f"python3dist({req})"
         elif req_type == "rubygem":
             req = f"rubugem({req})"
-        self.metadata.setdefault("buildRequires", []).append(req)
+        build_requires = self.metadata.setdefault("buildRequires", [])
+        if req in build_requires:
+            # 已经添加过的依赖再次缺失时，重新构建也无法修复
+            self.repeated.add(("buildRequires", req))
+            return False
+        build_requires.append(req)
+        return self.record_fix("buildRequires", req)
+
+    def add_flags(self, key, flags):
+        """追加makeFlags/cmakeFlags，已存在的选项返回False"""
+        current = self.metadata.get(key) or ""
+        if flags in current.split():
+            self.repeated.add((key, flags))
+            return False
+        self.metadata[key] = f"{current} {flags}".strip()
+        return self.record_fix(key, flags)
 
     def add_requires(self, req, subpkg=None):
         """Add req to the requires set if it is present in buildreqs and packages and is not banned."""
@@ -120,16 +203,24 @@ class LogParser:
             self.metadata["buildRequires"].append(f"pkgconfig({req})")
         return False
 
-    def simple_pattern(self, line, pattern, req):
+    def simple_pattern(self, line):
         """Check for simple patterns and restart the build as needed."""
-        pat = re.compile(pattern)
-        match = pat.search(line)
-        if match:
-            self.add_buildreq(req)
-            self.add_requires(req)
+        matched = self.engine.search(line, "simple")
+        if matched and self.add_buildreq(matched.value):
+            self.add_requires(matched.value)
             return True
         return False
 
+    def needs_every_line(self):
+        """当前状态下是否必须逐行分析(如无法预过滤的编译类型，或正在收集cmake的多行错误信息)"""
+        return self.line_tables.get(self.compilation) is None or self.searched_cmake_failed
+
+    def may_match(self, line):
+        """预过滤，确定该行不会命中当前编译类型的任何规则时返回False"""
+        if self.needs_every_line():
+            return True
+        return self.engine.may_match(line, ["simple"] + self.line_tables[self.compilation])
+
     def add_cmake_params(self, line):
         """add cmake params"""
         # TODO(self.scripts中添加)
@@ -147,37 +238,87 @@ class LogParser:
             return True
         return False
 
+    def feed(self, line):
+        """
+        处理一行构建日志，可以在构建过程中逐行调用
+        返回True时表示可以结束本轮构建：发现可修复的错误后，收集模式下再继续分析一段时间(宽限窗口)
+        """
+        if self.restart and not self.collect_all:
+            return True
+        if self.analyse(line):
+            self.grace_lines = self.config.early_abort_grace_lines
+            self.grace_deadline = time.time() + self.config.early_abort_grace_seconds
+        if not self.restart:
+            return False
+        if not self.collect_all:
+            return True
+        self.grace_lines -= 1
+        return self.grace_lines <= 0 or time.time() >= self.grace_deadline
+
+    def analyse(self, line):
+        """分析一行日志，发现新的可修复错误时返回True"""
+        # TODO(检测语句，依赖没有找到时，输入name和编译类型，进入递归流程)
+        # 检测语句，缺少补丁或者补丁应用失败时，修改补丁配置
+        if patch_name_match := self.patch_name_line.search(line):
+            self.patch_name = patch_name_match.groups()[0]
+        if self.patch_name:
+            if self.patch_fail_line.search(line):
+                self.remove_backport_patch(self.patch_name)
+        if not self.may_match(line):
+            return False
+        # 检测语句，根据失败语句和编译类型，判断错误，需要是公共错误类型还是具体编译类型下的错误类型
+        found = self.simple_pattern(line) or bool(self.parse_funcs[self.compilation](line))
+        if found:
+            self.restart = True
+        return found
+
     def parse_build_log(self, metadata=None):
         """Handle build log contents."""
         if metadata is not None:
             self.metadata = metadata
-        patch_name = ""
 
         # Flush the build-log to disk, before reading it
         call("sync")
-        build_log_path = configuration.download_path + "/build.log"
-        with open(build_log_path, "r") as f:
-            log_lines = f.readlines()
-        for line in log_lines:
-            # TODO(检测语句，依赖没有找到时，输入name和编译类型，进入递归流程)
-            # 检测语句，缺少补丁或者补丁应用失败时，修改补丁配置
-            if patch_name_match := self.patch_name_line.search(line):
-                patch_name = patch_name_match.groups()[0]
-            if patch_name:
-                if self.patch_fail_line.search(line):
-                    self.remove_backport_patch(patch_name)
-            # 检测语句，根据失败语句和编译类型，判断错误，需要是公共错误类型还是具体编译类型下的错误类型
-            for pat, req in configuration.simple_pats.items():
-                self.restart = self.simple_pattern(line, pat, req)
-                if self.restart:
-                    return self.metadata
-            self.restart = self.parse_funcs[self.compilation](line)
-            if self.restart:
-                break
-            if line == configuration.build_success_echo:
-                break
+        build_log_path = os.path.join(self.config.download_path, self.config.logfile)
+        with BuildLog(build_log_path) as build_log:
+            if build_log.size < self.config.log_parallel_threshold or self.needs_every_line():
+                self.feed_lines(build_log.lines())
+            else:
+                self.parse_large_log(build_log)
+        if self.fixes:
+            logger.info(f"collected {len(self.fixes)} fixes: " +
+                        ", ".join(f"{fix['type']}={fix['value']}" for fix in self.fixes))
         return self.metadata
 
+    def feed_lines(self, lines):
+        """依次分析多行日志，需要停止分析时返回True，收集模式下分析完所有行"""
+        for line in lines:
+            if self.analyse(line) and not self.collect_all:
+                return True
+            if line == self.config.build_success_echo:
+                return True
+        return False
+
+    def parse_large_log(self, build_log):
+        """
+        分析超大的构建日志
+        错误一般出现在日志末尾，先逐行分析尾部，再由多个进程并行预过滤其余部分，只分析可能命中规则的行
+        """
+        tail = build_log.tail_offset(self.config.log_tail_bytes)
+        if self.feed_lines(build_log.lines(tail)):
+            return
+        prefilter = self.engine.prefilter(["patch", "simple"] + self.line_tables[self.compilation])
+        if prefilter is None or self.needs_every_line():
+            self.feed_lines(build_log.lines(0, tail))
+            return
+        for offset in build_log.candidate_offsets(prefilter, end=tail, workers=self.config.log_scan_workers):
+            if self.feed_lines([build_log.read_line(offset)]):
+                return
+            if self.needs_every_line():
+                # 之后的行需要连续分析
+                self.feed_lines(build_log.lines(build_log.line_end(offset + 1), tail))
+                return
+
     def add_extra_make_flags(self, line):
         """write the make flags"""
         # TODO(self.scripts中添加新增的编译选项)
@@ -185,101 +326,90 @@ class LogParser:
 
     def parse_make_pattern(self, line):
         # 先判断是否是cmake构建的错误
-        if re.search(configuration.cmake_search_failed, line) and self.compilation == "cmake":
+        if self.compilation == "cmake" and self.engine.search(line, "cmake_search"):
             self.searched_cmake_failed = True
         if self.searched_cmake_failed:
             return self.parse_cmake_message(line)
-        for pattern in configuration.make_failed_pats:
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                req = configuration.failed_commands.get(match.group(1))
-                if req is None:
+        matched = self.engine.search(line, "make")
+        if matched:
+            req = self.config.failed_commands.get(matched.match.group(1))
+            if req is None:
+                # 没有配置映射时只查本地索引，分析日志的过程中不调用dnf
+                if self.context.package_index is None:
                     return False
-                self.add_buildreq(req)
-                return True
-        for pattern in configuration.make_failed_flags:
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                self.metadata.setdefault("makeFlags", configuration.failed_flags[match.group(1)])
-                return True
+                req = get_req_by_pat(matched.match.group(1), self.context.package_index)
+            if not req:
+                return False
+            return self.add_buildreq(req)
+        matched = self.engine.search(line, "make_flags")
+        if matched:
+            return self.add_flags("makeFlags", self.config.failed_flags[matched.match.group(1)])
         return False
 
     def parse_cmake_message(self, line):
         self.cmake_error_message += line.strip(os.linesep)
-        for pattern in configuration.cmake_failed_pats:
-            pat = re.compile(pattern)
-            match = pat.search(self.cmake_error_message)
-            if match:
-                req = configuration.cmake_modules.get(match.group(1))
-                if req is None:
-                    return False
-                self.add_buildreq(req)
-                return self.compilation == "cmake"
-        for pattern in configuration.cmake_failed_flags:
-            pat = re.compile(pattern)
-            match = pat.search(self.cmake_error_message)
-            if match:
-                cmake_params = "-D" + match.group(1) + "=false"
-                self.metadata.setdefault("cmakeFlags", cmake_params)
-                return self.compilation == "cmake"
+        matched = self.engine.search(self.cmake_error_message, "cmake")
+        if matched:
+            req = self.config.cmake_modules.get(matched.match.group(1))
+            if req is None:
+                return False
+            self.reset_cmake_message()
+            return self.add_buildreq(req) and self.compilation == "cmake"
+        matched = self.engine.search(self.cmake_error_message, "cmake_flags")
+        if matched:
+            cmake_params = "-D" + matched.match.group(1) + "=false"
+            self.reset_cmake_message()
+            return self.add_flags("cmakeFlags", cmake_params) and self.compilation == "cmake"
+
+    def reset_cmake_message(self):
+        """一段cmake错误信息分析完后，继续查找后面的错误"""
+        self.searched_cmake_failed = False
+        self.cmake_error_message = ""
 
     def parse_python_pattern(self, line):
-        for pattern in configuration.pypi_failed_pats:
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                req = match.group(1)
-                self.add_buildreq(req, req_type="python3dist")
-                return True
+        matched = self.engine.search(line, "python")
+        if matched:
+            return self.add_buildreq(matched.match.group(1), req_type="python3dist")
         return False
 
     def parse_ruby_pattern(self, line):
-        for pattern in configuration.ruby_failed_pats:
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                req = match.group(1)
-                self.add_buildreq(req, req_type="rubygem")
-                return True
+        matched = self.engine.search(line, "ruby")
+        if matched:
+            return self.add_buildreq(matched.match.group(1), req_type="rubygem")
         return False
 
     def parse_nodejs_pattern(self, line):
-        for pattern, req in configuration.nodejs_failed_pats:
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                self.add_buildreq(req, req_type="npm")
-                return True
+        matched = self.engine.search(line, "nodejs")
+        if matched:
+            return self.add_buildreq(matched.value, req_type="npm")
         return False
 
     def parse_meson_pattern(self, line):
-        for pattern in configuration.nodejs_failed_pats:
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                req = configuration.meson_failed_pats.get(match.group(1))
-                self.add_buildreq(req)
-                return True
+        matched = self.engine.search(line, "meson")
+        if matched:
+            return self.add_buildreq(matched.match.group(1))
         return False
 
     def parse_go_pattern(self, line):
-        for pattern in configuration.nodejs_failed_pats:
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                req = configuration.meson_failed_pats.get(match.group(1))
-                self.add_buildreq(req)
-                return True
+        matched = self.engine.search(line, "go")
+        if matched:
+            return self.add_buildreq(matched.match.group(1))
         return False
 
     def parse_maven_pattern(self, line):
-        maven_log_analyser = MavenLogAnalysis(self.metadata)
-        result = maven_log_analyser.analysis_single_pattern(line)
-        logger.info("maven restart---------->>>" + str(result))
+        if self.maven_analysis is None:
+            self.maven_analysis = MavenLogAnalysis(self.metadata, context=self.context)
+        self.maven_analysis.metadata = self.metadata
+        before = {key: set(getattr(self.config, key)) for key in maven_fix_types}
+        result = self.maven_analysis.analysis_single_pattern(line)
+        if result:
+            # 删除的插件、禁用的模块等分别记录为修复项，没有新增项时按日志行记录
+            new_fixes = [self.record_fix(key, value, line) for key in maven_fix_types
+                         for value in sorted(getattr(self.config, key) - before[key])]
+            result = any(new_fixes) if new_fixes else self.record_fix("maven", line.strip(), line)
         if result:
-            self.metadata = maven_log_analyser.metadata
-            logger.info("remove_plugins============>>>" + os.linesep.join(configuration.maven_remove_plugins))
-            logger.info("disable_modules============>>>" + os.linesep.join(configuration.maven_disable_modules))
+            logger.info("maven restart---------->>>" + str(result))
+            self.metadata = self.maven_analysis.metadata
+            logger.info("remove_plugins============>>>" + os.linesep.join(self.config.maven_remove_plugins))
+            logger.info("disable_modules============>>>" + os.linesep.join(self.config.maven_disable_modules))
         return result
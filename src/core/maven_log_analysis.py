@@ -9,53 +9,72 @@
 
 import os
 import re
-from src.config.config import configuration
+from src.core.context import default_context
+from src.core.pattern_engine import PatternEngine
 from src.log import logger
 
+pom_jars_pat = r"Could not resolve dependencies for project ([a-zA-Z0-9.:-]+):(jar|war):([0-9a-zA-Z.]+)" \
+               r": The following artifacts could not be resolved:[\s]+([a-zA-Z0-9-_.:]+(, ){0,1}){1,}"
+pom_jar_pat = r"Could not resolve dependencies for project ([a-zA-Z0-9.:-]+):([a-zA-Z0-9.:-]+:)+([0-9a" \
+              r"-zA-Z.]+): Cannot access ([a-zA-Z0-9-]+) \([a-zA-Z0-9.://-]+\) in offline mode and the" \
+              r" artifact ([a-zA-Z0-9.\-:]+):(jar|war)(:[0-9a-zA-Z.]+)?:([0-9a-zA-Z.]+) has not been d" \
+              r"ownloaded from it before"
+pom_plugin_pat = r"Plugin ([a-zA-Z\-.:]+):([0-9.]+) or one of its dependencies could not be resolved"
+pom_plugins_pat = r"Unable to generate requires on unresolvable artifacts: ([a-zA-Z0-9-.:]+(, ){0,1}){1,}"
+pom_plugin_miss_pat = r"The parameters '([a-zA-Z0-9]+)' for goal [a-zA-Z0-9-.:]+:[a-zA-Z]+ are missing or invalid"
+pom_compile_error_pat = r"(on project ([0-9a-zA-Z.-]+): Compilation failure|COMPILATION ERROR)"
+pom_package_not_exist_pat = r"((/[a-zA-Z0-9.-]+)+.[a-zA-Z0-9-]+):(.+) package [0-9a-zA-Z.-]+ does not exist"
+pom_cannot_find_symbol_pat = r"((/[a-zA-Z0-9.-]+)+.[a-zA-Z0-9-]+):\[[0-9,]+\] error: cannot find symbol"
+# pom_system_scope_pat = r"Failed to execute goal (.+) on project .+: Some reactor artifacts have dependencies with scope \"system\". "
+pom_maven_plugin_pat = r"Failed to execute goal org.apache.maven.plugins:(.+?):([0-9.]+)"
+pom_failed_plugin_pat = r"Failed to execute goal ((?!org.apache.maven.plugins)([a-zA-Z0-9.:-]+):(.+?)):([0-9.]+)"
+# pom_non_resolvable_parent_pom_pat = r"Non-resolvable parent POM for ([a-zA-Z0-9.:-]+):([a-zA-Z0-9.:-]+:)+([a-zA-Z0-9.]+): Cannot access ([a-zA-Z0-9-]+) \([a-zA-Z0-9.://-]+\) in offline mode and the artifact (.+):([0-9.]+) has not been downloaded from it before"
+
+# 规则按顺序匹配，值为处理方法名，None表示命中后不需要处理
+maven_failed_pats = [
+    (pom_jars_pat, "failed_pattern_update_by_java_jars"),
+    (pom_jar_pat, "failed_pattern_update_by_java_jar"),
+    (pom_plugin_pat, "failed_pattern_update_by_java_plugin"),
+    (pom_plugins_pat, "failed_pattern_update_by_java_plugins"),
+    (pom_plugin_miss_pat, "failed_pattern_update_by_java_plugin_miss"),
+    (pom_package_not_exist_pat, "add_pom_remove_dir"),
+    (pom_cannot_find_symbol_pat, "add_pom_remove_dir"),
+    (pom_maven_plugin_pat, "add_pom_remove_plugin"),
+    (pom_failed_plugin_pat, "failed_pattern_update_by_java_failed_plugin"),
+    (pom_compile_error_pat, None),
+]
+
+# 处理方法中用到的正则，模块加载时编译一次
+artifacts_line = re.compile(r'The following artifacts could not be resolved:[\s]+(([a-zA-Z0-9-_.:]+(, ){0,1}){1,})')
+artifact_not_downloaded_line = re.compile(
+    r'and the artifact ([a-zA-Z0-9.\-:]+):(jar|war)(:[0-9a-zA-Z.]+)?:([0-9a-zA-Z.]+) has not been downloaded from it before')
+plugin_artifact_line = re.compile(
+    r'and the artifact ([a-zA-Z0-9.\-:]+):(jar|war):([0-9.]+) has not been downloaded from it before')
+goal_line = re.compile(r'goal\s([a-zA-Z0-9-.:]+)')
+package_not_exist_line = re.compile(r'package ([0-9a-zA-Z.-]+) does not exist')
+
+maven_engine = PatternEngine()
+maven_engine.add_table("maven", maven_failed_pats)
+
 
 class MavenLogAnalysis:
-    def __init__(self, metadata):
+    """
+    maven构建日志分析
+    规则只在模块加载时编译一次，每个加包流程复用同一个实例，规则的必需字面量组成预过滤，大部分日志行不需要逐条匹配
+    """
+    def __init__(self, metadata, context=None):
+        self.context = context if context is not None else default_context()
+        self.config = self.context.config
         self.metadata = metadata
-        pom_jars_pat = r"Could not resolve dependencies for project ([a-zA-Z0-9.:-]+):(jar|war):([0-9a-zA-Z.]+)" \
-                             r": The following artifacts could not be resolved:[\s]+([a-zA-Z0-9-_.:]+(, ){0,1}){1,}"
-        pom_jar_pat = r"Could not resolve dependencies for project ([a-zA-Z0-9.:-]+):([a-zA-Z0-9.:-]+:)+([0-9a" \
-                           r"-zA-Z.]+): Cannot access ([a-zA-Z0-9-]+) \([a-zA-Z0-9.://-]+\) in offline mode and the" \
-                           r" artifact ([a-zA-Z0-9.\-:]+):(jar|war)(:[0-9a-zA-Z.]+)?:([0-9a-zA-Z.]+) has not been d" \
-                           r"ownloaded from it before"
-        pom_plugin_pat = r"Plugin ([a-zA-Z\-.:]+):([0-9.]+) or one of its dependencies could not be resolved"
-        pom_plugins_pat = r"Unable to generate requires on unresolvable artifacts: ([a-zA-Z0-9-.:]+(, ){0,1}){1,}"
-        pom_plugin_miss_pat = r"The parameters '([a-zA-Z0-9]+)' for goal [a-zA-Z0-9-.:]+:[a-zA-Z]+ are missing or invalid"
-        pom_compile_error_pat = r"(on project ([0-9a-zA-Z.-]+): Compilation failure|COMPILATION ERROR)"
-        pom_package_not_exist_pat = r"((/[a-zA-Z0-9.-]+)+.[a-zA-Z0-9-]+):(.+) package [0-9a-zA-Z.-]+ does not exist"
-        pom_cannot_find_symbol_pat = r"((/[a-zA-Z0-9.-]+)+.[a-zA-Z0-9-]+):\[[0-9,]+\] error: cannot find symbol"
-        # pom_system_scope_pat = r"Failed to execute goal (.+) on project .+: Some reactor artifacts have dependencies with scope \"system\". "
-        pom_maven_plugin_pat = r"Failed to execute goal org.apache.maven.plugins:(.+?):([0-9.]+)"
-        pom_failed_plugin_pat = r"Failed to execute goal ((?!org.apache.maven.plugins)([a-zA-Z0-9.:-]+):(.+?)):([0-9.]+)"
-        # pom_non_resolvable_parent_pom_pat = r"Non-resolvable parent POM for ([a-zA-Z0-9.:-]+):([a-zA-Z0-9.:-]+:)+([a-zA-Z0-9.]+): Cannot access ([a-zA-Z0-9-]+) \([a-zA-Z0-9.://-]+\) in offline mode and the artifact (.+):([0-9.]+) has not been downloaded from it before"
-        self.analysis_methods = {
-            pom_jars_pat: self.failed_pattern_update_by_java_jars,
-            pom_jar_pat: self.failed_pattern_update_by_java_jar,
-            pom_plugin_pat: self.failed_pattern_update_by_java_plugin,
-            pom_plugins_pat: self.failed_pattern_update_by_java_plugins,
-            pom_plugin_miss_pat: self.failed_pattern_update_by_java_plugin_miss,
-            pom_package_not_exist_pat: self.add_pom_remove_dir,
-            pom_cannot_find_symbol_pat: self.add_pom_remove_dir,
-            pom_maven_plugin_pat: self.add_pom_remove_plugin,
-            pom_failed_plugin_pat: self.failed_pattern_update_by_java_failed_plugin,
-            pom_compile_error_pat: ""
-        }
 
     def analysis_single_pattern(self, line):
-        for pattern, method in self.analysis_methods.items():
-            pat = re.compile(pattern)
-            match = pat.search(line)
-            if match:
-                target = match.group(1)
-                if method == "":
-                    return False
-                logger.info("maven_method: " + pattern)
-                return method(target, line=line)
-        return False
+        if not maven_engine.may_match(line, ["maven"]):
+            return False
+        matched = maven_engine.search(line, "maven")
+        if matched is None or matched.value is None:
+            return False
+        logger.info("maven_method: " + matched.pattern)
+        return getattr(self, matched.value)(matched.match.group(1), line=line)
 
     def failed_pattern_update_by_java_plugin(self, plugin_fullname, line=""):
         plugin_name = plugin_fullname.split(":")[1]
@@ -65,7 +84,7 @@ class MavenLogAnalysis:
         else:
             self.add_pom_remove_plugin(target=plugin_name, line=line)
 
-    def failed_pattern_update_by_java_failed_plugin(self, plugin_fullname):
+    def failed_pattern_update_by_java_failed_plugin(self, plugin_fullname, line=""):
         plugin_name = plugin_fullname.split(":")[1]
         if f'mvn({plugin_fullname})' in self.metadata["buildRequires"]:
             self.add_java_remove_plugins(plugin_name)
@@ -75,15 +94,14 @@ class MavenLogAnalysis:
             return True
 
     def failed_pattern_update_by_java_plugin_miss(self, obj, line=""):
-        match = re.search(r'goal\s([a-zA-Z0-9-.:]+)', line)
+        match = goal_line.search(line)
         pluginFullName = match.group(1)
         pluginName = pluginFullName.split(":")[1]
         self.add_java_remove_plugins(pluginName)
         return True
 
     def add_pom_remove_plugin(self, target=None, line=""):
-        match = re.search(
-            r'and the artifact ([a-zA-Z0-9.\-:]+):(jar|war):([0-9.]+) has not been downloaded from it before', line)
+        match = plugin_artifact_line.search(line)
         if match is None and target is not None:
             jarName = target
         elif match is None:
@@ -93,31 +111,26 @@ class MavenLogAnalysis:
             jarFullName = match.group(1)
             jarName = jarFullName.split(":")[1]
         logger.info("jarName: " + jarName)
-        modulePomNames = self.get_modules_and_pom_by_jar_name(jarName)
-        remove_plugins = []
-        remove_plugins_root_pom = False
-        for modulePomName in modulePomNames:
-            if modulePomName != "pom_xml" and "pom_xml" in modulePomName:
-                remove_plugins.append("{} {}".format(jarName, modulePomName.replace('/pom_xml', '')))
-            if modulePomName == "pom_xml":
-                remove_plugins_root_pom = True
-                break
-        if remove_plugins_root_pom:
+        module_dirs = self.get_modules_and_pom_by_jar_name(jarName)
+        reactor = self.context.pom_reactor
+        root_dir = reactor.modules[0].module_dir if reactor is not None and reactor.modules else ""
+        # 根pom中声明的插件直接删除，否则只在声明了该插件的模块中删除
+        if root_dir in module_dirs:
             self.add_java_remove_plugins(jarName)
             return True
-        else:
-            for remove_plugin in remove_plugins:
-                self.add_java_remove_plugins(remove_plugin)
-            return len(remove_plugins) > 0
+        for module_dir in module_dirs:
+            self.add_java_remove_plugins("{} {}".format(jarName, module_dir))
+        return len(module_dirs) > 0
 
     def add_pom_disable_module(self, jar_name):
-        modulePomNames = self.get_modules_and_pom_by_jar_name(jar_name)
-        module_dir = modulePomNames[0].split('/')[0]
-        self.add_java_disable_modules(module_dir)
+        module_dirs = self.get_modules_and_pom_by_jar_name(jar_name)
+        if not module_dirs:
+            return False
+        self.add_java_disable_modules(module_dirs[0].split('/')[0])
         return True
 
     def failed_pattern_update_by_java_jars(self, module_fullname, line):
-        match = re.search(r'The following artifacts could not be resolved:[\s]+(([a-zA-Z0-9-_.:]+(, ){0,1}){1,})', line)
+        match = artifacts_line.search(line)
         jarFullNamesStr = match.group(1)
         jarFullNames = jarFullNamesStr.split(", ")
         for jarFullName in jarFullNames:
@@ -127,19 +140,20 @@ class MavenLogAnalysis:
     def process_single_java_jar(self, jar_fullname, module_fullname):
         jarName = jar_fullname.split(":")[1]
 
-        if jarName in configuration.maven_disable_modules:
+        if jarName in self.config.maven_disable_modules:
             self.add_pom_disable_module(module_fullname.split(":")[1])
             return
 
-    def failed_pattern_update_by_java_plugins(self, line):
+    def failed_pattern_update_by_java_plugins(self, artifact, line=""):
         artifacts = line.split(": ")[2].split(", ")
         for pluginFullName in artifacts:
             pluginName = pluginFullName.split(":")[1]
             self.add_java_remove_plugins(pluginName)
+        return True
 
     def add_pom_remove_dir(self, full_path, line):
         if 'does not exist' in line:
-            match = re.search(r'package ([0-9a-zA-Z.-]+) does not exist', line)
+            match = package_not_exist_line.search(line)
             if match:
                 moduleName = full_path.split("/")[5]
                 self.add_java_disable_modules(moduleName)
@@ -160,48 +174,44 @@ class MavenLogAnalysis:
             # self.add_java_remove_deps("{}:{} {}".format(group_id, artifact_id, pom_path))
 
     def failed_pattern_update_by_java_jar(self, module_fullname, line):
-        match = re.search(
-            r'and the artifact ([a-zA-Z0-9.\-:]+):(jar|war)(:[0-9a-zA-Z.]+)?:([0-9a-zA-Z.]+) has not been downloaded from it before',
-            line)
+        match = artifact_not_downloaded_line.search(line)
         self.process_single_java_jar(match.group(1), module_fullname)
 
-    @staticmethod
-    def add_java_remove_plugins(plugin):
+    def add_java_remove_plugins(self, plugin):
         if not plugin:
             return False
         plugin.strip()
-        if plugin in configuration.maven_remove_plugins:
+        if plugin in self.config.maven_remove_plugins:
             return False
-        configuration.maven_remove_plugins.add(plugin)
+        self.config.maven_remove_plugins.add(plugin)
         return True
 
-    @staticmethod
-    def add_java_disable_modules(module):
+    def add_java_disable_modules(self, module):
         if not module:
             return False
         module.strip()
-        if module in configuration.maven_disable_modules:
+        if module in self.config.maven_disable_modules:
             return False
-        configuration.maven_disable_modules.add(module)
+        self.config.maven_disable_modules.add(module)
         return True
 
-    @staticmethod
-    def add_java_remove_dir(directory):
+    def add_java_remove_dir(self, directory):
         if not directory:
             return False
         directory.strip()
-        if dir in configuration.maven_delete_dirs:
+        if directory in self.config.maven_delete_dirs:
             return False
-        configuration.maven_delete_dirs.add(directory)
+        self.config.maven_delete_dirs.add(directory)
         return True
 
     def get_modules_and_pom_by_jar_name(self, jar_name):
-        pom_names = []
-        for pom_name in self.metadata:
-            if "pom_xml" in pom_name and isinstance(self.metadata[pom_name], dict):
-                if "build" in self.metadata[pom_name] and "plugins" in self.metadata[pom_name]["build"]:
-                    for plugin in self.metadata[pom_name]["build"]["plugins"]["plugin"]:
-                        if isinstance(plugin, dict) and plugin["artifactId"] == jar_name:
-                            logger.info("================>>>>" + jar_name)
-                            pom_names.append(pom_name)
-        return pom_names
+        """在上下文的pom信息中查找声明了该插件的模块目录"""
+        reactor = self.context.pom_reactor
+        if reactor is None:
+            return []
+        module_dirs = []
+        for model in reactor.models.values():
+            if any(plugin["artifactId"] == jar_name for plugin in model.plugins):
+                logger.info("================>>>>" + jar_name)
+                module_dirs.append(model.module_dir)
+        return module_dirs
@@ -0,0 +1,206 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import re
+from collections import namedtuple
+from src.log import logger
+
+try:
+    import re._parser as sre_parse
+    from re._constants import LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, GROUPREF, GROUPREF_EXISTS
+except ImportError:
+    import sre_parse
+    from sre_constants import LITERAL, SUBPATTERN, MAX_REPEAT, MIN_REPEAT, GROUPREF, GROUPREF_EXISTS
+
+PatternMatch = namedtuple("PatternMatch", ["table", "pattern", "value", "match"])
+PatternEntry = namedtuple("PatternEntry", ["table", "pattern", "value", "regex", "literal", "combinable"])
+
+min_literal_length = 3
+
+
+def _required_literals(items, flags=0):
+    """找出正则匹配时必须出现的字面量片段"""
+    literals = []
+    current = []
+    for op, av in items:
+        if op is LITERAL and not flags & re.IGNORECASE:
+            current.append(chr(av))
+            continue
+        if current:
+            literals.append("".join(current))
+            current = []
+        if op is SUBPATTERN:
+            add_flags = av[1]
+            literals.extend(_required_literals(av[-1], flags | add_flags))
+        elif op in (MAX_REPEAT, MIN_REPEAT) and av[0] >= 1:
+            literals.extend(_required_literals(av[2], flags))
+    if current:
+        literals.append("".join(current))
+    return literals
+
+
+def _has_group_ref(items):
+    for op, av in items:
+        if op in (GROUPREF, GROUPREF_EXISTS):
+            return True
+        if op is SUBPATTERN and _has_group_ref(av[-1]):
+            return True
+        if op in (MAX_REPEAT, MIN_REPEAT) and _has_group_ref(av[2]):
+            return True
+    return False
+
+
+def analyse_pattern(pattern):
+    """
+    分析正则，返回(最长的必需字面量, 能否合并到预过滤正则中)
+    没有足够长的字面量时返回None，匹配时需要逐行检查
+    """
+    parsed = sre_parse.parse(pattern)
+    literals = [literal for literal in _required_literals(parsed, parsed.state.flags)
+                if len(literal) >= min_literal_length]
+    # 反向引用和全局内联标记(如"(?i)")放进组合正则后语义会改变
+    combinable = not _has_group_ref(parsed) and not parsed.state.flags & ~(re.UNICODE | re.ASCII)
+    return (max(literals, key=len) if literals else None), combinable
+
+
+def trie_regex(literals):
+    """把字面量列表转换为按公共前缀合并的正则，避免逐个尝试上百个分支"""
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return ""
+        optional = "" in node
+        branches = []
+        for char in sorted(key for key in node if key != ""):
+            branches.append(re.escape(char) + build(node[char]))
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        result = "(?:" + "|".join(branches) + ")"
+        return result + "?" if optional else result
+
+    return build(trie)
+
+
+class PatternEngine:
+    """
+    构建日志的多规则匹配引擎
+    所有规则表只编译一次，由规则中的必需字面量组成预过滤正则，只有命中预过滤的行才逐条匹配规则
+    """
+    def __init__(self):
+        self.tables = {}
+        self.filters = {}
+
+    def add_table(self, name, patterns):
+        """
+        添加规则表，patterns可以是正则列表、{正则: 值}字典或[(正则, 值)]列表
+        规则匹配顺序与传入顺序一致
+        """
+        if isinstance(patterns, dict):
+            items = list(patterns.items())
+        else:
+            items = [pattern if isinstance(pattern, (tuple, list)) else (pattern, None) for pattern in patterns]
+        entries = []
+        for pattern, value in items:
+            try:
+                regex = re.compile(pattern)
+                literal, combinable = analyse_pattern(pattern)
+            except re.error as e:
+                logger.warning(f"skip invalid pattern {pattern!r} in {name}: {e}")
+                continue
+            entries.append(PatternEntry(name, pattern, value, regex, literal, combinable))
+        self.tables[name] = entries
+        self.filters.clear()
+        return entries
+
+    def prefilter(self, tables):
+        """组合多个规则表的预过滤正则，存在无法预过滤的规则时返回None"""
+        key = tuple(tables)
+        if key in self.filters:
+            return self.filters[key]
+        literals = set()
+        alternatives = []
+        for table in tables:
+            for entry in self.tables.get(table, []):
+                if entry.literal is not None:
+                    literals.add(entry.literal)
+                elif entry.combinable:
+                    alternatives.append(f"(?:{entry.pattern})")
+                else:
+                    self.filters[key] = None
+                    return None
+        if literals:
+            # 只需判断是否命中，字面量按公共前缀合并为一个前缀树正则
+            alternatives.insert(0, trie_regex(literals))
+        try:
+            combined = re.compile("|".join(alternatives) if alternatives else r"(?!x)x", re.MULTILINE)
+        except re.error:
+            combined = None
+        self.filters[key] = combined
+        return combined
+
+    def may_match(self, line, tables):
+        """预过滤，返回False时该行一定不会命中任何规则"""
+        combined = self.prefilter(tables)
+        return combined is None or combined.search(line) is not None
+
+    def search(self, line, table):
+        """按规则顺序返回该行第一个命中的规则"""
+        for entry in self.tables.get(table, []):
+            if entry.literal is not None and entry.literal not in line:
+                continue
+            match = entry.regex.search(line)
+            if match:
+                return PatternMatch(table, entry.pattern, entry.value, match)
+        return None
+
+    def search_all(self, line, tables):
+        """返回该行在各个规则表中所有命中的规则"""
+        result = []
+        for table in tables:
+            for entry in self.tables.get(table, []):
+                if entry.literal is not None and entry.literal not in line:
+                    continue
+                match = entry.regex.search(line)
+                if match:
+                    result.append(PatternMatch(table, entry.pattern, entry.value, match))
+        return result
+
+    def candidate_lines(self, text, tables):
+        """
+        对整段日志做一次预过滤扫描，依次返回可能命中规则的行
+        每次命中后从下一行开始继续查找，避免跨行匹配吞掉后续的行
+        """
+        combined = self.prefilter(tables)
+        if combined is None:
+            yield from text.splitlines(keepends=True)
+            return
+        pos = 0
+        length = len(text)
+        while pos < length:
+            match = combined.search(text, pos)
+            if match is None:
+                return
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.start())
+            end = length if end == -1 else end + 1
+            yield text[start:end]
+            pos = end
+
+    def scan(self, text, tables):
+        """单次扫描整段日志，返回(行, 命中规则列表)"""
+        for line in self.candidate_lines(text, tables):
+            matches = self.search_all(line, tables)
+            if matches:
+                yield line, matches
@@ -8,6 +8,7 @@ class Source(object):
         self.language = ""
         self.group = ""
         self.files = []
+        self.index = None
 
 
 source = Source()
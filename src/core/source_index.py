@@ -0,0 +1,141 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+
+# 不需要参与探测的目录，只记录目录名，不继续遍历
+pruned_dirs = {".git", ".svn", ".hg", "node_modules", "vendor"}
+
+
+def file_ext(file):
+    return os.path.splitext(file)[1].lower()
+
+
+class SourceIndex:
+    """
+    源码文件索引
+    只遍历一次源码目录，按文件名、扩展名和目录深度分组，构建系统探测和各解析器共用
+    """
+    def __init__(self, root, files, sizes=None, children=None):
+        self.root = root
+        self.files = files
+        self.sizes = sizes or {}
+        self.children = children or {}
+        self.by_name = {}
+        self.by_ext = {}
+        self.by_depth = {}
+        for file in files:
+            depth = file.count("/")
+            self.by_name.setdefault(os.path.basename(file), []).append(file)
+            self.by_ext.setdefault(file_ext(file), []).append(file)
+            self.by_depth.setdefault(depth, []).append(file)
+        for paths in self.by_name.values():
+            paths.sort(key=lambda path: path.count("/"))
+
+    @classmethod
+    def from_entries(cls, root, files, dirs=(), prune=None):
+        """由已知的文件列表[(相对路径, 大小)]构建索引，如解压时记录的成员列表，不再访问文件系统"""
+        prune = pruned_dirs if prune is None else prune
+        kept = []
+        sizes = {}
+        children = {"": []}
+        seen = set()
+
+        def add_entry(path, is_dir):
+            if path in seen:
+                return
+            seen.add(path)
+            parent, _, name = path.rpartition("/")
+            if parent:
+                add_entry(parent, True)
+            children.setdefault(parent, []).append((name, is_dir))
+            if is_dir:
+                children.setdefault(path, [])
+
+        for path in dirs:
+            add_entry(path, True)
+        for path, size in files:
+            add_entry(path, False)
+            if any(part in prune for part in path.split("/")[:-1]):
+                continue
+            kept.append(path)
+            sizes[path] = size
+        return cls(root, kept, sizes, children)
+
+    @classmethod
+    def scan(cls, root, prune=None):
+        """用os.scandir遍历一次源码目录，prune中的目录不再向下遍历"""
+        prune = pruned_dirs if prune is None else prune
+        files = []
+        sizes = {}
+        children = {}
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            entries = []
+            sub_dirs = []
+            try:
+                with os.scandir(os.path.join(root, rel_dir)) as it:
+                    for entry in it:
+                        rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                        is_dir = entry.is_dir()
+                        entries.append((entry.name, is_dir))
+                        if is_dir:
+                            if entry.name not in prune and not entry.is_symlink():
+                                sub_dirs.append(rel_path)
+                            continue
+                        files.append(rel_path)
+                        try:
+                            sizes[rel_path] = entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            sizes[rel_path] = 0
+            except OSError:
+                continue
+            children[rel_dir] = entries
+            stack.extend(reversed(sub_dirs))
+        return cls(root, files, sizes, children)
+
+    def has_file(self, name, depth=None):
+        """是否存在该文件名，depth为0时只查找顶层目录"""
+        return bool(self.find(name, depth))
+
+    def find(self, name, depth=None):
+        """按文件名查找，结果按目录深度从浅到深排列"""
+        paths = self.by_name.get(name, [])
+        if depth is None:
+            return list(paths)
+        return [path for path in paths if path.count("/") == depth]
+
+    def shallowest(self, name, max_depth=None):
+        """返回目录层级最浅的同名文件，找不到时返回空字符串"""
+        paths = self.by_name.get(name)
+        if not paths or (max_depth is not None and paths[0].count("/") > max_depth):
+            return ""
+        return paths[0]
+
+    def with_ext(self, ext, depth=None):
+        """按扩展名查找，ext可以带或不带"."前缀"""
+        ext = ext.lower() if ext.startswith(".") else "." + ext.lower()
+        paths = self.by_ext.get(ext, [])
+        if depth is None:
+            return list(paths)
+        return [path for path in paths if path.count("/") == depth]
+
+    def at_depth(self, depth):
+        return list(self.by_depth.get(depth, []))
+
+    def entries(self, rel_dir=""):
+        """目录下的(名称, 是否目录)列表，与os.listdir的顺序一致"""
+        return list(self.children.get(rel_dir.strip("/"), []))
+
+    def size(self, path):
+        return self.sizes.get(path, 0)
+
+    def total_size(self):
+        return sum(self.sizes.values())
@@ -7,28 +7,19 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
-import os
-import yaml
 from src.parse.basic_parse import BasicParse
-from src.config.config import configuration
+from src.utils.yaml_loader import load_template
+from src.parse.static_requires import scan_static_requires
 
 
 class AutogenParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
-        self.shell_compile_files = ["autogen.sh", "build.sh", "compile.sh"]
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         self.build_system = "autogen"
         self.version = version if version != "" else source.version
         self.source = source
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
 
-    def check_compilation_file(self):
-        for shell_compile_file in self.shell_compile_files:
-            if shell_compile_file in self.source.files:
-                return True
-        return False
-
-    def check_compilation(self):
-        return self.check_compilation_file()
+    def scan_build_requires(self, package_index=None):
+        """静态分析构建文件中的依赖，用于第0轮构建之前"""
+        return scan_static_requires(self.build_system, self.source.index, self.config, package_index)
@@ -9,38 +9,22 @@
 
 import os
 import re
-import yaml
 from src.parse.basic_parse import BasicParse
-from src.utils.cmd_util import check_makefile_exist
-from src.config.config import configuration
+from src.utils.yaml_loader import load_template
+from src.parse.static_requires import scan_static_requires
 
 
 class AutotoolsParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         self.build_system = "autotools" # use buildSystem?
         self.version = version if version != "" else source.version
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
-        self.configure_path = ""
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
         self.source = source
 
-    def check_compilation_file(self):
-        if "autopkg" in self.metadata and "buildSystemFiles" in self.metadata["autopkg"]:
-            build_system_file = self.metadata["autopkg"]["buildSystemFiles"]
-            if build_system_file in self.source.files:
-                return True
-            if "configure" not in self.source.files:
-                self.configure_path = check_makefile_exist(self.source.files, file_name="configure")
-                if self.configure_path != "":
-                    self.metadata["configurePath"] = self.configure_path
-                return self.configure_path != ""
-            return True
-        return False
-
-    def check_compilation(self):
-        return self.check_compilation_file()
+    def scan_build_requires(self, package_index=None):
+        """静态分析构建文件中的依赖，用于第0轮构建之前"""
+        return scan_static_requires(self.build_system, self.source.index, self.config, package_index)
 
     def fix_name_version(self, path):
         if "autopkg" in self.metadata and "buildSystemFiles" in self.metadata["autopkg"]:
@@ -12,15 +12,21 @@ import re
 import yaml
 from src.log import logger
 from src.utils.scanner import scan_for_meta, scan_for_license
-from src.config.config import configuration
+from src.utils.yaml_loader import load_template
+from src.core.context import default_context
 
 
 class BasicParse:
-    def __init__(self, source):
+    def __init__(self, source, context=None):
+        self.context = context if context is not None else default_context(source)
+        self.config = self.context.config
         self.language = ""
         self.compilation = ""
         self.url = source.url
         self.dirn = source.path
+        self.index = None
+        if source.index is not None and os.path.normpath(source.index.root) == os.path.normpath(source.path or "."):
+            self.index = source.index
         self.version = source.version
         self.license = ""
         self.release = source.release
@@ -37,11 +43,11 @@ class BasicParse:
     def init_metadata(self):
         if self.url == "" and self.pacakge_name:
             self.url = f"https://localhost:8000/{self.pacakge_name}-{self.version}.tar.gz"
-        self.metadata.setdefault("meta", scan_for_meta(self.dirn))
+        self.metadata.setdefault("meta", scan_for_meta(self.dirn, index=self.index))
         self.metadata.setdefault("name", self.pacakge_name)
         self.metadata.setdefault("version", self.version)
         self.metadata.setdefault("homepage", self.url)
-        self.metadata.setdefault("license", scan_for_license(self.dirn))
+        self.metadata.setdefault("license", scan_for_license(self.dirn, index=self.index))
         self.metadata.setdefault("sources", {}).setdefault("0", self.url)
         self.metadata.setdefault("release", self.release)
         self.files.setdefault("files", set())
@@ -82,7 +88,7 @@ class BasicParse:
 
     def parse_mapping_result(self):
         requires = []
-        mapping_result_path = os.path.join(configuration.download_path, "package-mapping-result.yaml")
+        mapping_result_path = os.path.join(self.config.download_path, "package-mapping-result.yaml")
         if os.path.exists(mapping_result_path):
             with open(mapping_result_path, "r") as f:
                 mapping_result_content = f.read()
@@ -96,9 +102,7 @@ class BasicParse:
             self.metadata.setdefault("buildRequires", requires)
 
     def get_basic_info(self, build_system):
-        with open(os.path.join(configuration.yaml_path, f"{build_system}.yaml"), "r") as f:
-            content = f.read()
-        self.metadata.update(yaml.safe_load(content))
+        self.metadata.update(load_template(self.config.yaml_path, build_system))
         self.init_metadata()
 
     def generate_metadata(self):
@@ -7,30 +7,24 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
-import os
 import sys
-import yaml
 from bs4 import BeautifulSoup
 import requests
 from src.parse.basic_parse import BasicParse
+from src.utils.yaml_loader import load_template
 from src.log import logger
-from src.utils.cmd_util import has_file_type
-from src.config.config import configuration
 
 
 class GolangParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         name = source.name
         self.version = version if version != "" else source.version
         self.url_template = "https://pkg.go.dev/"
         self.url_template_with_ver = f'https://pkg.go.dev/{name}/{version}/json'
-        self.go_path = ""
         self.build_system = "go"
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
         self.source = source
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
 
     def parse_api_info(self):
         if not self.version:
@@ -63,24 +57,3 @@ class GolangParse(BasicParse):
             "sources": {0: url_tag['href']},
             "buildSystem": "golang"
         }
-
-    def check_compilation_file(self):
-        if has_file_type(self.source.path, "go"):
-            has_mod = False
-            has_sum = False
-            m = 0
-            n = 0
-            for file in self.source.files:
-                if "/" not in file and file.endswith(".mod"):
-                    has_mod = True
-                    m += 1
-                if "/" not in file and file.endswith(".sum"):
-                    has_sum = True
-                    n += 1
-            if m > 1 or n > 1:
-                return False
-            return has_mod and has_sum
-        return False
-
-    def check_compilation(self):
-        return self.check_compilation_file()
@@ -7,34 +7,14 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
-import os
-import yaml
 from src.parse.basic_parse import BasicParse
-from src.utils.cmd_util import check_makefile_exist
-from src.config.config import configuration
+from src.utils.yaml_loader import load_template
 
 
 class MakeParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         self.build_system = "make"  # use buildSystem?
         self.version = version if version != "" else source.version
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
-        self.make_path = ""
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
         self.source = source
-
-    def check_compilation_file(self,):
-        if "autopkg" in self.metadata and "buildSystemFiles" in self.metadata["autopkg"]:
-            build_system_file = self.metadata["autopkg"]["buildSystemFiles"]
-            if build_system_file not in self.source.files:
-                self.make_path = check_makefile_exist(self.source.files)
-                if self.make_path != "":
-                    self.metadata["makePath"] = self.make_path
-                return self.make_path != ""
-            return True
-        return False
-
-    def check_compilation(self):
-        return self.check_compilation_file()
@@ -9,31 +9,25 @@
 
 import os
 import sys
-import re
-import yaml
 import requests
-from lxml import etree
 from src.parse.basic_parse import BasicParse
+from src.utils.yaml_loader import load_template
 from src.utils.cmd_util import check_makefile_exist
-from src.config.config import configuration
+from src.parse.pom_model import PomReactor, pre_resolve
 from src.log import logger
 
 
 class MavenParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         if source.group == "" and source.path == "":
             logger.error("lack of groupId input")
             sys.exit(6)
         self.build_system = "maven"
-        self.maven_path = ""
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
         self.version = version if version != "" else source.version
         self.group = source.group
         self.source = source
-        self.pom_properties = {}
         self.ns = {"ns": "http://maven.apache.org/POM/4.0.0"}
         self.spec_map = {'@groovyGroupId@': 'org.codehaus.groovy'}
         self.__url = f"https://repo1.maven.org/maven2/{self.group}/{self.pacakge_name}/{self.version}/" \
@@ -63,38 +57,33 @@ class MavenParse(BasicParse):
         else:
             print("Error:", response.status_code)
 
-    def check_compilation_file(self):
-        if "autopkg" in self.metadata and "buildSystemFiles" in self.metadata["autopkg"]:
-            build_system_file = self.metadata["autopkg"]["buildSystemFiles"]
-            if build_system_file not in self.source.files:
-                self.maven_path = check_makefile_exist(self.source.files, file_name="pom.xml")
-                return self.maven_path != ""
-            return True
-        return False
-
-    def check_compilation(self):
-        result = self.check_compilation_file()
-        if result:
-            self.parse_all_pom()
-        return result
+    def root_pom(self):
+        if "pom.xml" in self.source.files:
+            return "pom.xml"
+        return check_makefile_exist(self.source.files, file_name="pom.xml", index=self.source.index)
 
     def parse_all_pom(self):
-        for file in self.source.files:
-            if file.endswith("pom.xml"):
-                with open(os.path.join(self.source.path, file), "r") as f:
-                    content = f.read().encode("utf-8")
-                parser = etree.XMLParser(remove_blank_text=True)
-                root = etree.fromstring(content, parser)
-                pom_info = self.parse_xml2dict(root)
-                if "properties" in pom_info:
-                    self.pom_properties = self.trans_params(pom_info["properties"])
-                    pom_info = self.trans_params(pom_info)
-                if file.count("/") > 1:
-                    keys = file.rsplit("/", 2)[1:]
-                    keywords = "_".join(keys)
-                else:
-                    keywords = file.replace("/", "_")
-                self.metadata[keywords.replace("pom.xml", "pom_xml")] = pom_info
+        """并行流式解析所有pom.xml，只保留需要的部分在上下文中，不写入metadata"""
+        paths = [file for file in self.source.files if os.path.basename(file) == "pom.xml"]
+        reactor = PomReactor(self.source.path, self.root_pom() or "pom.xml", paths=paths,
+                             workers=self.config.maven_parse_workers)
+        self.context.pom_reactor = reactor
+        return reactor
+
+    def scan_build_requires(self, package_index=None):
+        """第0轮之前解析所有模块的依赖，不可用的插件直接加入删除列表"""
+        reactor = self.context.pom_reactor
+        if reactor is None:
+            root_pom = self.root_pom()
+            if not root_pom:
+                return []
+            reactor = PomReactor(self.source.path, root_pom)
+        requires, remove_plugins = pre_resolve(reactor, package_index)
+        for plugin in remove_plugins:
+            if plugin not in self.config.maven_remove_plugins:
+                logger.info(f"remove unavailable plugin {plugin} before build")
+                self.config.maven_remove_plugins.add(plugin)
+        return requires
 
     def remove_plugin_config(self, name):
         self.metadata.setdefault("removePlugin", []).append(name)
@@ -102,53 +91,3 @@ class MavenParse(BasicParse):
     def disable_module_config(self, name):
         self.metadata.setdefault("disableModule", []).append(name)
 
-    def parse_xml2dict(self, node):
-        result = {}
-        if node.text and node.text.strip():
-            result = node.text.strip()
-        for child in node:
-            if hasattr(child, "tag") and isinstance(child.tag, str):
-                if "}" in child.tag:
-                    keywords = child.tag.split("}")[-1]
-                else:
-                    keywords = child.tag
-                value = self.parse_xml2dict(child)
-                if keywords in result:
-                    if not isinstance(result[keywords], list):
-                        result[keywords] = [result[keywords]]
-                    result[keywords].append(value)
-                else:
-                    result[keywords] = value
-        return result
-
-    def trans_params(self, dict_info: dict):
-        tmp_dict_info = dict_info.copy()
-        for k, value in tmp_dict_info.items():
-            if isinstance(value, str) and re.search(r"\$\{.+}", value):
-                dict_info[k] = self.change_param_value(value)
-            elif isinstance(value, list):
-                dict_info[k] = self.trans_params_list(value)
-            elif isinstance(value, dict):
-                dict_info[k] = self.trans_params(value)
-        return dict_info
-
-    def trans_params_list(self, list_info: list):
-        tmp_list_info = list_info.copy()
-        for i, single in enumerate(tmp_list_info):
-            if isinstance(single, str) and re.search(r"\$\{.+}", single):
-                list_info[i] = self.change_param_value(single)
-            elif isinstance(single, dict):
-                list_info[i] = self.trans_params(single)
-            elif isinstance(single, list):
-                list_info[i] = self.trans_params_list(single)
-        return list_info
-
-    def change_param_value(self, value: str):
-        target_value = value
-        params = re.findall(r"\$\{.+}", value)
-        for param in params:
-            base_param = param.replace("${", "").replace("}", "")
-            if base_param in self.pom_properties:
-                target_value = value.replace(param, self.pom_properties[base_param])
-        return target_value
-
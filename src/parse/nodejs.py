@@ -7,26 +7,20 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
-import os
-import yaml
 import sys
 import requests
 from src.parse.basic_parse import BasicParse
+from src.utils.yaml_loader import load_template
 from src.log import logger
-from src.utils.cmd_util import check_makefile_exist, infer_language, has_file_type
-from src.config.config import configuration
 
 
 class NodejsParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         self.version = version if version != "" else source.version
         self.__url = f"https://registry.npmjs.org/{self.pacakge_name}/{self.version}"
         self.build_system = "nodejs"
-        self.npm_path = ""
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
         self.source = source
 
     def parse_api_info(self):
@@ -71,18 +65,3 @@ class NodejsParse(BasicParse):
         else:
             logger.error("can't get license from upstream")
             sys.exit(5)
-
-    def check_compilation_file(self):
-        if "autopkg" in self.metadata and "buildSystemFiles" in self.metadata["autopkg"]:
-            build_system_file = self.metadata["autopkg"]["buildSystemFiles"]
-            if not has_file_type(self.source.path, ".js"):
-                return False
-            if build_system_file not in self.source.files:
-                self.npm_path = check_makefile_exist(self.source.files, build_system_file)
-                if self.npm_path != "":
-                    return infer_language(self.source.files) == "nodejs"
-            return True
-        return False
-
-    def check_compilation(self):
-        return self.check_compilation_file()
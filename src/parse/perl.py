@@ -7,27 +7,22 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
-import os
 import sys
-import yaml
 import requests
 from src.parse.basic_parse import BasicParse
+from src.utils.yaml_loader import load_template
 from src.log import logger
-from src.config.config import configuration
 
 
 class PerlParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         self.language = "perl"
         self.build_requires.add("perl")
         self.version = version if version != "" else source.version
         self.__url = f"https://fastapi.metacpan.org/v1/pod/{self.pacakge_name}"  # Moose
         self.build_system = "perl"
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
-        self.metadata = yaml.safe_load(yaml_text)
-        self.perl_path = ""
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
         self.source = source
 
     def parse_api_info(self):
@@ -50,21 +45,8 @@ class PerlParse(BasicParse):
             "buildSystem": "perl"
         }
 
-    def check_compilation_file(self):
-        count = 0
-        for file in self.source.files:
-            if file.endswith(".pl"):
-                count += 1
-            if count > 10:
-                return True
-        return False
-
-
     def get_summary_from_content(self, text):
         return ""
 
     def get_description_from_content(self, text):
         return ""
-
-    def check_compilation(self):
-        return self.check_compilation_file()
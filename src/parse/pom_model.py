@@ -0,0 +1,341 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+from src.log import logger
+
+default_plugin_group = "org.apache.maven.plugins"
+# maven生命周期默认绑定的插件，即使去掉声明也仍然会被使用，不作为删除候选
+lifecycle_plugins = {"maven-clean-plugin", "maven-resources-plugin", "maven-compiler-plugin", "maven-surefire-plugin",
+                     "maven-jar-plugin", "maven-war-plugin", "maven-install-plugin", "maven-deploy-plugin",
+                     "maven-site-plugin"}
+skip_scopes = {"system", "import"}
+property_pat = re.compile(r"\$\{([^}]+)}")
+# pom文件数达到该值时才并行解析
+parallel_threshold = 32
+project_fields = {"groupId": "group_id", "artifactId": "artifact_id", "version": "version", "packaging": "packaging"}
+coordinate_keys = ("groupId", "artifactId", "version", "scope", "optional")
+# 需要提取的依赖和插件所在的路径，profiles和pluginManagement中的声明不提取
+artifact_paths = {
+    ("project", "dependencies", "dependency"): "dependencies",
+    ("project", "dependencyManagement", "dependencies", "dependency"): "managed",
+    ("project", "build", "plugins", "plugin"): "plugins",
+}
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+class PomModel:
+    """单个pom.xml中预解析依赖和分析日志所需的部分，不写入metadata"""
+    def __init__(self, path):
+        self.path = path
+        self.group_id = ""
+        self.artifact_id = ""
+        self.version = ""
+        self.packaging = "jar"
+        # (groupId, artifactId, version, relativePath)
+        self.parent = None
+        self.parent_model = None
+        self.properties = {}
+        self.modules = []
+        self.dependencies = []
+        self.managed = []
+        self.plugins = []
+
+    @property
+    def module_dir(self):
+        return os.path.dirname(self.path)
+
+
+def read_pom(root, path):
+    """
+    流式读取pom.xml，只提取坐标、父pom、属性、模块、依赖和构建插件，其余元素读完即释放
+    path为相对源码根目录的路径
+    """
+    model = PomModel(path)
+    parent = {}
+    item = None
+    stack = []
+    for event, elem in etree.iterparse(os.path.join(root, path), events=("start", "end"), remove_comments=True,
+                                       remove_pis=True, recover=True):
+        if event == "start":
+            stack.append(local_name(elem.tag))
+            if tuple(stack) in artifact_paths:
+                item = dict.fromkeys(coordinate_keys, "")
+            continue
+        key = tuple(stack)
+        text = (elem.text or "").strip()
+        if len(stack) == 2 and stack[1] in project_fields:
+            setattr(model, project_fields[stack[1]], text)
+        elif len(stack) == 3 and stack[1] == "parent":
+            parent[stack[2]] = text
+        elif len(stack) == 3 and stack[1] == "properties":
+            model.properties[stack[2]] = text
+        elif key == ("project", "modules", "module"):
+            model.modules.append(text)
+        elif key in artifact_paths:
+            getattr(model, artifact_paths[key]).append(item)
+            item = None
+        elif item is not None and key[:-1] in artifact_paths and stack[-1] in coordinate_keys:
+            item[stack[-1]] = text
+        stack.pop()
+        elem.clear()
+    if parent:
+        model.parent = (parent.get("groupId", ""), parent.get("artifactId", ""), parent.get("version", ""),
+                        parent.get("relativePath", "../pom.xml"))
+    model.packaging = model.packaging or "jar"
+    return model
+
+
+def try_read_pom(root, path):
+    try:
+        return read_pom(root, path)
+    except (OSError, etree.XMLSyntaxError) as e:
+        logger.warning(f"can't parse {path}: {e}")
+        return None
+
+
+def read_poms(root, paths, workers=1):
+    """读取多个pom.xml，文件较多时由多个进程并行解析，返回{路径: PomModel}"""
+    paths = list(dict.fromkeys(paths))
+    # 守护进程(如批量模式的工作进程)不能再创建子进程
+    if workers <= 1 or len(paths) < parallel_threshold or multiprocessing.current_process().daemon:
+        models = [try_read_pom(root, path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            models = list(executor.map(try_read_pom, [root] * len(paths), paths, chunksize=16))
+    return {path: model for path, model in zip(paths, models) if model is not None}
+
+
+class PropertyResolver:
+    """
+    单个模块的属性作用域，查找顺序为模块自身、父pom链、内置属性
+    父pom中定义的属性也在当前模块的作用域中解析，嵌套的属性递归解析并缓存，循环引用的属性保持原样
+    """
+    def __init__(self, properties, parent=None, builtins=None):
+        self.properties = properties
+        self.parent = parent
+        self.builtins = builtins or {}
+        self.cache = {}
+        self.resolving = set()
+
+    def lookup(self, name):
+        scope = self
+        while scope is not None:
+            if name in scope.properties:
+                return scope.properties[name]
+            scope = scope.parent
+        return self.builtins.get(name)
+
+    def resolve(self, name):
+        """返回属性解析后的值，未定义或循环引用时返回None"""
+        if name in self.cache:
+            return self.cache[name]
+        value = self.lookup(name)
+        if value is None:
+            return None
+        if name in self.resolving:
+            logger.warning(f"cyclic maven property: {name}")
+            return None
+        self.resolving.add(name)
+        try:
+            value = self.interpolate(value)
+        finally:
+            self.resolving.discard(name)
+        self.cache[name] = value
+        return value
+
+    def interpolate(self, value):
+        """替换value中所有的${...}，无法解析的保持原样"""
+        if not value or "${" not in value:
+            return value
+        return property_pat.sub(lambda match: self.substitute(match), value)
+
+    def substitute(self, match):
+        value = self.resolve(match.group(1))
+        return match.group(0) if value is None else value
+
+
+class PomReactor:
+    """
+    源码中的maven工程，从根pom.xml沿modules遍历所有模块
+    父pom通过relativePath在源码中查找，坐标、属性和dependencyManagement从父pom继承
+    """
+    def __init__(self, root, root_pom="pom.xml", paths=(), workers=1):
+        self.root = root
+        # 预先并行读取源码中所有的pom.xml
+        self.models = read_poms(root, paths, workers)
+        self.resolvers = {}
+        self.modules = []
+        visited = set()
+        pending = [root_pom]
+        while pending:
+            path = pending.pop(0)
+            if path in visited:
+                continue
+            visited.add(path)
+            model = self.load(path)
+            if model is None:
+                continue
+            self.modules.append(model)
+            for module in model.modules:
+                module_path = os.path.normpath(os.path.join(model.module_dir, module))
+                if not module_path.endswith(".xml"):
+                    module_path = os.path.join(module_path, "pom.xml")
+                pending.append(module_path)
+        for model in list(self.models.values()):
+            self.link_parent(model)
+
+    def load(self, path):
+        if path in self.models:
+            return self.models[path]
+        if path.startswith("..") or not os.path.isfile(os.path.join(self.root, path)):
+            return None
+        model = try_read_pom(self.root, path)
+        if model is None:
+            return None
+        self.models[path] = model
+        return model
+
+    def link_parent(self, model):
+        if model.parent is None or not model.parent[3] or model.parent_model is not None:
+            return
+        path = os.path.normpath(os.path.join(model.module_dir, model.parent[3]))
+        if not path.endswith(".xml"):
+            path = os.path.join(path, "pom.xml")
+        parent = self.load(path)
+        # relativePath指向的pom坐标不一致时maven会忽略，从仓库中获取父pom
+        if parent is not None and parent is not model and parent.artifact_id == model.parent[1]:
+            model.parent_model = parent
+            self.link_parent(parent)
+
+    def chain(self, model):
+        """从当前模块到最顶层父pom的继承链"""
+        result = []
+        while model is not None and model not in result:
+            result.append(model)
+            model = model.parent_model
+        return result
+
+    def group_id(self, model):
+        return model.group_id or (model.parent[0] if model.parent else "")
+
+    def version(self, model):
+        return model.version or (model.parent[2] if model.parent else "")
+
+    def builtins(self, model):
+        builtins = {}
+        for prefix in ("project.", "pom."):
+            builtins[prefix + "groupId"] = self.group_id(model)
+            builtins[prefix + "artifactId"] = model.artifact_id
+            builtins[prefix + "version"] = self.version(model)
+            builtins[prefix + "packaging"] = model.packaging
+        if model.parent is not None:
+            builtins["project.parent.groupId"] = model.parent[0]
+            builtins["project.parent.artifactId"] = model.parent[1]
+            builtins["project.parent.version"] = model.parent[2]
+        builtins["basedir"] = builtins["project.basedir"] = os.path.join(self.root, model.module_dir)
+        return builtins
+
+    def resolver(self, model):
+        """模块的属性解析器，每个模块只创建一次，父pom的作用域共用"""
+        if model.path not in self.resolvers:
+            # 先占位，避免父pom链异常时无限递归
+            self.resolvers[model.path] = None
+            parent = self.resolver(model.parent_model) if model.parent_model is not None else None
+            self.resolvers[model.path] = PropertyResolver(model.properties, parent, self.builtins(model))
+        return self.resolvers[model.path]
+
+    def artifacts(self):
+        """源码中所有pom的groupId:artifactId，这些构件不需要从仓库获取"""
+        return {f"{self.resolver(model).interpolate(self.group_id(model))}:{model.artifact_id}"
+                for model in self.models.values()}
+
+    def resolve_items(self, items, resolver, default_group=""):
+        result = []
+        for item in items:
+            item = {key: resolver.interpolate(value) for key, value in item.items()}
+            item["groupId"] = item["groupId"] or default_group
+            result.append(item)
+        return result
+
+    def managed(self, model):
+        """继承链上合并后的dependencyManagement，子pom优先，属性按当前模块解析"""
+        managed = {}
+        resolver = self.resolver(model)
+        for item in self.chain(model):
+            for dep in self.resolve_items(item.managed, resolver):
+                managed.setdefault(f"{dep['groupId']}:{dep['artifactId']}", dep)
+        return managed
+
+    def dependencies(self, model):
+        """模块自身及继承的依赖，版本和scope缺省时取自dependencyManagement"""
+        managed = self.managed(model)
+        resolver = self.resolver(model)
+        result = {}
+        for item in self.chain(model):
+            for dep in self.resolve_items(item.dependencies, resolver):
+                key = f"{dep['groupId']}:{dep['artifactId']}"
+                if key in result:
+                    continue
+                managed_dep = managed.get(key, {})
+                dep["version"] = dep["version"] or managed_dep.get("version", "")
+                dep["scope"] = dep["scope"] or managed_dep.get("scope", "") or "compile"
+                result[key] = dep
+        return list(result.values())
+
+    def plugins(self, model):
+        resolver = self.resolver(model)
+        result = {}
+        for item in self.chain(model):
+            for plugin in self.resolve_items(item.plugins, resolver, default_plugin_group):
+                result.setdefault(f"{plugin['groupId']}:{plugin['artifactId']}", plugin)
+        return list(result.values())
+
+
+def pre_resolve(reactor, package_index=None):
+    """
+    在第一次构建之前解析所有模块的依赖和插件
+    有软件包索引时只添加仓库中存在的mvn(groupId:artifactId)，索引确认不存在的插件作为删除候选；
+    没有索引时无法确认插件是否存在，插件既不加入buildRequires也不删除，由构建日志分析处理
+    :return: (buildRequires, 删除的插件artifactId)
+    """
+    local = reactor.artifacts()
+    deps = {}
+    plugins = {}
+    for model in reactor.modules:
+        for dep in reactor.dependencies(model):
+            key = f"{dep['groupId']}:{dep['artifactId']}"
+            if key in local or "${" in key or dep["scope"] in skip_scopes:
+                continue
+            deps[key] = deps.get(key, False) or dep["scope"] != "test"
+        for plugin in reactor.plugins(model):
+            key = f"{plugin['groupId']}:{plugin['artifactId']}"
+            if key not in local and "${" not in key:
+                plugins[key] = plugin["artifactId"]
+    provided = {}
+    if package_index is not None:
+        provided = package_index.lookup_provides([f"mvn({key})" for key in list(deps) + list(plugins)])
+    requires = []
+    remove_plugins = []
+    for key, required in deps.items():
+        if f"mvn({key})" in provided or (package_index is None and required):
+            requires.append(f"mvn({key})")
+    for key, artifact in plugins.items():
+        if f"mvn({key})" in provided:
+            requires.append(f"mvn({key})")
+        elif package_index is not None and artifact not in lifecycle_plugins:
+            remove_plugins.append(artifact)
+    return requires, remove_plugins
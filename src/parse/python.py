@@ -10,18 +10,16 @@
 import os
 import sys
 import re
-import yaml
 import json
 from urllib import request
 from src.parse.basic_parse import BasicParse
+from src.utils.yaml_loader import load_template
 from src.log import logger
-from src.utils.cmd_util import has_file_type
-from src.config.config import configuration
 
 
 class PythonParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         name = source.name
         self.version = version if version != "" else source.version
         self.url_template = f'https://pypi.org/pypi/{name}/json'
@@ -30,12 +28,9 @@ class PythonParse(BasicParse):
         self.__build_noarch = True
         if self.version == "":
             self.find_latest_version()
-        self.python_path = ""
         self.build_system = "python"
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
         self.source = source
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
 
     def parse_api_info(self):
         if not self.version:
@@ -132,16 +127,6 @@ setup({os.linesep}\
                 }
         return None
 
-    def check_compilation_file(self):
-        if has_file_type(self.source.path, "py"):
-            if "requirements.txt" in self.source.files:
-                return True
-            return "setup.py" in self.source.files
-        return False
-
-    def check_compilation(self):
-        return self.check_compilation_file()
-
     def fix_name_version(self, path):
         if "autopkg" in self.metadata and "buildSystemFiles" in self.metadata["autopkg"]:
             build_system_file = self.metadata["autopkg"]["buildSystemFiles"]
@@ -7,26 +7,22 @@
 # MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
 # See the Mulan PSL v2 for more details.
 
-import os
 import sys
-import yaml
 import requests
 from src.parse.basic_parse import BasicParse
+from src.utils.yaml_loader import load_template
 from src.log import logger
-from src.config.config import configuration
 
 
 class RubyParse(BasicParse):
-    def __init__(self, source, version=""):
-        super().__init__(source)
+    def __init__(self, source, version="", context=None):
+        super().__init__(source, context)
         if version != "":
             self.version = version
         self.__url_v1 = f"https://rubygems.org/api/v1/gems/{self.pacakge_name}.json"
         self.__url_v2 = f"https://rubygems.org/api/v2/rubygems/{self.pacakge_name}/versions/{self.version}.json"
         self.build_system = "ruby"
-        with open(os.path.join(configuration.yaml_path, f"{self.build_system}.yaml"), "r") as f:
-            yaml_text = f.read()
-        self.metadata = yaml.safe_load(yaml_text)
+        self.metadata = load_template(self.config.yaml_path, self.build_system)
         self.source = source
 
     def parse_api_info(self):
@@ -57,12 +53,3 @@ class RubyParse(BasicParse):
                     for require in data["dependencies"]["development"]:
                         requires.append(require["name"] + " " + require["requirements"])
             self.metadata.setdefault("requires", requires)
-
-    def check_compilation_file(self):
-        for file in self.source.files:
-            if file.endswith(".gemspec"):
-                return True
-        return False
-
-    def check_compilation(self):
-        return self.check_compilation_file()
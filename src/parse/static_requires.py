@@ -0,0 +1,231 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import re
+from src.log import logger
+
+# 单个构建文件的最大读取大小，以及每种构建系统最多分析的文件数
+max_file_size = 1024 * 1024
+max_files = 200
+cmake_keywords = {"EXACT", "QUIET", "MODULE", "CONFIG", "NO_MODULE", "REQUIRED", "COMPONENTS", "OPTIONAL_COMPONENTS",
+                  "GLOBAL", "IMPORTED_TARGET", "NO_CMAKE_PATH", "NO_CMAKE_ENVIRONMENT_PATH", "NO_POLICY_SCOPE"}
+# meson内置的依赖，不对应pkgconfig文件
+meson_builtin_deps = {"threads", "dl", "m", "openmp", "intl", "iconv", "appleframeworks", "dependency", "mpi",
+                      "boost", "llvm", "cuda", "python3", "gtest", "gmock"}
+lib_dirs = ["/usr/lib64", "/usr/lib"]
+
+
+class StaticRequires:
+    """
+    从构建文件中静态分析依赖，在第一次构建之前加入buildRequires
+    默认只添加必需的依赖，可选依赖会改变软件包启用的功能，只在配置了static_requires_optional时添加；
+    pkgconfig(...)和cmake_modules中映射的包直接添加，cmake(...)、库和头文件只有本地软件包索引确认存在时才添加
+    """
+    def __init__(self, config, package_index=None):
+        self.config = config
+        self.package_index = package_index
+        self.requires = []
+
+    def add(self, req, evidence):
+        if req and req not in self.requires:
+            logger.info(f"static buildRequires {req} from {evidence}")
+            self.requires.append(req)
+
+    def wanted(self, required):
+        return required or self.config.static_requires_optional
+
+    def add_mapped(self, req, required, evidence):
+        if self.wanted(required):
+            self.add(req, evidence)
+
+    def add_provide(self, provide, required, evidence, verify=False):
+        """有索引时以索引为准；没有索引时verify为True的provide无法确认是否存在，不添加"""
+        if not self.wanted(required):
+            return
+        if self.package_index is not None:
+            if self.package_index.lookup_provide(provide):
+                self.add(provide, evidence)
+        elif not verify:
+            self.add(provide, evidence)
+
+    def add_file(self, paths, required, evidence):
+        """库和头文件只能通过索引找到所属的包"""
+        if self.package_index is None or not self.wanted(required):
+            return
+        found = self.package_index.lookup_files(paths)
+        for path in paths:
+            if path in found:
+                self.add(found[path], evidence)
+                return
+
+    def add_program(self, program, required, evidence):
+        req = self.config.failed_commands.get(program)
+        if req:
+            self.add_mapped(req, required, evidence)
+            return
+        self.add_file(["/usr/bin/" + program], required, evidence)
+
+    def scan_cmake(self, content, evidence=""):
+        content = re.sub(r"#[^\n]*", "", content)
+        pattern = r"\b(find_package|pkg_check_modules|pkg_search_module)\s*\(([^)]*)\)"
+        for command, args in re.findall(pattern, content, re.I):
+            args = [arg.strip("\"'") for arg in args.split()]
+            if not args or any("${" in arg for arg in args[:1]):
+                continue
+            required = "REQUIRED" in args
+            if command.lower() == "find_package":
+                self.scan_find_package(args, required, evidence)
+                continue
+            for module in args[1:]:
+                if module in cmake_keywords or "${" in module or re.match(r"^[<>=!\d]", module):
+                    continue
+                self.add_provide(f"pkgconfig({re.split(r'[<>=!]', module)[0]})", required, evidence)
+
+    def scan_find_package(self, args, required, evidence):
+        name = args[0]
+        if name in ("PkgConfig", "Threads", "OpenMP") or name.startswith("${"):
+            return
+        if name in ("Qt5", "Qt6", "KF5", "KF6") and "COMPONENTS" in args:
+            start = args.index("COMPONENTS") + 1
+            for component in args[start:]:
+                if component in cmake_keywords:
+                    break
+                self.add_provide(f"cmake({name}{component})", required, evidence, verify=True)
+            return
+        req = self.config.cmake_modules.get(name)
+        if req:
+            self.add_mapped(req, required, evidence)
+            return
+        # 大部分find_package使用Find模块，没有对应的cmake(...)
+        self.add_provide(f"cmake({name})", required, evidence, verify=True)
+
+    def scan_configure_ac(self, content, evidence=""):
+        content = re.sub(r"(^|\n)\s*dnl[^\n]*", r"\1", content)
+        for name, args in macro_calls(content, ["PKG_CHECK_MODULES", "AC_CHECK_LIB", "AC_CHECK_HEADER",
+                                                "AC_CHECK_HEADERS"]):
+            if len(args) < 2 and name != "AC_CHECK_HEADERS":
+                continue
+            # 没有not-found分支或者在该分支中报错时为必需的依赖
+            not_found = args[3] if len(args) > 3 else ""
+            if name == "PKG_CHECK_MODULES":
+                required = not not_found.strip() or "AC_MSG_ERROR" in not_found
+                for module in args[1].split():
+                    if "$" in module or re.match(r"^[<>=!\d]", module):
+                        continue
+                    self.add_provide(f"pkgconfig({re.split(r'[<>=!]', module)[0]})", required, evidence)
+            elif name == "AC_CHECK_LIB":
+                lib = args[0].strip()
+                if lib and "$" not in lib:
+                    self.add_file([f"{lib_dir}/lib{lib}.so" for lib_dir in lib_dirs], "AC_MSG_ERROR" in not_found,
+                                  evidence)
+            else:
+                not_found = args[2] if len(args) > 2 else ""
+                for header in args[0].split():
+                    if "$" not in header:
+                        self.add_file(["/usr/include/" + header], "AC_MSG_ERROR" in not_found, evidence)
+
+    def scan_meson(self, content, evidence=""):
+        content = re.sub(r"#[^\n]*", "", content)
+        for name, args in function_calls(content, ["dependency", "find_program"]):
+            names = re.findall(r"^\s*'([^']+)'", args)
+            if not names:
+                continue
+            optional = re.search(r"\brequired\s*:\s*(false|get_option|not\b|\w+_opt)", args)
+            required = optional is None
+            if name == "dependency":
+                if names[0] in meson_builtin_deps:
+                    continue
+                self.add_provide(f"pkgconfig({names[0]})", required, evidence)
+            else:
+                self.add_program(os.path.basename(names[0]), required, evidence)
+
+
+def macro_calls(content, names):
+    """解析m4宏调用，返回(宏名, [参数])，参数去掉外层的[]引用"""
+    pattern = re.compile(r"\b(" + "|".join(names) + r")\s*\(")
+    for match in pattern.finditer(content):
+        args = []
+        current = []
+        depth = 0
+        quote = 0
+        pos = match.end()
+        while pos < len(content):
+            char = content[pos]
+            pos += 1
+            if char == "[":
+                quote += 1
+                if quote == 1:
+                    continue
+            elif char == "]":
+                quote -= 1
+                if quote == 0:
+                    continue
+            elif quote == 0 and char == "(":
+                depth += 1
+            elif quote == 0 and char == ")":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif quote == 0 and depth == 0 and char == ",":
+                args.append("".join(current).strip())
+                current = []
+                continue
+            current.append(char)
+        args.append("".join(current).strip())
+        yield match.group(1), args
+
+
+def function_calls(content, names):
+    """解析meson函数调用，返回(函数名, 括号内的参数文本)"""
+    pattern = re.compile(r"\b(" + "|".join(names) + r")\s*\(")
+    for match in pattern.finditer(content):
+        depth = 0
+        pos = match.end()
+        while pos < len(content):
+            char = content[pos]
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                if depth == 0:
+                    break
+                depth -= 1
+            pos += 1
+        yield match.group(1), content[match.end():pos]
+
+
+def read_text(path):
+    if os.path.getsize(path) > max_file_size:
+        return ""
+    with open(path, "r", errors="replace") as f:
+        return f.read()
+
+
+def scan_static_requires(compilation, index, config, package_index=None):
+    """分析源码中的构建文件，返回buildRequires列表"""
+    scanner = StaticRequires(config, package_index)
+    if index is None:
+        return scanner.requires
+    if compilation == "cmake":
+        paths = index.find("CMakeLists.txt") + index.with_ext("cmake")
+        scan = scanner.scan_cmake
+    elif compilation in ("autotools", "autogen"):
+        paths = index.find("configure.ac") or index.find("configure.in")
+        paths = paths[:1]
+        scan = scanner.scan_configure_ac
+    elif compilation == "meson":
+        paths = index.find("meson.build")
+        scan = scanner.scan_meson
+    else:
+        return scanner.requires
+    for path in paths[:max_files]:
+        full_path = os.path.join(index.root, path)
+        if os.path.isfile(full_path):
+            scan(read_text(full_path), path)
+    return scanner.requires
@@ -27,9 +27,10 @@ class YamlWriter(object):
         self.main_yaml = "package.yaml"
         self.file_yaml = "files.yaml"
         self.compile_script = "phase.sh"
+        self.detection_yaml = "detection.yaml"
 
     def create_yaml(self, metadata):
-        with open(os.path.join(configuration.download_path, self.main_yaml), "w") as f:
+        with open(os.path.join(self.path, self.main_yaml), "w") as f:
             yaml.SafeDumper.org_represent_str = yaml.SafeDumper.represent_str
             yaml.add_representer(str, repr_str, Dumper=yaml.SafeDumper)
             f.write(yaml.safe_dump(metadata, sort_keys=False))
@@ -42,7 +43,7 @@ class YamlWriter(object):
                 if _key == phase or re.match(f"{phase}_\w+", _key):
                     functions[_key] = value
         # write function dict into shell file
-        with open(os.path.join(configuration.download_path, self.compile_script), "w") as ph:
+        with open(os.path.join(self.path, self.compile_script), "w") as ph:
             if "phase_content" in metadata and isinstance(metadata["phase_content"], str):
                 ph.write(metadata["phase_content"])
             for function, text in functions.items():
@@ -57,11 +58,16 @@ class YamlWriter(object):
                 files_data.setdefault("files", os.linesep.join(list(file)))
             elif package.startswith("subpackage.") and package.endswith(".files"):
                 files_data.setdefault(f"subpackage.{package}.files", os.linesep.join(list(file)))
-        with open(os.path.join(configuration.download_path, self.file_yaml), "w") as f:
+        with open(os.path.join(self.path, self.file_yaml), "w") as f:
             yaml.SafeDumper.org_represent_str = yaml.SafeDumper.represent_str
             yaml.add_representer(str, repr_str, Dumper=yaml.SafeDumper)
             f.write(yaml.safe_dump(files_data, sort_keys=False))
 
+    def create_detection(self, report):
+        """只做探测时输出构建系统的探测结果"""
+        with open(os.path.join(self.path, self.detection_yaml), "w") as f:
+            f.write(yaml.safe_dump(report, sort_keys=False))
+
     def create_yaml_package(self, metadata):
         self.create_yaml(metadata)
         self.create_files(metadata)
@@ -11,6 +11,7 @@ import os
 import shlex
 import subprocess
 from collections import Counter
+from src.core.source_index import SourceIndex
 from src.log import logger
 
 
@@ -28,17 +29,10 @@ def call(command, **kwargs):
     return return_code
 
 
-def list_all_file(command, file="Makefile"):
-    res = os.popen(" ".join(command))
-    output = res.read()
-    if " " in output and file in output:
-        return output.split()[0]
-    elif file in output:
-        return output.strip()
-    return ""
-
-
-def check_makefile_exist(files, path="", file_name="Makefile", ):
+def check_makefile_exist(files, path="", file_name="Makefile", index=None):
+    if index is not None:
+        # 在源码索引中查找目录层级最浅的文件
+        return index.shallowest(file_name)
     if path == "":
         # 在文件列表中查找文件
         result = []
@@ -48,24 +42,33 @@ def check_makefile_exist(files, path="", file_name="Makefile", ):
         return result[0] if result else ""
     if not os.path.exists(path):
         return ''
-    # 在目录中用命令查找文件
-    result = list_all_file(['ls', f'{path}/*/{file_name}'], file_name)
-    if not result:
-        return list_all_file(['ls', f'{path}/*/*/{file_name}'], file_name)
-    return result
+    # 在目录的第一、二层子目录中查找文件
+    for result in SourceIndex.scan(path).find(file_name):
+        if 1 <= result.count("/") <= 2:
+            return os.path.join(path, result)
+    return ""
 
 
-def has_file_type(path, _type):
-    res = os.popen(f"find {path} -name \*.{_type}")
-    output = res.read()
-    if output and f"{_type}" in output:
-        return True
-    return False
+def has_file_type(path, _type, index=None):
+    if index is None:
+        index = SourceIndex.scan(path)
+    return bool(index.with_ext(_type.lstrip(".")))
 
 
-def get_package_by_file(file_name):
-    p = subprocess.Popen(['dnf', 'provides', file_name], shell=False, stdout=subprocess.PIPE,
-                         stderr=subprocess.PIPE)
+def get_package_by_file(file_name, index=None, use_dnf=True):
+    if index is not None:
+        pkg = index.lookup_file(file_name)
+        # 索引可能不是最新的，未命中时再调用dnf
+        if pkg:
+            return pkg
+    if not use_dnf:
+        return ''
+    try:
+        p = subprocess.Popen(['dnf', 'provides', file_name], shell=False, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+    except OSError as e:
+        logger.warning(f"dnf provides {file_name} failed: {e}")
+        return ''
     ret, err = p.communicate()
     retcode = p.returncode
     if retcode == 0:
@@ -8,10 +8,12 @@
 # See the Mulan PSL v2 for more details.
 
 
+import os
 import subprocess
 import sys
 from io import BytesIO
 from src.log import logger
+from src.utils.git_mirror import GitMirror, repo_name, sparse_patterns
 
 
 def do_curl(url, dest=None, post=None, is_fatal=False):
@@ -41,6 +43,13 @@ def do_curl(url, dest=None, post=None, is_fatal=False):
         return None
 
 
-def clone_code(path, url, specific_branch="master"):
-    cmd = ["git", "clone", "--depth=1", "-b", specific_branch, url, path]
-    subprocess.check_call(cmd)
+def clone_code(path, url, ref="", mirror_root="", offline=False, sparse_files=None):
+    """
+    通过本地镜像把仓库检出到path/<仓库名>，ref为空时使用远程的默认分支
+    sparse_files不为None时只检出顶层文件和这些构建文件，其余文件内容不下载
+    :return: 源码目录
+    """
+    dest = os.path.join(path, repo_name(url))
+    sparse = sparse_patterns(sparse_files) if sparse_files is not None else None
+    GitMirror(mirror_root, offline=offline).checkout(url, dest, ref, sparse=sparse)
+    return dest
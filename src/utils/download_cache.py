@@ -0,0 +1,147 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import time
+import fcntl
+import shutil
+import sqlite3
+import hashlib
+import requests
+from src.log import logger
+from src.utils.download_manager import DownloadManager, DownloadError
+
+
+def link_or_copy(src, dest):
+    """硬链接到目标路径，跨文件系统时复制"""
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class DownloadCache:
+    """
+    源码包的内容寻址缓存
+    文件按sha256保存在objects目录，sqlite索引记录url对应的校验和及ETag/Last-Modified，
+    再次下载同一url时先做条件请求，未变化则直接硬链接到工作目录
+    """
+    def __init__(self, root, offline=False, revalidate=True, timeout=30, manager=None):
+        self.root = root
+        self.offline = offline
+        self.revalidate = revalidate
+        self.timeout = timeout
+        self.manager = manager
+
+    def connect(self):
+        os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.root, "index.db"), timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS downloads (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL, "
+                     "sha1 TEXT NOT NULL, size INTEGER NOT NULL, etag TEXT, last_modified TEXT, "
+                     "fetched_at REAL NOT NULL)")
+        return conn
+
+    def object_path(self, sha256):
+        return os.path.join(self.root, "objects", sha256[:2], sha256)
+
+    def lookup(self, url):
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT sha256, sha1, size, etag, last_modified FROM downloads WHERE url = ?",
+                               (url,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        entry = dict(zip(["sha256", "sha1", "size", "etag", "last_modified"], row))
+        if not os.path.isfile(self.object_path(entry["sha256"])):
+            return None
+        return entry
+
+    def find_by_checksum(self, sha256):
+        path = self.object_path(sha256)
+        return path if os.path.isfile(path) else ""
+
+    def record(self, url, entry):
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO downloads (url, sha256, sha1, size, etag, last_modified, "
+                             "fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (url, entry["sha256"], entry["sha1"], entry["size"], entry.get("etag"),
+                              entry.get("last_modified"), time.time()))
+        finally:
+            conn.close()
+
+    def part_path(self, url):
+        """未完成的下载按url保存，中断后可以续传"""
+        return os.path.join(self.root, "tmp", hashlib.sha1(url.encode("utf-8")).hexdigest() + ".part")
+
+    def download(self, url, cached=None, manager=None):
+        """
+        下载url并在写入时计算校验和，cached存在时发送条件请求
+        :return: 缓存条目，内容未变化时返回cached
+        """
+        manager = manager or self.manager
+        if manager is None:
+            manager = self.manager = DownloadManager(workers=1, timeout=self.timeout)
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        part_path = self.part_path(url)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        # 同一url的.part文件同时只允许一个线程或进程写入
+        with open(part_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entry = manager.download(url, part_path, headers)
+            if entry is None:
+                logger.info("not modified: " + url)
+                return cached
+            object_path = self.object_path(entry["sha256"])
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(part_path, object_path)
+        # 工作目录中的文件是硬链接，缓存对象设为只读
+        os.chmod(object_path, 0o444)
+        return entry
+
+    def fetch(self, url, dest, sha256=""):
+        """
+        获取url对应的文件并链接到dest
+        :return: 缓存条目，下载失败且没有缓存时返回None
+        """
+        cached = self.lookup(url)
+        if cached is None and sha256 and self.find_by_checksum(sha256):
+            link_or_copy(self.find_by_checksum(sha256), dest)
+            return {"sha256": sha256}
+        entry = cached
+        if cached is None or (self.revalidate and not self.offline and (cached["etag"] or cached["last_modified"])):
+            if self.offline and cached is None:
+                logger.error("no cached download in offline mode: " + url)
+                return None
+            try:
+                entry = self.download(url, cached)
+            except (requests.RequestException, DownloadError, OSError) as e:
+                logger.warning(f"can't download {url}: {e}")
+                if cached is None:
+                    return None
+                logger.info("use cached download: " + url)
+        else:
+            logger.info("use cached download: " + url)
+        if sha256 and entry["sha256"] != sha256:
+            logger.error(f"checksum mismatch for {url}: {entry['sha256']} != {sha256}")
+            return None
+        if entry is not cached:
+            self.record(url, entry)
+        link_or_copy(self.object_path(entry["sha256"]), dest)
+        return entry
@@ -0,0 +1,259 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from src.log import logger
+
+chunk_size = 1024 * 1024
+# 这些状态码通常是临时错误，等待后重试
+retry_status = {408, 425, 429, 500, 502, 503, 504}
+
+
+class DownloadError(Exception):
+    pass
+
+
+def hash_existing(path, hashes):
+    """续传前先把已下载的部分计入校验和"""
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            for digest in hashes:
+                digest.update(data)
+            size += len(data)
+    return size
+
+
+def read_validator(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def write_validator(path, response):
+    """保存文件的ETag或Last-Modified，续传时作为If-Range发送，弱ETag不能用于If-Range"""
+    validator = response.headers.get("ETag") or ""
+    if not validator or validator.startswith("W/"):
+        validator = response.headers.get("Last-Modified") or ""
+    with open(path, "w") as f:
+        f.write(validator)
+
+
+def range_start(response):
+    """解析Content-Range: bytes start-end/total中的start"""
+    value = response.headers.get("Content-Range", "")
+    try:
+        return int(value.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return -1
+
+
+def remove_files(*paths):
+    for path in paths:
+        if os.path.lexists(path):
+            os.remove(path)
+
+
+def mirror_urls(url, mirrors):
+    """返回原始url和按前缀替换后的镜像url"""
+    urls = [url]
+    for prefix, replacements in (mirrors or {}).items():
+        if url.startswith(prefix):
+            urls.extend(replacement + url[len(prefix):] for replacement in replacements)
+    return urls
+
+
+class DownloadStats:
+    """下载进度和吞吐量统计，多个线程共享"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.total = 0
+        self.done = 0
+        self.cached = 0
+        self.failed = 0
+        self.bytes = 0
+        self.resumed_bytes = 0
+        self.retries = 0
+
+    def add(self, **kwargs):
+        with self.lock:
+            for key, value in kwargs.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def throughput(self):
+        elapsed = time.time() - self.start
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "total": self.total,
+                "done": self.done,
+                "cached": self.cached,
+                "failed": self.failed,
+                "bytes": self.bytes,
+                "resumed_bytes": self.resumed_bytes,
+                "retries": self.retries,
+                "elapsed": round(time.time() - self.start, 2),
+                "throughput": round(self.throughput(), 2),
+            }
+
+
+def create_manager(config, workers=1):
+    return DownloadManager(workers, config.download_per_host, config.download_retries, config.download_backoff,
+                           mirrors=config.download_mirrors)
+
+
+class DownloadManager:
+    """
+    复用HTTP连接池的下载器
+    未完成的文件保留在原位置，旁边的.validator记录文件的ETag或Last-Modified，下次下载时通过Range和If-Range续传，
+    服务器上的文件变化时重新下载；每个主机的并发数受限，失败后按指数退避重试并依次尝试镜像
+    """
+    def __init__(self, workers=8, per_host=4, retries=3, backoff=1.0, timeout=30, mirrors=None, on_progress=None):
+        self.workers = max(workers, 1)
+        self.per_host = max(per_host, 1)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.mirrors = mirrors or {}
+        self.on_progress = on_progress
+        self.stats = DownloadStats()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.host_limits = {}
+        self.lock = threading.Lock()
+
+    def host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_limits[host]
+
+    def download(self, url, dest, headers=None):
+        """
+        下载url到dest，dest已存在且有validator时视为未完成的文件并续传
+        :return: 包含sha256/sha1/size/etag/last_modified的条目，条件请求未修改时返回None
+        """
+        last_error = None
+        candidates = mirror_urls(url, self.mirrors)
+        for attempt in range(self.retries + 1):
+            for candidate in list(candidates):
+                try:
+                    with self.host_limit(candidate):
+                        return self.transfer(candidate, dest, headers)
+                except requests.HTTPError as e:
+                    last_error = e
+                    logger.warning(f"can't download {candidate}: {e}")
+                    # 404等客户端错误重试也不会成功
+                    candidates.remove(candidate)
+                except (requests.RequestException, DownloadError) as e:
+                    last_error = e
+                    logger.warning(f"can't download {candidate}: {e}")
+            if not candidates:
+                break
+            if attempt < self.retries:
+                self.stats.add(retries=1)
+                time.sleep(self.backoff * 2 ** attempt)
+        raise DownloadError(f"can't download {url}: {last_error}")
+
+    def transfer(self, url, dest, headers=None):
+        headers = dict(headers or {})
+        hashes = [hashlib.sha256(), hashlib.sha1()]
+        validator_path = dest + ".validator"
+        offset = 0
+        validator = read_validator(validator_path) if os.path.isfile(dest) else ""
+        # 没有validator时无法确认已下载的部分仍然有效，重新下载
+        if validator and os.path.getsize(dest) > 0:
+            offset = os.path.getsize(dest)
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                return None
+            if response.status_code == 416 and offset:
+                # 已下载的部分与服务器上的文件不一致，重新下载
+                remove_files(dest, validator_path)
+                raise DownloadError("invalid range, restart download")
+            if response.status_code in retry_status:
+                raise DownloadError(f"http status {response.status_code}")
+            response.raise_for_status()
+            if response.status_code == 206:
+                if not offset or range_start(response) != offset:
+                    remove_files(dest, validator_path)
+                    raise DownloadError("content range mismatch, restart download")
+                hash_existing(dest, hashes)
+                self.stats.add(resumed_bytes=offset)
+                mode = "ab"
+            else:
+                # 200表示服务器上的文件已变化或不支持续传，从头下载
+                offset = 0
+                mode = "wb"
+                write_validator(validator_path, response)
+            total = offset + int(response.headers.get("Content-Length") or 0)
+            size = offset
+            with open(dest, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    for digest in hashes:
+                        digest.update(chunk)
+                    size += len(chunk)
+                    self.stats.add(bytes=len(chunk))
+                    if self.on_progress is not None:
+                        self.on_progress(url, size, total)
+            remove_files(validator_path)
+            return {
+                "sha256": hashes[0].hexdigest(),
+                "sha1": hashes[1].hexdigest(),
+                "size": size,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+
+    def prefetch(self, urls, cache):
+        """
+        并发下载所有url到下载缓存，已缓存的url跳过
+        :return: 统计信息
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        self.stats.add(total=len(urls))
+
+        def fetch(url):
+            if cache.lookup(url) is not None:
+                self.stats.add(cached=1)
+                return
+            try:
+                cache.record(url, cache.download(url, manager=self))
+                self.stats.add(done=1)
+            except (DownloadError, OSError) as e:
+                logger.warning(str(e))
+                self.stats.add(failed=1)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(fetch, urls))
+        stats = self.stats.as_dict()
+        logger.info(f"prefetch {stats['total']} sources, downloaded: {stats['done']}, cached: {stats['cached']}, "
+                    f"failed: {stats['failed']}, {stats['bytes']} bytes at {stats['throughput']} B/s")
+        return stats
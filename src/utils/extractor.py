@@ -0,0 +1,242 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import stat
+import uuid
+import shutil
+import fnmatch
+import tarfile
+import zipfile
+from src.log import logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 默认不解压的目录
+skip_dirs = {".git", ".svn", ".hg"}
+archive_suffixes = [".tar.gz", ".tar.xz", ".tar.bz2", ".tar.zst", ".tar.zstd", ".tgz", ".tbz2", ".txz", ".tzst",
+                    ".tar", ".zip", ".gz", ".xz", ".bz2", ".zst"]
+
+
+def archive_stem(filename):
+    name = os.path.basename(filename)
+    for suffix in archive_suffixes:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return os.path.splitext(name)[0]
+
+
+def is_zstd(filename):
+    with open(filename, "rb") as f:
+        return f.read(4) == b"\x28\xb5\x2f\xfd"
+
+
+def normalize_name(name):
+    """归一化归档成员路径，拒绝绝对路径和包含..的路径"""
+    name = name.replace("\\", "/")
+    if name.startswith("/"):
+        return ""
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return ""
+    return "/".join(parts)
+
+
+def is_within(root, path):
+    """path解析符号链接后是否仍位于root下"""
+    root = os.path.realpath(root)
+    return os.path.realpath(path).startswith(root + os.sep)
+
+
+def should_skip(name, skip_patterns=()):
+    parts = name.split("/")
+    if any(part in skip_dirs for part in parts):
+        return True
+    return any(fnmatch.fnmatch(name, pattern) for pattern in skip_patterns)
+
+
+class ArchiveListing:
+    """不解压时读取的归档成员列表，contents为读取到内存中的小文件内容，为None时从磁盘读取"""
+    def __init__(self, root, files, dirs, contents):
+        self.root = root
+        self.files = files
+        self.dirs = dirs
+        self.contents = contents
+
+
+class ExtractResult:
+    """解压结果，root为源码根目录，files为相对root的文件列表及大小"""
+    def __init__(self, root, files, dirs):
+        self.root = root
+        self.files = files
+        self.dirs = dirs
+
+
+def common_root(names):
+    """所有成员都位于同一个顶层目录下时返回该目录名"""
+    roots = {name.split("/", 1)[0] for name in names}
+    if len(roots) != 1:
+        return ""
+    root = roots.pop()
+    return root if any("/" in name for name in names) else ""
+
+
+class ArchiveReader:
+    """按顺序读取tar(gz/xz/bz2/zstd)或zip归档的成员"""
+    def __init__(self, filename):
+        self.filename = filename
+        self.kind = "zip" if zipfile.is_zipfile(filename) else "tar"
+        self.handle = None
+        self.raw = None
+
+    def __enter__(self):
+        if self.kind == "zip":
+            self.handle = zipfile.ZipFile(self.filename)
+        elif is_zstd(self.filename):
+            if zstandard is None:
+                raise tarfile.ReadError("zstandard module is required for " + self.filename)
+            self.raw = open(self.filename, "rb")
+            reader = zstandard.ZstdDecompressor().stream_reader(self.raw)
+            self.handle = tarfile.open(fileobj=reader, mode="r|")
+        else:
+            # 流模式只顺序读取一遍
+            self.handle = tarfile.open(self.filename, mode="r|*")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.handle.close()
+        if self.raw is not None:
+            self.raw.close()
+
+    def members(self):
+        """依次返回(成员, 归一化路径, 是否目录, 大小)"""
+        if self.kind == "zip":
+            for info in self.handle.infolist():
+                yield info, normalize_name(info.filename), info.is_dir(), info.file_size
+            return
+        for member in self.handle:
+            yield member, normalize_name(member.name), member.isdir(), member.size if member.isfile() else 0
+
+    def read(self, member):
+        if self.kind == "zip":
+            return self.handle.read(member)
+        f = self.handle.extractfile(member)
+        return f.read() if f is not None else b""
+
+    def extract(self, member, name, target):
+        """解压单个成员到target下的name"""
+        path = os.path.join(target, name)
+        # 之前解压的符号链接可能把后续成员引到target之外
+        if self.kind == "zip" and not is_within(target, path):
+            raise OSError(f"unsafe path {name}")
+        if member.is_dir() if self.kind == "zip" else member.isdir():
+            # 目录权限不影响源码分析，直接创建，避免只读目录导致后续文件无法写入
+            os.makedirs(path, exist_ok=True)
+            return
+        if self.kind == "zip":
+            mode = member.external_attr >> 16
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if stat.S_ISLNK(mode):
+                link = self.handle.read(member).decode("utf-8")
+                if os.path.isabs(link) or not is_within(target, os.path.join(os.path.dirname(path), link)):
+                    raise OSError(f"unsafe symlink {name} -> {link}")
+                os.symlink(link, path)
+                return
+            with self.handle.open(member) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            if mode & 0o777:
+                os.chmod(path, mode & 0o777)
+            return
+        member.name = name
+        if hasattr(tarfile, "data_filter"):
+            self.handle.extract(member, target, filter="data")
+        else:
+            self.handle.extract(member, target)
+
+
+def strip_root(top, files, dirs):
+    files = [(name[len(top) + 1:], size) for name, size in files]
+    dirs = [name[len(top) + 1:] for name in dirs if name != top]
+    return files, dirs
+
+
+def list_archive(filename, read_names=(), max_read_size=1024 * 1024, skip_patterns=()):
+    """
+    顺序读取一遍归档的成员列表，不写入磁盘
+    文件名在read_names中且层级较浅的小文件读取内容，用于快速探测构建系统
+    :return: ArchiveListing
+    """
+    names = []
+    files = []
+    dirs = []
+    raw_contents = {}
+    with ArchiveReader(filename) as reader:
+        for member, name, is_dir, size in reader.members():
+            if not name or should_skip(name, skip_patterns):
+                continue
+            names.append(name)
+            if is_dir:
+                dirs.append(name)
+                continue
+            files.append((name, size))
+            if 0 < size <= max_read_size and name.count("/") <= 2 and os.path.basename(name) in read_names:
+                raw_contents[name] = reader.read(member).decode("utf-8", errors="replace")
+    top = common_root(names)
+    if top:
+        files, dirs = strip_root(top, files, dirs)
+        raw_contents = {name[len(top) + 1:]: content for name, content in raw_contents.items()}
+    return ArchiveListing(top or archive_stem(filename), files, dirs, raw_contents)
+
+
+def extract_archive(filename, output, skip_patterns=()):
+    """
+    在进程内单次顺序解压归档
+    先解压到临时目录，根据成员路径确定源码根目录后再移动到output下，并记录文件列表
+    :return: ExtractResult
+    """
+    staging = os.path.join(output, ".extract-" + uuid.uuid4().hex)
+    os.makedirs(staging)
+    names = []
+    files = []
+    dirs = []
+    try:
+        with ArchiveReader(filename) as reader:
+            for member, name, is_dir, size in reader.members():
+                if not name or should_skip(name, skip_patterns):
+                    continue
+                try:
+                    reader.extract(member, name, staging)
+                except (tarfile.TarError, OSError) as e:
+                    logger.warning(f"skip member {name}: {e}")
+                    continue
+                names.append(name)
+                if is_dir:
+                    dirs.append(name)
+                else:
+                    files.append((name, size))
+        top = common_root(names)
+        if top:
+            root = os.path.join(output, top)
+            source = os.path.join(staging, top)
+            files, dirs = strip_root(top, files, dirs)
+        else:
+            root = os.path.join(output, archive_stem(filename))
+            source = staging
+        if os.path.isdir(root) and not os.path.islink(root):
+            shutil.rmtree(root)
+        elif os.path.lexists(root):
+            os.remove(root)
+        os.rename(source, root)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    logger.info(f"extract {len(files)} files to {root}")
+    return ExtractResult(root, files, dirs)
@@ -10,48 +10,74 @@
 import os
 import re
 import hashlib
+import tarfile
+import zipfile
+import threading
 from src.log import logger
+from src.utils.extractor import extract_archive
+
+digest_algorithms = ("sha1", "sha256")
+digest_chunk_size = 4 * 1024 * 1024
+
+
+def set_output_dir(path):
+    if os.path.exists(path):
+        os.system("rm -rf " + path)
+    os.makedirs(path, exist_ok=True)
+
+
+def get_digests(filename, algorithms=digest_algorithms):
+    """分块读取文件，一次读取同时计算多种摘要，内存占用与文件大小无关"""
+    hashers = {name: hashlib.new(name) for name in algorithms}
+    buffer = bytearray(digest_chunk_size)
+    view = memoryview(buffer)
+    with open(filename, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            for hasher in hashers.values():
+                hasher.update(view[:size])
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
 
 
 def get_sha1sum(filename):
     """获得文件的sha1值"""
-    sh = hashlib.sha1()
-    with open(filename, "rb") as f:
-        content = f.read()
-    sh.update(content)
-    return sh.hexdigest()
+    return get_digests(filename, ("sha1",))["sha1"]
 
 
-def unzip_file(filename: str, output=""):
+class DigestTask:
+    """在后台线程中计算文件摘要，计算时解压等操作可以同时进行"""
+    def __init__(self, filename, algorithms=digest_algorithms):
+        self.filename = filename
+        self.digests = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, args=(algorithms,), name="digest", daemon=True)
+        self.thread.start()
+
+    def run(self, algorithms):
+        try:
+            self.digests = get_digests(self.filename, algorithms)
+        except OSError as e:
+            self.error = e
+
+    def result(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.digests
+
+
+def extract_file(filename: str, output="", skip_patterns=()):
+    """解压源码包，返回源码根目录和文件列表"""
     if output == "":
         output = os.getcwd()
-    if filename.endswith(".tar.gz"):
-        ret = os.popen(f"tar -xzvf {filename} -C {output}").read()
-        first_line = ret.split(os.linesep)[0]
-        target_name = first_line.split(os.sep)[0]
-        return os.path.join(output, target_name)
-    elif filename.endswith(".tar.xz"):
-        ret = os.popen(f"tar -xvf {filename} -C {output}").read()
-        first_line = ret.split(os.linesep)[0]
-        target_name = first_line.split(os.sep)[0]
-        return os.path.join(output, target_name)
-    elif filename.endswith(".tar.bz2"):
-        ret = os.popen(f"tar -xjf {filename} -C {output}").read()
-        first_line = ret.split(os.linesep)[0]
-        target_name = first_line.split(os.sep)[0]
-        return os.path.join(output, target_name)
-    elif filename.endswith(".zip"):
-        ret = os.popen(f"unzip -o {filename} -d {output}").read()
-        first_line = ret.split(os.linesep)[0]
-        target_name = first_line.split(os.sep)[0]
-        return os.path.join(output, target_name)
-    else:
-        try:
-            ret = os.popen(f"tar -xzvf {filename} -C {output}").read()
-            first_line = ret.split(os.linesep)[0]
-            target_name = first_line.split(os.sep)[0]
-            return os.path.join(output, target_name)
-        except Exception as e:
-            logger.error("unknown src type: " + str(e))
-            exit(11)
+    try:
+        return extract_archive(filename, output, skip_patterns)
+    except (tarfile.TarError, zipfile.BadZipFile, OSError, EOFError) as e:
+        logger.error("unknown src type: " + str(e))
+        exit(11)
+
 
+def unzip_file(filename: str, output=""):
+    return extract_file(filename, output).root
@@ -0,0 +1,150 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import re
+import fcntl
+import shutil
+import hashlib
+import subprocess
+from src.log import logger
+
+
+class GitError(Exception):
+    pass
+
+
+def run_git(args, cwd=None):
+    result = subprocess.run(["git"] + args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise GitError(f"git {' '.join(args)}: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def repo_name(url):
+    """仓库名，如https://gitee.com/a/cronie.git -> cronie"""
+    name = os.path.basename(url.rstrip("/"))
+    return re.sub(r"\.git$", "", name) or "repo"
+
+
+def sparse_patterns(names):
+    """稀疏检出的规则：顶层的所有文件，以及任意目录下的指定文件"""
+    return ["/*", "!/*/"] + list(names)
+
+
+def list_tree(path):
+    """
+    列出HEAD中的所有文件和目录，不需要读取文件内容
+    部分clone中未下载的文件无法得到大小，记为0
+    """
+    output = run_git(["ls-tree", "-r", "-z", "--full-tree", "HEAD"], cwd=path)
+    files = []
+    dirs = set()
+    for item in output.split("\0"):
+        if not item or "\t" not in item:
+            continue
+        info, name = item.split("\t", 1)
+        if info.split()[1] != "blob":
+            continue
+        full_path = os.path.join(path, name)
+        files.append((name, os.path.getsize(full_path) if os.path.isfile(full_path) else 0))
+        parent = os.path.dirname(name)
+        while parent and parent not in dirs:
+            dirs.add(parent)
+            parent = os.path.dirname(parent)
+    return files, sorted(dirs)
+
+
+class GitMirror:
+    """
+    按远程url缓存的裸镜像仓库
+    首次使用时clone --mirror，之后只做增量fetch；每个任务通过--reference从镜像clone出独立的工作目录
+    只需要探测构建系统时镜像不下载文件内容(blob:none)，检出时只按需下载用到的文件
+    """
+    def __init__(self, root, offline=False):
+        self.root = root
+        self.offline = offline
+
+    def mirror_path(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, f"{repo_name(url)}-{digest}.git")
+
+    def update(self, url, partial=False):
+        """
+        创建或增量更新镜像，同一个镜像同时只允许一个进程更新
+        partial为False时，之前创建的部分镜像先补全文件内容，完整检出不再依赖远程
+        """
+        path = self.mirror_path(url)
+        os.makedirs(self.root, exist_ok=True)
+        with open(path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.isdir(path):
+                if self.offline:
+                    raise GitError("no git mirror in offline mode: " + url)
+                logger.info(f"create git mirror of {url}")
+                tmp_path = path + ".tmp"
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                run_git(["clone", "--mirror", "--quiet"] + (["--filter=blob:none"] if partial else []) +
+                        [url, tmp_path])
+                os.rename(tmp_path, path)
+            elif not partial and self.is_partial(url):
+                if self.offline:
+                    raise GitError("partial git mirror can't be fully checked out in offline mode: " + url)
+                self.hydrate(url, path)
+            elif not self.offline:
+                logger.info(f"update git mirror of {url}")
+                run_git(["fetch", "--prune", "--quiet", "origin"], cwd=path)
+        return path
+
+    def resolve(self, url, ref=""):
+        """把分支、标签或提交解析为提交号，ref为空时使用远程的默认分支"""
+        path = self.mirror_path(url)
+        try:
+            return run_git(["rev-parse", "--verify", "--quiet", (ref or "HEAD") + "^{commit}"], cwd=path)
+        except GitError:
+            raise GitError(f"no such ref {ref or 'HEAD'} in {url}")
+
+    def hydrate(self, url, path):
+        """不带过滤条件重新fetch所有对象，完成后去掉部分clone的配置"""
+        logger.info(f"hydrate partial git mirror of {url}")
+        run_git(["fetch", "--refetch", "--no-filter", "--prune", "--quiet", "origin"], cwd=path)
+        for key in ("remote.origin.promisor", "remote.origin.partialclonefilter", "extensions.partialclone"):
+            try:
+                run_git(["config", "--unset-all", key], cwd=path)
+            except GitError:
+                pass
+
+    def is_partial(self, url):
+        try:
+            return run_git(["config", "--get", "remote.origin.promisor"], cwd=self.mirror_path(url)) == "true"
+        except GitError:
+            return False
+
+    def checkout(self, url, dest, ref="", sparse=None):
+        """
+        从镜像clone出ref对应的源码到dest，对象通过alternates共享，不重复传输
+        sparse为稀疏检出规则，只检出匹配的文件
+        :return: 检出的提交号
+        """
+        mirror = self.update(url, partial=sparse is not None)
+        commit = self.resolve(url, ref)
+        if os.path.lexists(dest):
+            shutil.rmtree(dest)
+        run_git(["clone", "--quiet", "--no-checkout", "--reference", mirror, mirror, dest])
+        run_git(["remote", "set-url", "origin", url], cwd=dest)
+        if self.is_partial(url):
+            # 镜像中缺少的文件内容在检出时从远程按需下载
+            for key, value in [("core.repositoryformatversion", "1"), ("extensions.partialClone", "origin"),
+                               ("remote.origin.promisor", "true"), ("remote.origin.partialclonefilter", "blob:none")]:
+                run_git(["config", key, value], cwd=dest)
+        if sparse is not None:
+            run_git(["sparse-checkout", "set", "--no-cone"] + list(sparse), cwd=dest)
+        run_git(["checkout", "--quiet", "--detach", commit], cwd=dest)
+        logger.info(f"checkout {url} {ref or 'HEAD'} ({commit[:12]}) to {dest}")
+        return commit
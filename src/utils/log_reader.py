@@ -0,0 +1,167 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import re
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# 逐段处理日志时每段的大小，处理完的段会从进程的映射中释放
+window_size = 8 * 1024 * 1024
+
+
+def _release(mm, start, end):
+    """释放已经处理过的页，保持常驻内存不随日志大小增长"""
+    if not hasattr(mm, "madvise") or not hasattr(mmap, "MADV_DONTNEED"):
+        return
+    start -= start % mmap.PAGESIZE
+    if end > start:
+        mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def _scan_range(path, start, end, pattern, flags):
+    """在[start, end)范围内查找可能命中规则的行，返回行首的字节偏移"""
+    regex = re.compile(pattern, flags)
+    offsets = []
+    with BuildLog(path) as build_log:
+        pos = start
+        while pos < end:
+            chunk_end = build_log.line_end(min(pos + window_size, end))
+            text = build_log.mm[pos:chunk_end].decode("utf-8", errors="surrogateescape")
+            byte_pos = pos
+            char_pos = 0
+            search_pos = 0
+            while True:
+                match = regex.search(text, search_pos)
+                if match is None:
+                    break
+                line_start = text.rfind("\n", 0, match.start()) + 1
+                byte_pos += len(text[char_pos:line_start].encode("utf-8", errors="surrogateescape"))
+                char_pos = line_start
+                offsets.append(byte_pos)
+                line_end = text.find("\n", match.start())
+                if line_end == -1:
+                    break
+                search_pos = line_end + 1
+            _release(build_log.mm, pos, chunk_end)
+            pos = chunk_end
+    return offsets
+
+
+class BuildLog:
+    """
+    以mmap只读方式访问构建日志
+    成功标记从尾部向前查找，逐行读取时不会把整个日志加载为字符串列表
+    """
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+        self.mm = None
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size > 0:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.mm is not None:
+            self.mm.close()
+        self.file.close()
+
+    def contains(self, text):
+        """从尾部开始查找文本，成功标记通常在日志最后"""
+        if self.mm is None:
+            return False
+        return self.mm.rfind(text.encode("utf-8")) != -1
+
+    def line_start(self, offset):
+        if self.mm is None or offset <= 0:
+            return 0
+        return self.mm.rfind(b"\n", 0, offset) + 1
+
+    def line_end(self, offset):
+        """返回offset所在行的结束位置(包含换行符)"""
+        if self.mm is None or offset >= self.size:
+            return self.size
+        if offset > 0 and self.mm[offset - 1:offset] == b"\n":
+            return offset
+        end = self.mm.find(b"\n", offset)
+        return self.size if end == -1 else end + 1
+
+    def read_line(self, offset):
+        end = self.line_end(offset + 1) if offset < self.size else self.size
+        return self.mm[offset:end].decode("utf-8", errors="replace")
+
+    def lines(self, start=0, end=None):
+        """逐行读取[start, end)范围内的日志"""
+        if self.mm is None:
+            return
+        end = self.size if end is None else end
+        pos = start
+        released = start
+        while pos < end:
+            line_end = self.mm.find(b"\n", pos, end)
+            line_end = end if line_end == -1 else line_end + 1
+            yield self.mm[pos:line_end].decode("utf-8", errors="replace")
+            pos = line_end
+            if pos - released >= window_size:
+                _release(self.mm, released, pos)
+                released = pos
+
+    def reverse_lines(self, end=None):
+        """从尾部向前逐行读取"""
+        if self.mm is None:
+            return
+        pos = self.size if end is None else end
+        while pos > 0:
+            start = self.mm.rfind(b"\n", 0, pos - 1) + 1
+            yield self.mm[start:pos].decode("utf-8", errors="replace")
+            pos = start
+
+    def tail_offset(self, max_bytes):
+        """日志最后max_bytes字节所在的起始行偏移"""
+        if self.size <= max_bytes:
+            return 0
+        return self.line_start(self.size - max_bytes)
+
+    def split(self, parts, end=None):
+        """把[0, end)按行边界切分为parts段"""
+        end = self.size if end is None else end
+        step = max(end // max(parts, 1), 1)
+        ranges = []
+        pos = 0
+        while pos < end:
+            next_pos = min(self.line_end(pos + step), end)
+            ranges.append((pos, next_pos))
+            pos = next_pos
+        return ranges
+
+    def candidate_offsets(self, regex, end=None, workers=1):
+        """
+        用预过滤正则找出[0, end)范围内可能命中规则的行
+        workers大于1时按行边界切分，由多个进程并行扫描
+        """
+        end = self.size if end is None else end
+        if end <= 0:
+            return []
+        # 守护进程(如批量模式的工作进程)不能再创建子进程
+        if workers <= 1 or multiprocessing.current_process().daemon:
+            return _scan_range(self.path, 0, end, regex.pattern, regex.flags)
+        ranges = self.split(workers, end)
+        offsets = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            futures = [executor.submit(_scan_range, self.path, start, stop, regex.pattern, regex.flags)
+                       for start, stop in ranges]
+            for future in futures:
+                offsets.extend(future.result())
+        return offsets
@@ -0,0 +1,286 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import bz2
+import gzip
+import lzma
+import time
+import shutil
+import sqlite3
+import tempfile
+import xml.etree.ElementTree as ET
+import requests
+from src.log import logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 单次批量查询的参数个数，低于sqlite的变量数上限
+batch_size = 500
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def open_compressed(fileobj, location):
+    """按扩展名解压仓库元数据"""
+    if location.endswith(".gz"):
+        return gzip.GzipFile(fileobj=fileobj)
+    if location.endswith(".xz"):
+        return lzma.LZMAFile(fileobj)
+    if location.endswith(".bz2"):
+        return bz2.BZ2File(fileobj)
+    if location.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("zstandard module is required for " + location)
+        return zstandard.ZstdDecompressor().stream_reader(fileobj)
+    return fileobj
+
+
+def open_location(base_url, location, timeout=60):
+    """打开仓库中的文件，支持本地目录和http地址"""
+    if base_url.startswith("file://"):
+        base_url = base_url[len("file://"):]
+    if not base_url.startswith(("http://", "https://")):
+        return open(os.path.join(base_url, location), "rb")
+    response = requests.get(base_url.rstrip("/") + "/" + location, stream=True, timeout=timeout)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response.raw
+
+
+def read_repomd(base_url):
+    """读取repomd.xml，返回(版本, {类型: (路径, 校验和)})"""
+    with open_location(base_url, "repodata/repomd.xml") as f:
+        root = ET.parse(f).getroot()
+    revision = ""
+    records = {}
+    for child in root:
+        if local_name(child.tag) == "revision":
+            revision = child.text or ""
+        if local_name(child.tag) != "data":
+            continue
+        location = checksum = ""
+        for item in child:
+            if local_name(item.tag) == "location":
+                location = item.get("href", "")
+            elif local_name(item.tag) == "checksum":
+                checksum = item.text or ""
+        records[child.get("type")] = (location, checksum)
+    return revision, records
+
+
+def iter_primary_xml(fileobj):
+    """流式读取primary.xml，依次返回(包名, [provides], [文件])"""
+    for _, elem in ET.iterparse(fileobj):
+        if local_name(elem.tag) != "package":
+            continue
+        name = arch = ""
+        provides = []
+        files = []
+        for child in elem.iter():
+            tag = local_name(child.tag)
+            if tag == "name" and not name:
+                name = child.text or ""
+            elif tag == "arch":
+                arch = child.text or ""
+            elif tag == "provides":
+                provides.extend(entry.get("name") for entry in child if entry.get("name"))
+            elif tag == "file" and child.text:
+                files.append(child.text)
+        elem.clear()
+        if name and arch != "src":
+            yield name, provides, files
+
+
+def iter_filelists_xml(fileobj):
+    """流式读取filelists.xml，依次返回(包名, [文件])"""
+    for _, elem in ET.iterparse(fileobj):
+        if local_name(elem.tag) != "package":
+            continue
+        name = elem.get("name", "")
+        arch = elem.get("arch", "")
+        files = [child.text for child in elem if local_name(child.tag) == "file" and child.text]
+        elem.clear()
+        if name and arch != "src":
+            yield name, files
+
+
+def iter_primary_db(path):
+    conn = sqlite3.connect(path)
+    try:
+        provides = {}
+        for pkg_key, name in conn.execute("SELECT pkgKey, name FROM provides"):
+            provides.setdefault(pkg_key, []).append(name)
+        for pkg_key, name, arch in conn.execute("SELECT pkgKey, name, arch FROM packages"):
+            if arch != "src":
+                yield name, provides.get(pkg_key, []), []
+    finally:
+        conn.close()
+
+
+def iter_filelists_db(path):
+    conn = sqlite3.connect(path)
+    try:
+        names = {pkg_key: name for pkg_key, name, arch in conn.execute("SELECT pkgKey, name, arch FROM packages")
+                 if arch != "src"}
+        for pkg_key, dirname, filenames in conn.execute("SELECT pkgKey, dirname, filenames FROM filelist"):
+            if pkg_key in names:
+                yield names[pkg_key], [dirname.rstrip("/") + "/" + name for name in filenames.split("/") if name]
+    finally:
+        conn.close()
+
+
+class PackageIndex:
+    """
+    文件和provides到软件包的本地索引
+    从仓库的primary/filelists元数据流式导入sqlite，repomd未变化的仓库不重复导入
+    """
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=30)
+            self.conn.executescript(
+                "CREATE TABLE IF NOT EXISTS repos (url TEXT PRIMARY KEY, revision TEXT NOT NULL, "
+                "refreshed_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS packages (id INTEGER PRIMARY KEY, repo TEXT NOT NULL, name TEXT NOT NULL, "
+                "UNIQUE (repo, name));"
+                "CREATE TABLE IF NOT EXISTS files (path TEXT NOT NULL, package INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS provides (name TEXT NOT NULL, package INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS files_path ON files (path);"
+                "CREATE INDEX IF NOT EXISTS provides_name ON provides (name);")
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def repo_revision(self, url):
+        row = self.connect().execute("SELECT revision, refreshed_at FROM repos WHERE url = ?", (url,)).fetchone()
+        return row if row is not None else ("", 0)
+
+    def is_empty(self):
+        return self.connect().execute("SELECT 1 FROM packages LIMIT 1").fetchone() is None
+
+    def refresh(self, urls, ttl=0):
+        """刷新各个仓库，ttl内刷新过或repomd版本未变化的仓库跳过"""
+        changed = 0
+        for url in urls:
+            revision, refreshed_at = self.repo_revision(url)
+            if ttl and time.time() - refreshed_at < ttl:
+                continue
+            try:
+                new_revision, records = read_repomd(url)
+                new_revision = new_revision + ":" + ",".join(checksum for _, checksum in sorted(records.values()))
+                if new_revision == revision:
+                    self.touch(url, revision)
+                    continue
+                self.import_repo(url, new_revision, records)
+                changed += 1
+            except (OSError, ValueError, ET.ParseError, sqlite3.Error, requests.RequestException) as e:
+                logger.warning(f"can't refresh package index from {url}: {e}")
+        return changed
+
+    def touch(self, url, revision):
+        with self.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO repos (url, revision, refreshed_at) VALUES (?, ?, ?)",
+                         (url, revision, time.time()))
+
+    def import_repo(self, url, revision, records):
+        logger.info(f"import package index from {url}")
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM files WHERE package IN (SELECT id FROM packages WHERE repo = ?)", (url,))
+            conn.execute("DELETE FROM provides WHERE package IN (SELECT id FROM packages WHERE repo = ?)", (url,))
+            conn.execute("DELETE FROM packages WHERE repo = ?", (url,))
+            ids = {}
+            for name, provides, files in self.read_metadata(url, records, "primary"):
+                package = self.package_id(conn, ids, url, name)
+                conn.executemany("INSERT INTO provides (name, package) VALUES (?, ?)",
+                                 [(provide, package) for provide in provides])
+                if "filelists" not in records and "filelists_db" not in records:
+                    conn.executemany("INSERT INTO files (path, package) VALUES (?, ?)",
+                                     [(path, package) for path in files])
+            for name, files in self.read_metadata(url, records, "filelists"):
+                package = self.package_id(conn, ids, url, name)
+                conn.executemany("INSERT INTO files (path, package) VALUES (?, ?)", [(path, package) for path in files])
+            conn.execute("INSERT OR REPLACE INTO repos (url, revision, refreshed_at) VALUES (?, ?, ?)",
+                         (url, revision, time.time()))
+
+    @staticmethod
+    def package_id(conn, ids, url, name):
+        if name not in ids:
+            conn.execute("INSERT OR IGNORE INTO packages (repo, name) VALUES (?, ?)", (url, name))
+            ids[name] = conn.execute("SELECT id FROM packages WHERE repo = ? AND name = ?", (url, name)).fetchone()[0]
+        return ids[name]
+
+    @staticmethod
+    def read_metadata(url, records, kind):
+        """优先读取sqlite格式的元数据，没有时流式解析xml"""
+        if kind + "_db" in records:
+            location = records[kind + "_db"][0]
+            with tempfile.NamedTemporaryFile(suffix=".sqlite") as tmp:
+                with open_location(url, location) as raw, open_compressed(raw, location) as f:
+                    shutil.copyfileobj(f, tmp, 1024 * 1024)
+                tmp.flush()
+                reader = iter_primary_db if kind == "primary" else iter_filelists_db
+                yield from reader(tmp.name)
+            return
+        if kind not in records:
+            return
+        location = records[kind][0]
+        with open_location(url, location) as raw, open_compressed(raw, location) as f:
+            reader = iter_primary_xml if kind == "primary" else iter_filelists_xml
+            yield from reader(f)
+
+    def lookup_files(self, paths):
+        """批量查询文件所属的软件包，返回{文件: 包名}，未找到的文件不在结果中"""
+        return self.lookup("files", "path", paths)
+
+    def lookup_provides(self, names):
+        return self.lookup("provides", "name", names)
+
+    def lookup(self, table, column, keys):
+        keys = list(dict.fromkeys(keys))
+        result = {}
+        conn = self.connect()
+        for start in range(0, len(keys), batch_size):
+            chunk = keys[start:start + batch_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT t.{column}, p.name FROM {table} t JOIN packages p ON p.id = t.package "
+                                f"WHERE t.{column} IN ({placeholders}) ORDER BY p.name", chunk)
+            for key, name in rows:
+                result.setdefault(key, name)
+        return result
+
+    def lookup_file(self, path):
+        return self.lookup_files([path]).get(path, "")
+
+    def lookup_provide(self, name):
+        return self.lookup_provides([name]).get(name, "")
+
+
+def open_package_index(config):
+    """打开本地索引并按配置刷新，没有可用的索引时返回None"""
+    index = PackageIndex(config.package_index_path)
+    if config.package_index_repos and not config.offline:
+        index.refresh(config.package_index_repos, ttl=config.package_index_ttl)
+    if index.is_empty():
+        index.close()
+        return None
+    return index
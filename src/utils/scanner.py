@@ -113,13 +113,20 @@ def summary_from_R(pkgfile):
             return line[7:]
 
 
-def scan_for_meta(dirn):
+def list_entries(dirn, index=None, rel_dir=""):
+    """列出目录下的(名称, 是否目录)，有源码索引时不再访问文件系统"""
+    if index is not None:
+        return index.entries(rel_dir)
+    return [(name, os.path.isdir(os.path.join(dirn, name))) for name in os.listdir(dirn)]
+
+
+def scan_for_meta(dirn, index=None, rel_dir=""):
     """Scan the project directory for things we can use to guess a description and summary."""
     description = default_description
     summary = default_summary
-    for name in os.listdir(dirn):
-        file_path = os.path.join(dirn, name)
-        if os.path.isdir(file_path):
+    entries = list_entries(dirn, index, rel_dir)
+    for name, is_dir in entries:
+        if is_dir:
             continue
         if name.lower().endswith(".pdf"):
             continue
@@ -139,8 +146,8 @@ def scan_for_meta(dirn):
             summary = summary_from_R(os.path.join(dirn, name))
         elif name.lower().endswith(".pc.in"):
             summary = summary_from_pkgconfig(os.path.join(dirn, name))
-    if "doc" in os.listdir(dirn) and (description == default_description or summary == default_summary):
-        return scan_for_meta(os.path.join(dirn, "doc"))
+    if ("doc", True) in entries and (description == default_description or summary == default_summary):
+        return scan_for_meta(os.path.join(dirn, "doc"), index, os.path.join(rel_dir, "doc"))
     return {"summary": summary, "description": description}
 
 
@@ -150,7 +157,7 @@ def load_specfile(specfile, description, summary):
     specfile.default_sum = summary[0] if summary else default_summary
 
 
-def scan_for_license(path):
+def scan_for_license(path, index=None):
     # TODO(method better)
     result = "MIT"
     targets = ["copyright",
@@ -165,11 +172,10 @@ def scan_for_license(path):
                "copyrights",
                "about_bsd.txt"]
     target_pat = re.compile(r"^((copying)|(licen[cs]e)|(e[dp]l-v\d+))|(licen[cs]e)(\.(txt|xml))?$")
-    files = os.listdir(path)
-    for file in files:
+    for file, is_dir in list_entries(path, index):
         file_path = os.path.join(path, file)
-        if os.path.isdir(file_path):
-            license_files = os.listdir(file_path)
+        if is_dir:
+            license_files = [name for name, _ in list_entries(file_path, index, file)]
             if len(license_files) == 0:
                 continue
             file_path = os.path.join(file_path, license_files[0])
@@ -0,0 +1,51 @@
+# Copyright (c) [2023] Huawei Technologies Co.,Ltd.ALL rights reserved.
+# This program is licensed under Mulan PSL v2.
+# You can use it according to the terms and conditions of the Mulan PSL v2.
+#       http://license.coscl.org.cn/MulanPSL2
+# THIS PROGRAM IS PROVIDED ON AN "AS IS" BASIS, WITHOUT WARRANTIES OF ANY KIND,
+# EITHER EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO NON-INFRINGEMENT,
+# MERCHANTABILITY OR FIT FOR A PARTICULAR PURPOSE.
+# See the Mulan PSL v2 for more details.
+
+import os
+import copy
+import threading
+import yaml
+
+try:
+    # 优先使用libyaml的C实现
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def load_yaml(path):
+    """
+    读取yaml文件，解析结果按路径缓存，文件修改时间或大小变化后重新解析
+    返回深拷贝，调用方修改结果不会影响缓存
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _cache.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, "r") as f:
+            data = yaml.load(f, Loader=SafeLoader)
+        cached = (key, data)
+        with _lock:
+            _cache[path] = cached
+    return copy.deepcopy(cached[1])
+
+
+def load_template(yaml_path, build_system):
+    """读取编译类型的模板<yaml_path>/<build_system>.yaml"""
+    return load_yaml(os.path.join(yaml_path, f"{build_system}.yaml"))
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
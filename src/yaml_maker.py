@@ -12,7 +12,11 @@ import re
 import sys
 import yaml
 from src.core.logparser import LogParser
-from src.core.source import source
+from src.core.context import JobContext
+from src.core.knowledge_base import open_knowledge_base, package_features, apply_fixes
+from src.core.detector import detect_build_systems, load_build_system_files, detection_files, \
+    detection_file_max_size, read_build_files, guess_name_version
+from src.core.source_index import SourceIndex
 from src.transfer.writer import YamlWriter
 from src.parse.cmake import CMakeParse
 from src.parse.maven import MavenParse
@@ -25,12 +29,18 @@ from src.parse.perl import PerlParse
 from src.parse.nodejs import NodejsParse
 from src.parse.meson import MesonParse
 from src.parse.golang import GolangParse
-from src.utils.file_util import get_sha1sum, unzip_file
+from src.utils.file_util import DigestTask, digest_algorithms, extract_file
+from src.utils.extractor import ArchiveListing, list_archive
 from src.utils.cmd_util import has_file_type, call
 from src.utils.download import do_curl, clone_code
+from src.utils.git_mirror import list_tree
+from src.utils.package_index import open_package_index
+from src.utils.download_cache import DownloadCache
+from src.utils.download_manager import create_manager
 from src.builder.epkg_build import run_docker_script, get_build_result
+from src.builder.workspace import WorkspaceProvider
+from src.utils.log_reader import BuildLog
 from src.log import logger
-from src.config.config import configuration
 
 
 def save_round_logs(path, iteration):
@@ -57,13 +67,13 @@ def generate_data(original: dict):
     return data
 
 
-def add_metadata_args(data):
-    if configuration.maven_remove_plugins:
-        data["maven_remove_plugins"] = " ".join(list(configuration.maven_disable_modules))
-    if configuration.maven_disable_modules:
-        data["maven_disable_modules"] = " ".join(list(configuration.maven_disable_modules))
-    if configuration.maven_delete_dirs:
-        data["maven_rm_dirs"] = " ".join(list(configuration.maven_delete_dirs))
+def add_metadata_args(data, config):
+    if config.maven_remove_plugins:
+        data["maven_remove_plugins"] = " ".join(list(config.maven_remove_plugins))
+    if config.maven_disable_modules:
+        data["maven_disable_modules"] = " ".join(list(config.maven_disable_modules))
+    if config.maven_delete_dirs:
+        data["maven_rm_dirs"] = " ".join(list(config.maven_delete_dirs))
     return data
 
 
@@ -88,31 +98,57 @@ class YamlMaker:
         self.name = kwargs.get("name")
         self.tarball_url = kwargs.get("tarball_url")
         self.git_url = kwargs.get("git_url")
+        self.git_ref = kwargs.get("git_ref") or ""
         path = kwargs.get("directory")
         version = kwargs.get("version")
         language = kwargs.get("language")
+        self.context = kwargs.get("context") or JobContext()
+        self.config = self.context.config
+        self.source = self.context.source
         self.version = None
-        self.work_path = configuration.download_path
+        self.work_path = self.config.download_path
         self.used = False
+        self.workspace = None
+        self.tarball_digests = None
+        self.extracted = None
+        self.listing = None
+        self.need_build = kwargs.get("need_build")
         if self.name != "":
-            source.name = self.name
+            self.source.name = self.name
             logger.info("parse language module")
             self.version = version
-            source.version = version
+            self.source.version = version
             self.language = language
-            source.language = language
+            self.source.language = language
         elif self.tarball_url != "":
-            source.url = self.tarball_url
+            self.source.url = self.tarball_url
             logger.info("download source from url")
-            self.path = unzip_file(self.check_or_get_file(self.tarball_url), self.work_path)
-            source.path = self.path
+            tarball_path = self.check_or_get_file()
+            if not self.need_build:
+                # 不构建时只读取归档的成员列表和少量构建文件，不解压
+                self.listing = list_archive(tarball_path, detection_files, detection_file_max_size,
+                                            self.config.extract_skip_patterns)
+                self.path = os.path.join(self.work_path, self.listing.root)
+            else:
+                # 下载缓存中已有校验和时直接使用，否则在解压的同时在后台计算
+                digest_task = DigestTask(tarball_path) if self.tarball_digests is None else None
+                self.extracted = extract_file(tarball_path, self.work_path, self.config.extract_skip_patterns)
+                self.path = self.extracted.root
+                self.write_upstream(tarball_path,
+                                    digests=digest_task.result() if digest_task else self.tarball_digests)
+            self.source.path = self.path
         elif self.git_url != "":
-            clone_code(self.work_path, self.git_url)
-            source.path = self.path = os.path.join(self.work_path, os.path.basename(self.git_url.replace(".git", "")))
+            # 不构建时只检出顶层文件和构建文件，其余文件内容不下载
+            sparse_files = None if self.need_build else detection_files
+            self.path = clone_code(self.work_path, self.git_url, self.git_ref, self.config.git_mirror_path,
+                                   self.config.offline, sparse_files=sparse_files)
+            if sparse_files is not None:
+                files, dirs = list_tree(self.path)
+                self.listing = ArchiveListing(os.path.basename(self.path), files, dirs, None)
+            self.source.path = self.path
         else:
             self.path = path
-            source.path = self.path
-        self.need_build = kwargs.get("need_build")
+            self.source.path = self.path
         self.compilation = kwargs.get("compilation")
         self.parse_classes = {
             "cmake": CMakeParse,
@@ -137,84 +173,184 @@ class YamlMaker:
             logger.error("Not support inquiry C/C++ project by API")
             sys.exit(6)
         else:
-            compile_type = configuration.language_for_compilation.get(self.language)
+            compile_type = self.config.language_for_compilation.get(self.language)
         subclass = self.parse_classes[compile_type]
-        sub_object = subclass(source)
+        sub_object = subclass(self.source, context=self.context)
         sub_object.parse_api_info()
         yaml_writer.create_yaml_package(generate_data(sub_object.metadata))
 
     def create_yaml(self):
         # TODO: refactor into functions
         # 主流程
-        yaml_writer = YamlWriter(self.name, configuration.download_path)
+        yaml_writer = YamlWriter(self.name, self.config.download_path)
         if self.name:
             # TODO: instead of lang, detect parse_api_info() defined?
             # 根据name/version/language来获取信息的情况
             self.detect_api_info(yaml_writer)
-            return
-        self.double_loop_build(yaml_writer)
+            return True
+        if not self.need_build:
+            return self.detect_only(yaml_writer)
+        # 本地软件包索引在整个构建流程中只打开一次
+        self.context.package_index = open_package_index(self.config)
+        try:
+            return self.double_loop_build(yaml_writer)
+        finally:
+            if self.context.package_index is not None:
+                self.context.package_index.close()
+                self.context.package_index = None
+            if self.workspace is not None:
+                self.workspace.release()
+
+    def seed_static_requires(self, sub_object):
+        """第0轮之前把构建文件中静态分析出的依赖加入buildRequires"""
+        requires = sub_object.scan_build_requires(self.context.package_index)
+        build_requires = sub_object.metadata.get("buildRequires") or []
+        added = [req for req in requires if req not in build_requires]
+        sub_object.metadata["buildRequires"] = build_requires + added
+        if added:
+            logger.info("pre-seed static buildRequires: " + ", ".join(added))
 
     def double_loop_build(self, yaml_writer):
         # 扫描源码包
         src = self.scan_source()
-        for compilation, subclass in self.parse_classes.items():
+        # 基于源码索引一次性探测所有构建系统，只为命中的构建系统创建解析器
+        build_system_files = load_build_system_files(self.config, self.parse_classes)
+        candidates = detect_build_systems(self.source.index, build_system_files, list(self.parse_classes))
+        logger.info("detected build systems: " + ", ".join(repr(candidate) for candidate in candidates))
+        for candidate in candidates:
+            compilation = candidate.compilation
+            subclass = self.parse_classes[compilation]
             logger.info("buildSystem is " + compilation)
-            if compilation in configuration.buildrequires_analysis_compilations:
+            if compilation in self.config.buildrequires_analysis_compilations:
                 self.scan_analysis()
-            sub_object = subclass(src)
-            result = sub_object.check_compilation()
-            if not result:
-                continue
+            sub_object = subclass(src, context=self.context)
+            sub_object.metadata.update(candidate.metadata)
+            if hasattr(sub_object, "parse_all_pom"):
+                sub_object.parse_all_pom()
             if hasattr(sub_object, "fix_name_version"):
                 sub_object.fix_name_version(self.path)
 
             # 循环构建，构建成功或无法自修复的失败会退出
             build_count = 0
+            # 没有包名时无法区分不同的包，不使用构建经验
+            knowledge = open_knowledge_base(self.config) if self.name else None
+            features = set()
+            # confirmed为已证实有效的修复，pending为上一轮的修复，在下一轮构建后确认
+            confirmed = []
+            pending = []
+            build_success = False
             while self.need_build and build_count <= 10:
                 logger.info("build round: " + str(build_count))
                 # mv cronie-4.3 workspace
                 self.rename_build_source()
                 # 生成package.yaml
                 sub_object.get_basic_info(compilation)
-                sub_object.metadata = add_metadata_args(sub_object.metadata)
+                if build_count == 0 and hasattr(sub_object, "scan_build_requires"):
+                    self.seed_static_requires(sub_object)
+                if build_count == 0 and knowledge is not None:
+                    # 根据相似包的构建经验，在第0轮之前预先应用修复
+                    features = package_features(sub_object.metadata, self.source.index)
+                    apply_fixes(sub_object.metadata, self.config,
+                                knowledge.suggest(compilation, features, name=self.name))
+                sub_object.metadata = add_metadata_args(sub_object.metadata, self.config)
                 yaml_writer.create_yaml_package(generate_data(sub_object.metadata))
                 # 生成generic-build.sh
                 sub_object.metadata = add_requires_from_yaml(sub_object.metadata, self.path)
-                run_docker_script(compilation, sub_object.metadata, build_count)
+                log_parser = LogParser(sub_object.metadata, sub_object.scripts, compilation=compilation,
+                                       context=self.context)
+                # 边构建边分析日志，发现可修复的错误后提前结束本轮构建
+                on_line = log_parser.feed if self.config.stream_build_log else None
+                run_docker_script(compilation, sub_object.metadata, build_count, context=self.context,
+                                  on_line=on_line)
                 build_count += 1
-                if not os.path.exists(os.path.join(configuration.download_path, configuration.logfile)):
-                    logger.error("no such file: " + os.path.join(configuration.download_path, configuration.logfile))
-                with open(os.path.join(configuration.download_path, configuration.logfile), "r") as f:
-                    content = f.read()
-                if configuration.build_success_echo in content:
-                    sub_object.merge_phase_items(compilation)
-                    get_build_result(sub_object.generate_metadata())  # 打包的脚本
-                    return
-                log_parser = LogParser(sub_object.metadata, sub_object.scripts, compilation=compilation)
-                sub_object.metadata = log_parser.parse_build_log()
+                log_path = os.path.join(self.config.download_path, self.config.logfile)
+                if not os.path.exists(log_path):
+                    logger.error("no such file: " + log_path)
+                with BuildLog(log_path) as build_log:
+                    build_success = build_log.contains(self.config.build_success_echo)
+                if build_success:
+                    confirmed.extend(pending)
+                    break
+                if on_line is None:
+                    sub_object.metadata = log_parser.parse_build_log()
+                else:
+                    sub_object.metadata = log_parser.metadata
+                # 上一轮的修复在本轮没有再次出现，说明修复有效
+                confirmed.extend(fix for fix in pending if (fix["type"], str(fix["value"])) not in log_parser.repeated)
+                pending = log_parser.fixes
+                # 本轮收集到的所有修复一起用于下一轮构建
+                logger.info(f"build round {build_count - 1} collected {len(log_parser.fixes)} fixes")
                 if not log_parser.restart:
                     logger.error("build error finally")
                     break
+            if knowledge is not None and build_count > 0:
+                knowledge.learn(self.name, compilation, features, confirmed, build_success)
+            if build_success:
+                sub_object.merge_phase_items(compilation)
+                get_build_result(sub_object.generate_metadata(), context=self.context)  # 打包的脚本
+                return True
+        return False
+
+    def detect_only(self, yaml_writer):
+        """不构建，只探测构建系统、名称和版本，结果写入detection.yaml"""
+        self.name_and_version()
+        if self.listing is not None:
+            self.source.index = SourceIndex.from_entries(self.path, self.listing.files, self.listing.dirs)
+            self.source.files = self.source.index.files
+        else:
+            self.scan_files()
+        if self.listing is not None and self.listing.contents is not None:
+            contents = self.listing.contents
+        else:
+            contents = read_build_files(self.source.index)
+        build_system_files = load_build_system_files(self.config, self.parse_classes)
+        candidates = detect_build_systems(self.source.index, build_system_files, list(self.parse_classes))
+        logger.info("detected build systems: " + ", ".join(repr(candidate) for candidate in candidates))
+        name, version = guess_name_version(contents)
+        report = {
+            "name": self.source.name or name,
+            "version": self.source.version or version,
+            "url": self.tarball_url or self.git_url or "",
+            "files": len(self.source.index.files),
+            "size": self.source.index.total_size(),
+            "buildSystems": [{"name": candidate.compilation, "evidence": list(candidate.evidence),
+                              "metadata": generate_data(candidate.metadata)} for candidate in candidates],
+        }
+        yaml_writer.create_detection(report)
+        return bool(candidates)
 
     def rename_build_source(self):
-        # 构建目录统一改为workspace
-        os.system(f"rm -rf {configuration.download_path}/workspace")
-        os.system(f"cp -r {self.path} {configuration.download_path}/workspace")
+        # 构建目录统一改为workspace，每轮构建都从未修改过的源码开始
+        if self.workspace is None:
+            self.workspace = WorkspaceProvider(self.path, os.path.join(self.config.download_path, "workspace"),
+                                               method=self.config.workspace_method,
+                                               workers=self.config.workspace_copy_workers)
+        self.workspace.prepare()
 
-    def write_upstream(self, file_name, mode="w"):
-        """Write the upstream hash to the upstream file."""
+    def write_upstream(self, file_name, mode="w", digests=None):
+        """Write the upstream hashes to the upstream file."""
+        if digests is None:
+            digests = DigestTask(file_name).result()
+        name = os.path.basename(file_name)
         with open(os.path.join(self.work_path, "upstream"), mode) as require_f:
-            require_f.write(os.path.join(get_sha1sum(file_name), file_name) + "\n")
+            # 第一行保持原有的<sha1>/<文件名>格式，其余摘要带算法前缀
+            require_f.write(f"{digests['sha1']}/{name}\n")
+            for algorithm, digest in digests.items():
+                if algorithm != "sha1":
+                    require_f.write(f"{algorithm}:{digest}/{name}\n")
 
-    def check_or_get_file(self, mode="w"):
+    def check_or_get_file(self):
         """Download tarball from url unless it is present locally."""
         tarball_path = os.path.join(self.work_path, os.path.basename(self.tarball_url))
-        ret = os.system(f"wget {self.tarball_url} -P {self.work_path}")
-        if ret == 0:
-            return tarball_path
         if not os.path.isfile(tarball_path):
-            do_curl(self.tarball_url, dest=tarball_path, is_fatal=True)
-        self.write_upstream(tarball_path, mode)
+            cache = DownloadCache(self.config.download_cache_path, offline=self.config.offline,
+                                  revalidate=self.config.download_cache_revalidate,
+                                  manager=create_manager(self.config))
+            entry = cache.fetch(self.tarball_url, tarball_path)
+            if entry is None:
+                do_curl(self.tarball_url, dest=tarball_path, is_fatal=True)
+            elif all(algorithm in entry for algorithm in digest_algorithms):
+                self.tarball_digests = {algorithm: entry[algorithm] for algorithm in digest_algorithms}
         return tarball_path
 
     def scan_source(self):
@@ -249,23 +385,25 @@ class YamlMaker:
                 no_extension = os.path.splitext(no_extension)[0]
 
         # override name and version from commandline
-        source.name = self.name = self.name if self.name else name
-        source.version = self.version = self.version if self.version else version
-        return source
+        self.source.name = self.name = self.name if self.name else name
+        self.source.version = self.version = self.version if self.version else version
+        return self.source
 
     def scan_analysis(self):
-        if not os.path.exists(configuration.analysis_tool_path):
+        if not os.path.exists(self.config.analysis_tool_path):
             return
         if self.used:
             return
         logger.info("start to scan buildRequires...")
-        call(f"/usr/bin/python3 {configuration.analysis_tool_path} mapping_file {self.path} --os-version 22.03-LTS-SP4")
+        call(f"/usr/bin/python3 {self.config.analysis_tool_path} mapping_file {self.path} --os-version 22.03-LTS-SP4")
         self.used = True
 
     def scan_files(self):
-        for dir_path, _, files in os.walk(self.path):
-            dir_name = dir_path.replace(self.path, "").lstrip("/")
-            for file in files:
-                source.files.append(os.path.join(dir_name, file))
+        if self.extracted is not None and os.path.normpath(self.extracted.root) == os.path.normpath(self.path):
+            # 直接使用解压时记录的文件列表
+            self.source.index = SourceIndex.from_entries(self.path, self.extracted.files, self.extracted.dirs)
+        else:
+            self.source.index = SourceIndex.scan(self.path)
+        self.source.files = self.source.index.files
 
 
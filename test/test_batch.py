@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+import yaml
+from src.config.config import configuration
+from src.batch import read_manifest, manifest_to_args, package_label, run_batch
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        configuration.offline = True
+        configuration.pattern_cache_path = os.path.join(self.tmp.name, "patterns.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        configuration.offline = False
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_read_manifest_csv(self):
+        path = self.write("manifest.csv", "name,url,version,language\n"
+                                          "leveldb,https://x/leveldb-1.21.tar.gz,,\n"
+                                          "requests,,2.32.3,python\n")
+        entries = read_manifest(path)
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(manifest_to_args(entries[0])["tarball_url"], "https://x/leveldb-1.21.tar.gz")
+        self.assertEqual(manifest_to_args(entries[0])["name"], "")
+        self.assertEqual(manifest_to_args(entries[1])["name"], "requests")
+
+    def test_read_manifest_yaml(self):
+        path = self.write("manifest.yaml", yaml.safe_dump({"packages": [
+            {"url": "https://gitee.com/a/autopkg.git"},
+            {"directory": "/tmp/acl-2.3.2/"},
+        ]}))
+        entries = read_manifest(path)
+        self.assertEqual(manifest_to_args(entries[0])["git_url"], "https://gitee.com/a/autopkg.git")
+        self.assertEqual(package_label(entries[0]), "autopkg")
+        self.assertEqual(package_label(entries[1]), "acl-2.3.2")
+
+    def test_invalid_entry(self):
+        with self.assertRaises(ValueError):
+            manifest_to_args({"name": "requests", "version": "", "language": "python"})
+
+    def test_run_batch_summary(self):
+        path = self.write("manifest.yaml", yaml.safe_dump([
+            {"name": "a"},
+            {"directory": os.path.join(self.tmp.name, "missing")},
+        ]))
+        output = os.path.join(self.tmp.name, "output")
+        summary = run_batch(path, output, jobs=2, need_build=False)
+        self.assertEqual(summary["total"], 2)
+        self.assertEqual(summary["success"], 0)
+        self.assertTrue(os.path.exists(os.path.join(output, "summary.yaml")))
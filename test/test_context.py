@@ -0,0 +1,27 @@
+import os
+import tempfile
+import unittest
+from src.config.config import configuration
+from src.core.context import JobContext
+from src.core.maven_log_analysis import MavenLogAnalysis
+from src.yaml_maker import YamlMaker
+
+
+class TestContext(unittest.TestCase):
+    def test_config_not_shared(self):
+        first = JobContext()
+        second = JobContext()
+        MavenLogAnalysis({}, context=first).add_java_remove_plugins("maven-javadoc-plugin")
+        self.assertIn("maven-javadoc-plugin", first.config.maven_remove_plugins)
+        self.assertNotIn("maven-javadoc-plugin", second.config.maven_remove_plugins)
+        self.assertNotIn("maven-javadoc-plugin", configuration.maven_remove_plugins)
+
+    def test_scan_files_not_accumulated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "CMakeLists.txt"), "w") as f:
+                f.write("project(demo)")
+            context = JobContext()
+            yaml_maker = YamlMaker(name="", tarball_url="", git_url="", directory=tmp, context=context)
+            yaml_maker.scan_files()
+            yaml_maker.scan_files()
+            self.assertEqual(context.source.files, ["CMakeLists.txt"])
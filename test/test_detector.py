@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from src.core.context import JobContext
+from src.core.detector import detect_build_systems, load_build_system_files, guess_name_version
+from src.core.source_index import SourceIndex
+from src.utils.cmd_util import check_makefile_exist, has_file_type
+
+
+class TestDetector(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "src")
+        self.yaml_path = os.path.join(self.tmp.name, "templates")
+        os.makedirs(self.yaml_path)
+        templates = {"cmake": "CMakeLists.txt", "make": "Makefile", "autotools": "configure.ac",
+                     "meson": "meson.build", "maven": "pom.xml", "nodejs": "package.json"}
+        for name, build_file in templates.items():
+            with open(os.path.join(self.yaml_path, name + ".yaml"), "w") as f:
+                f.write(f"autopkg:\n  buildSystemFiles: {build_file}\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_tree(self, files):
+        for file in files:
+            path = os.path.join(self.root, file)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("")
+        return SourceIndex.scan(self.root)
+
+    def detect(self, index):
+        context = JobContext()
+        context.config.yaml_path = self.yaml_path
+        compilations = ["cmake", "autotools", "meson", "maven", "autogen", "ruby", "go", "make", "python",
+                        "perl", "javascript"]
+        return detect_build_systems(index, load_build_system_files(context.config, compilations), compilations)
+
+    def test_index(self):
+        index = self.make_tree(["setup.py", "pkg/__init__.py", "pkg/sub/Makefile", "docs/Makefile"])
+        self.assertEqual(sorted(index.with_ext("py")), ["pkg/__init__.py", "setup.py"])
+        self.assertEqual(index.with_ext(".PY"), index.with_ext("py"))
+        self.assertEqual(index.find("Makefile"), ["docs/Makefile", "pkg/sub/Makefile"])
+        self.assertFalse(index.has_file("Makefile", depth=0))
+        self.assertEqual(index.at_depth(0), ["setup.py"])
+
+    def test_all_candidates_with_evidence(self):
+        index = self.make_tree(["CMakeLists.txt", "src/main.c", "tools/Makefile", "setup.py", "bind/a.py"])
+        candidates = {candidate.compilation: candidate for candidate in self.detect(index)}
+        self.assertEqual(list(candidates), ["cmake", "make", "python"])
+        self.assertEqual(candidates["cmake"].evidence, ["CMakeLists.txt"])
+        self.assertEqual(candidates["make"].metadata, {"makePath": "tools/Makefile"})
+        self.assertEqual(candidates["python"].evidence, ["setup.py"])
+
+    def test_nested_build_files(self):
+        index = self.make_tree(["project/meson.build", "project/sub/configure", "go.mod", "go.sum", "main.go"])
+        candidates = {candidate.compilation: candidate for candidate in self.detect(index)}
+        self.assertEqual(candidates["meson"].metadata, {"mesonPath": "project/meson.build"})
+        self.assertEqual(candidates["autotools"].metadata, {"configurePath": "project/sub/configure"})
+        self.assertEqual(candidates["go"].evidence, ["go.mod", "go.sum"])
+        self.assertNotIn("javascript", candidates)
+
+    def test_scan_prunes_vendor_dirs(self):
+        index = self.make_tree(["main.go", "vendor/lib/a.go", "node_modules/x/package.json", ".git/HEAD",
+                                "LICENSE", "doc/README"])
+        self.assertEqual(sorted(index.files), ["LICENSE", "doc/README", "main.go"])
+        self.assertIn(("vendor", True), index.entries())
+        self.assertEqual(index.entries("doc"), [("README", False)])
+        with open(os.path.join(self.root, "main.go"), "w") as f:
+            f.write("package main\n")
+        index = SourceIndex.scan(self.root)
+        self.assertEqual(index.size("main.go"), 13)
+        self.assertEqual(index.total_size(), 13)
+
+    def test_guess_name_version(self):
+        self.assertEqual(guess_name_version({"sub/meson.build": "project('sub', version: '0.1')",
+                                             "configure.ac": "AC_INIT([demo], [2.4.1], [bugs@demo])"}),
+                         ("demo", "2.4.1"))
+        self.assertEqual(guess_name_version({"package.json": '{"name": "left-pad", "version": "1.3.0"}'}),
+                         ("left-pad", "1.3.0"))
+        self.assertEqual(guess_name_version({"CMakeLists.txt": "add_library(x)"}), ("", ""))
+
+    def test_cmd_util_without_shell(self):
+        index = self.make_tree(["a/Makefile", "a/b/c/Makefile", "x.js"])
+        self.assertTrue(has_file_type(self.root, ".js"))
+        self.assertFalse(has_file_type(self.root, "py", index=index))
+        self.assertEqual(check_makefile_exist([], path=self.root), os.path.join(self.root, "a/Makefile"))
+        self.assertEqual(check_makefile_exist(index.files, index=index), "a/Makefile")
+        self.assertEqual(index.shallowest("Makefile", max_depth=0), "")
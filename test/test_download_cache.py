@@ -0,0 +1,62 @@
+import os
+import hashlib
+import tempfile
+import threading
+import unittest
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from src.utils.download_cache import DownloadCache
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        QuietHandler.requests.append(self.headers.get("If-Modified-Since"))
+        super().do_GET()
+
+
+class TestDownloadCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.www = os.path.join(self.tmp.name, "www")
+        os.makedirs(self.www)
+        self.content = b"demo tarball" * 1000
+        with open(os.path.join(self.www, "demo-1.0.tar.gz"), "wb") as f:
+            f.write(self.content)
+        QuietHandler.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=self.www))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/demo-1.0.tar.gz"
+        self.cache = DownloadCache(os.path.join(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_download_once_and_revalidate(self):
+        first = os.path.join(self.tmp.name, "first.tar.gz")
+        entry = self.cache.fetch(self.url, first)
+        self.assertEqual(entry["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(entry["sha1"], hashlib.sha1(self.content).hexdigest())
+        second = os.path.join(self.tmp.name, "second.tar.gz")
+        self.assertEqual(self.cache.fetch(self.url, second)["sha256"], entry["sha256"])
+        self.assertEqual(os.stat(first).st_ino, os.stat(second).st_ino)
+        self.assertIsNone(QuietHandler.requests[0])
+        self.assertIsNotNone(QuietHandler.requests[1])
+
+    def test_offline_and_checksum(self):
+        dest = os.path.join(self.tmp.name, "demo.tar.gz")
+        offline = DownloadCache(self.cache.root, offline=True)
+        self.assertIsNone(offline.fetch(self.url, dest))
+        entry = self.cache.fetch(self.url, dest)
+        self.server.shutdown()
+        self.assertEqual(offline.fetch(self.url, dest)["sha256"], entry["sha256"])
+        other_url = self.url.replace("demo-1.0", "mirror/demo-1.0")
+        self.assertEqual(offline.fetch(other_url, dest, sha256=entry["sha256"])["sha256"], entry["sha256"])
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
@@ -0,0 +1,139 @@
+import os
+import hashlib
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.utils.download_cache import DownloadCache
+from src.utils.download_manager import DownloadManager, DownloadError
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    files = {}
+    requests = []
+    failures = {}
+    # 忽略Range中的起始位置，模拟错误的Content-Range
+    bad_range = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        RangeHandler.requests.append((self.path, self.headers.get("Range")))
+        if RangeHandler.failures.get(self.path, 0) > 0:
+            RangeHandler.failures[self.path] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        content = RangeHandler.files.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+        start = 0
+        if self.headers.get("Range") and self.headers.get("If-Range") in (None, etag):
+            start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            if self.path in RangeHandler.bad_range:
+                start = 0
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content) - start))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+
+class TestDownloadManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = b"demo tarball" * 10000
+        RangeHandler.files = {"/demo-1.0.tar.gz": self.content, "/mirror/other-2.0.tar.gz": b"other"}
+        RangeHandler.requests = []
+        RangeHandler.failures = {}
+        RangeHandler.bad_range = set()
+        self.etag = '"' + hashlib.sha1(self.content).hexdigest() + '"'
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.manager = DownloadManager(workers=4, per_host=2, retries=2, backoff=0.01)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_resume_and_retry(self):
+        dest = os.path.join(self.tmp.name, "demo.part")
+        with open(dest, "wb") as f:
+            f.write(self.content[:5000])
+        with open(dest + ".validator", "w") as f:
+            f.write(self.etag)
+        RangeHandler.failures["/demo-1.0.tar.gz"] = 1
+        entry = self.manager.download(self.base + "/demo-1.0.tar.gz", dest)
+        self.assertEqual(entry["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(entry["size"], len(self.content))
+        self.assertEqual(RangeHandler.requests[-1], ("/demo-1.0.tar.gz", "bytes=5000-"))
+        stats = self.manager.stats.as_dict()
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["resumed_bytes"], 5000)
+        self.assertEqual(stats["bytes"], len(self.content) - 5000)
+        self.assertFalse(os.path.exists(dest + ".validator"))
+
+    def test_resume_changed_file(self):
+        dest = os.path.join(self.tmp.name, "demo.part")
+        # 服务器上的文件已变化，If-Range不匹配时返回完整的文件
+        with open(dest, "wb") as f:
+            f.write(b"stale" * 1000)
+        with open(dest + ".validator", "w") as f:
+            f.write('"old"')
+        entry = self.manager.download(self.base + "/demo-1.0.tar.gz", dest)
+        self.assertEqual(entry["sha256"], hashlib.sha256(self.content).hexdigest())
+        # 没有validator的文件不续传
+        with open(dest, "wb") as f:
+            f.write(b"stale")
+        entry = self.manager.download(self.base + "/demo-1.0.tar.gz", dest)
+        self.assertEqual(entry["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(RangeHandler.requests[-1], ("/demo-1.0.tar.gz", None))
+
+    def test_content_range_mismatch(self):
+        dest = os.path.join(self.tmp.name, "demo.part")
+        with open(dest, "wb") as f:
+            f.write(self.content[:5000])
+        with open(dest + ".validator", "w") as f:
+            f.write(self.etag)
+        RangeHandler.bad_range.add("/demo-1.0.tar.gz")
+        entry = self.manager.download(self.base + "/demo-1.0.tar.gz", dest)
+        self.assertEqual(entry["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(self.manager.stats.as_dict()["retries"], 1)
+
+    def test_mirror_and_missing(self):
+        self.manager.mirrors = {self.base + "/": [self.base + "/mirror/"]}
+        dest = os.path.join(self.tmp.name, "other.tar.gz")
+        self.assertEqual(self.manager.download(self.base + "/other-2.0.tar.gz", dest)["size"], 5)
+        with self.assertRaises(DownloadError):
+            self.manager.download(self.base + "/missing.tar.gz", os.path.join(self.tmp.name, "missing"))
+        # 404不重试
+        self.assertEqual(len([r for r in RangeHandler.requests if "missing" in r[0]]), 2)
+
+    def test_prefetch_into_cache(self):
+        cache = DownloadCache(os.path.join(self.tmp.name, "cache"))
+        urls = [self.base + "/demo-1.0.tar.gz", self.base + "/demo-1.0.tar.gz", self.base + "/missing.tar.gz"]
+        stats = self.manager.prefetch(urls, cache)
+        self.assertEqual((stats["total"], stats["done"], stats["failed"]), (2, 1, 1))
+        self.assertEqual(cache.lookup(urls[0])["sha256"], hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(DownloadManager().prefetch(urls[:1], cache)["cached"], 1)
+
+    def test_concurrent_download_same_url(self):
+        cache = DownloadCache(os.path.join(self.tmp.name, "cache"))
+        url = self.base + "/demo-1.0.tar.gz"
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.download(url, manager=self.manager)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({entry["sha256"] for entry in results}, {hashlib.sha256(self.content).hexdigest()})
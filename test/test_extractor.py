@@ -0,0 +1,99 @@
+import os
+import io
+import tarfile
+import zipfile
+import tempfile
+import unittest
+from src.core.source_index import SourceIndex
+from src.utils.extractor import extract_archive, list_archive
+
+
+class TestExtractor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "output")
+        os.makedirs(self.output)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_tar(self, name, members, mode="w:gz"):
+        path = os.path.join(self.tmp.name, name)
+        with tarfile.open(path, mode) as tar:
+            for member_name, content in members.items():
+                info = tarfile.TarInfo(member_name)
+                if content is None:
+                    info.type = tarfile.DIRTYPE
+                    info.mode = 0o755
+                    tar.addfile(info)
+                    continue
+                data = content.encode("utf-8")
+                info.size = len(data)
+                info.mode = 0o755 if member_name.endswith(".sh") else 0o644
+                tar.addfile(info, io.BytesIO(data))
+        return path
+
+    def test_common_root(self):
+        path = self.make_tar("demo-1.0.tar.xz", {
+            "./demo-1.0": None,
+            "./demo-1.0/CMakeLists.txt": "project(demo)",
+            "./demo-1.0/autogen.sh": "#!/bin/sh",
+            "./demo-1.0/.git/HEAD": "ref: refs/heads/master",
+            "./demo-1.0/tests/fixtures/big.bin": "x" * 100,
+        }, mode="w:xz")
+        result = extract_archive(path, self.output, skip_patterns=["*/tests/fixtures/*"])
+        self.assertEqual(result.root, os.path.join(self.output, "demo-1.0"))
+        self.assertEqual(sorted(result.files), [("CMakeLists.txt", 13), ("autogen.sh", 9)])
+        self.assertTrue(os.access(os.path.join(result.root, "autogen.sh"), os.X_OK))
+        self.assertFalse(os.path.exists(os.path.join(result.root, ".git")))
+        self.assertEqual(sorted(os.listdir(self.output)), ["demo-1.0"])
+        index = SourceIndex.from_entries(result.root, result.files, result.dirs)
+        self.assertEqual(index.find("CMakeLists.txt"), ["CMakeLists.txt"])
+
+    def test_list_without_extract(self):
+        path = self.make_tar("demo-1.0.tar.gz", {
+            "demo-1.0/": None,
+            "demo-1.0/CMakeLists.txt": "project(demo VERSION 1.0.3)",
+            "demo-1.0/src/main.c": "int main() {}",
+            "demo-1.0/a/b/c/CMakeLists.txt": "add_library(x)",
+        })
+        listing = list_archive(path, ["CMakeLists.txt"])
+        self.assertEqual(listing.root, "demo-1.0")
+        self.assertEqual(sorted(name for name, _ in listing.files),
+                         ["CMakeLists.txt", "a/b/c/CMakeLists.txt", "src/main.c"])
+        self.assertEqual(listing.contents, {"CMakeLists.txt": "project(demo VERSION 1.0.3)"})
+        self.assertEqual(os.listdir(self.output), [])
+
+    def test_without_root_dir(self):
+        path = self.make_tar("flat-2.0.tar.bz2", {"setup.py": "", "pkg/__init__.py": ""}, mode="w:bz2")
+        result = extract_archive(path, self.output)
+        self.assertEqual(result.root, os.path.join(self.output, "flat-2.0"))
+        self.assertTrue(os.path.isfile(os.path.join(result.root, "pkg", "__init__.py")))
+
+    def test_zip_and_unsafe_members(self):
+        path = os.path.join(self.tmp.name, "demo-1.0.zip")
+        with zipfile.ZipFile(path, "w") as f:
+            f.writestr("demo-1.0/pom.xml", "<project/>")
+            f.writestr("../evil", "x")
+        result = extract_archive(path, self.output)
+        self.assertEqual(result.files, [("pom.xml", 10)])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "evil")))
+
+    def test_zip_symlink_escape(self):
+        path = os.path.join(self.tmp.name, "demo-1.0.zip")
+        outside = os.path.join(self.tmp.name, "outside")
+        os.makedirs(outside)
+        with zipfile.ZipFile(path, "w") as f:
+            for name, link in (("demo-1.0/up", "../../../outside"), ("demo-1.0/abs", outside),
+                               ("demo-1.0/inner", "src")):
+                info = zipfile.ZipInfo(name)
+                info.external_attr = (0o120777 << 16)
+                f.writestr(info, link)
+            f.writestr("demo-1.0/src/main.c", "int main;")
+            f.writestr("demo-1.0/up/pwned.txt", "x")
+            f.writestr("demo-1.0/abs/pwned.txt", "x")
+        result = extract_archive(path, self.output)
+        self.assertEqual(os.listdir(outside), [])
+        self.assertEqual(os.readlink(os.path.join(result.root, "inner")), "src")
+        self.assertFalse(os.path.islink(os.path.join(result.root, "up")))
+        self.assertFalse(os.path.islink(os.path.join(result.root, "abs")))
@@ -0,0 +1,34 @@
+import os
+import hashlib
+import tempfile
+import unittest
+from src.utils import file_util
+from src.utils.file_util import DigestTask, get_digests, get_sha1sum
+
+
+class TestDigests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "demo-1.0.tar.gz")
+        self.content = os.urandom(10000)
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_multiple_digests_in_chunks(self):
+        chunk_size = file_util.digest_chunk_size
+        file_util.digest_chunk_size = 4096
+        try:
+            digests = get_digests(self.path)
+        finally:
+            file_util.digest_chunk_size = chunk_size
+        self.assertEqual(digests, {"sha1": hashlib.sha1(self.content).hexdigest(),
+                                   "sha256": hashlib.sha256(self.content).hexdigest()})
+        self.assertEqual(get_sha1sum(self.path), digests["sha1"])
+
+    def test_background_task(self):
+        self.assertEqual(DigestTask(self.path).result()["sha256"], hashlib.sha256(self.content).hexdigest())
+        with self.assertRaises(OSError):
+            DigestTask(os.path.join(self.tmp.name, "missing")).result()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from src.utils.download import clone_code
+from src.utils.git_mirror import GitMirror, GitError, run_git, list_tree
+
+
+class TestGitMirror(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.remote = os.path.join(self.tmp.name, "remote", "demo.git")
+        self.mirror_root = os.path.join(self.tmp.name, "mirrors")
+        self.work = os.path.join(self.tmp.name, "work")
+        os.makedirs(self.work)
+        author = ["-c", "user.name=test", "-c", "user.email=test@example.com"]
+        run_git(["init", "--quiet", "-b", "main", self.remote])
+        self.commit(author, "CMakeLists.txt", "project(demo VERSION 1.0)")
+        run_git(["tag", "v1.0"], cwd=self.remote)
+        self.commit(author, "CMakeLists.txt", "project(demo VERSION 2.0)")
+        self.author = author
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def commit(self, author, name, content):
+        with open(os.path.join(self.remote, name), "w") as f:
+            f.write(content)
+        run_git(["add", name], cwd=self.remote)
+        run_git(author + ["commit", "--quiet", "-m", content], cwd=self.remote)
+
+    def read(self, path):
+        with open(os.path.join(path, "CMakeLists.txt")) as f:
+            return f.read()
+
+    def test_default_branch_and_tag(self):
+        path = clone_code(self.work, self.remote, mirror_root=self.mirror_root)
+        self.assertEqual(path, os.path.join(self.work, "demo"))
+        self.assertIn("2.0", self.read(path))
+        path = clone_code(self.work, self.remote, "v1.0", mirror_root=self.mirror_root)
+        self.assertIn("1.0", self.read(path))
+        alternates = os.path.join(path, ".git", "objects", "info", "alternates")
+        self.assertTrue(os.path.isfile(alternates))
+        self.assertEqual(run_git(["remote", "get-url", "origin"], cwd=path), self.remote)
+
+    def test_incremental_update_and_offline(self):
+        mirror = GitMirror(self.mirror_root)
+        mirror.checkout(self.remote, os.path.join(self.work, "demo"))
+        self.commit(self.author, "CMakeLists.txt", "project(demo VERSION 3.0)")
+        offline = GitMirror(self.mirror_root, offline=True)
+        offline.checkout(self.remote, os.path.join(self.work, "demo"))
+        self.assertIn("2.0", self.read(os.path.join(self.work, "demo")))
+        mirror.checkout(self.remote, os.path.join(self.work, "demo"))
+        self.assertIn("3.0", self.read(os.path.join(self.work, "demo")))
+        with self.assertRaises(GitError):
+            mirror.checkout(self.remote, os.path.join(self.work, "demo"), "no-such-ref")
+
+    def test_sparse_partial_checkout(self):
+        os.makedirs(os.path.join(self.remote, "src", "deep"))
+        self.commit(self.author, "src/big.c", "int main() {}")
+        self.commit(self.author, "src/deep/CMakeLists.txt", "add_library(x)")
+        run_git(["config", "uploadpack.allowFilter", "true"], cwd=self.remote)
+        run_git(["config", "uploadpack.allowAnySHA1InWant", "true"], cwd=self.remote)
+        url = "file://" + self.remote
+        path = clone_code(self.work, url, mirror_root=self.mirror_root, sparse_files=["CMakeLists.txt"])
+        self.assertTrue(os.path.isfile(os.path.join(path, "src", "deep", "CMakeLists.txt")))
+        self.assertFalse(os.path.exists(os.path.join(path, "src", "big.c")))
+        missing = run_git(["rev-list", "--objects", "--missing=print", "HEAD"], cwd=path)
+        self.assertIn("?", missing)
+        files, dirs = list_tree(path)
+        self.assertIn("src/big.c", [name for name, _ in files])
+        self.assertEqual(dirs, ["src", "src/deep"])
+        # 离线时部分镜像不能完整检出
+        with self.assertRaises(GitError):
+            GitMirror(self.mirror_root, offline=True).checkout(url, os.path.join(self.work, "demo"))
+        # 需要构建时先补全镜像再完整检出
+        path = clone_code(self.work, url, mirror_root=self.mirror_root)
+        self.assertTrue(os.path.isfile(os.path.join(path, "src", "big.c")))
+        self.assertFalse(GitMirror(self.mirror_root).is_partial(url))
+        # 补全后的镜像在远程不可用时也能离线完整检出
+        os.rename(self.remote, self.remote + ".gone")
+        path = clone_code(self.work, url, mirror_root=self.mirror_root, offline=True)
+        self.assertTrue(os.path.isfile(os.path.join(path, "src", "big.c")))
+        self.assertEqual(run_git(["rev-list", "--objects", "--missing=print", "HEAD"], cwd=path).count("?"), 0)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from src.config.config import BuildConfig
+from src.core.knowledge_base import KnowledgeBase, apply_fixes, failure_signature, package_features
+from src.core.source_index import SourceIndex
+
+
+class TestKnowledgeBase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.knowledge = KnowledgeBase(os.path.join(self.tmp.name, "knowledge.db"), min_score=1.5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_signature(self):
+        self.assertEqual(failure_signature("./configure: line 1024: /usr/bin/flex: command not found\n"),
+                         "./configure: line #: /flex: command not found")
+
+    def test_features(self):
+        index = SourceIndex("/src", ["configure.ac", "src/main.c", "src/util.h", "doc/index.html"])
+        self.assertEqual(package_features({"buildRequires": ["gcc"]}, index),
+                         {"req:gcc", "ext:c", "ext:h", "file:configure.ac"})
+
+    def test_suggest_from_similar_packages(self):
+        features = {"req:gcc", "ext:c", "file:configure.ac"}
+        fix = {"type": "buildRequires", "value": "flex", "line": "flex: command not found"}
+        self.knowledge.learn("a", "autotools", features, [fix], True)
+        self.assertEqual(self.knowledge.suggest("autotools", features), [])
+        self.knowledge.learn("b", "autotools", features | {"ext:y"}, [fix], True)
+        self.knowledge.learn("c", "cmake", features, [fix], True)
+        self.assertEqual(self.knowledge.suggest("autotools", features), [("buildRequires", "flex", 1.75)])
+        # 包自身上次被证实有效的修复直接推荐
+        self.assertEqual(self.knowledge.suggest("autotools", features, name="a"), [("buildRequires", "flex", 2.25)])
+        self.assertEqual(self.knowledge.suggest("cmake", {"ext:go"}, name="c"), [("buildRequires", "flex", 1.5)])
+        self.assertEqual(self.knowledge.suggest("autotools", {"ext:go"}), [])
+
+    def test_unrelated_packages_not_counted(self):
+        fix = {"type": "buildRequires", "value": "flex", "line": "flex: command not found"}
+        for i in range(20):
+            self.knowledge.learn(f"p{i}", "autotools", {f"req:lib{i}"}, [fix], True)
+        # 没有共同特征的包不计分，无论数量多少
+        self.assertEqual(self.knowledge.suggest("autotools", {"req:gcc", "ext:c"}), [])
+
+    def test_one_fix_per_failure(self):
+        features = {"req:gcc", "ext:c"}
+        line = "./configure: line 10: flex: command not found"
+        for name, value in (("a", "flex"), ("b", "flex"), ("c", "flex-devel"), ("d", "flex-devel"),
+                            ("e", "flex-devel")):
+            self.knowledge.learn(name, "autotools", features, [{"type": "buildRequires", "value": value,
+                                                                "line": line}], True)
+        # 同一失败的不同修复只推荐得分最高的一个
+        self.assertEqual(self.knowledge.suggest("autotools", features), [("buildRequires", "flex-devel", 3.0)])
+
+    def test_apply_fixes(self):
+        config = BuildConfig()
+        metadata = {"buildRequires": ["flex"], "makeFlags": "-j1"}
+        applied = apply_fixes(metadata, config, [("buildRequires", "flex", 2.0), ("buildRequires", "bison", 2.0),
+                                                 ("makeFlags", "V=1", 1.0),
+                                                 ("maven_remove_plugins", "maven-enforcer-plugin", 1.0)])
+        self.assertEqual(len(applied), 3)
+        self.assertEqual(metadata, {"buildRequires": ["flex", "bison"], "makeFlags": "-j1 V=1"})
+        self.assertIn("maven-enforcer-plugin", config.maven_remove_plugins)
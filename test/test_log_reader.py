@@ -0,0 +1,71 @@
+import os
+import re
+import tempfile
+import unittest
+from src.utils.log_reader import BuildLog
+from test.test_logparser import make_context
+from src.core.logparser import LogParser
+
+
+class TestBuildLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "build.log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_log(self, content):
+        with open(self.path, "w") as f:
+            f.write(content)
+
+    def test_lines_and_contains(self):
+        self.write_log("编译 a.c\n\nbuild success\nlast")
+        with BuildLog(self.path) as build_log:
+            self.assertEqual(list(build_log.lines()), ["编译 a.c\n", "\n", "build success\n", "last"])
+            self.assertEqual(list(build_log.reverse_lines()), ["last", "build success\n", "\n", "编译 a.c\n"])
+            self.assertTrue(build_log.contains("build success"))
+            self.assertFalse(build_log.contains("build failed"))
+
+    def test_empty_log(self):
+        self.write_log("")
+        with BuildLog(self.path) as build_log:
+            self.assertEqual(list(build_log.lines()), [])
+            self.assertFalse(build_log.contains("build success"))
+            self.assertEqual(build_log.candidate_offsets(re.compile("x")), [])
+
+    def test_candidate_offsets(self):
+        lines = ["ok %d 编译\n" % i for i in range(2000)]
+        lines[7] = "bash: flex: command not found\n"
+        lines[1500] = "bison: command not found\n"
+        self.write_log("".join(lines))
+        regex = re.compile("command not found", re.MULTILINE)
+        with BuildLog(self.path) as build_log:
+            for workers in (1, 4):
+                offsets = build_log.candidate_offsets(regex, workers=workers)
+                self.assertEqual([build_log.read_line(offset) for offset in offsets], [lines[7], lines[1500]])
+            ranges = build_log.split(4)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], build_log.size)
+            for start, end in ranges:
+                self.assertEqual(build_log.line_start(end), end)
+
+    def parse_large_log(self, content):
+        context = make_context(self.tmp.name)
+        context.config.log_parallel_threshold = 0
+        context.config.log_tail_bytes = 64
+        context.config.log_scan_workers = 2
+        self.write_log(content)
+        log_parser = LogParser({"buildRequires": []}, {}, compilation="autotools", context=context)
+        metadata = log_parser.parse_build_log()
+        self.assertTrue(log_parser.restart)
+        return metadata["buildRequires"]
+
+    def test_parse_large_log_tail_first(self):
+        content = "bash: flex: command not found\n" + "gcc -c a.c\n" * 100 + "bison: command not found\n"
+        # 先分析尾部，再收集头部的错误
+        self.assertEqual(self.parse_large_log(content), ["bison", "flex"])
+
+    def test_parse_large_log_head_candidates(self):
+        content = "gcc -c a.c\n" * 50 + "bash: flex: command not found\n" + "gcc -c b.c\n" * 100
+        self.assertEqual(self.parse_large_log(content), ["flex"])
@@ -0,0 +1,177 @@
+import os
+import time
+import tempfile
+import unittest
+from src.builder.epkg_build import stream_build
+from src.core.context import JobContext
+from src.core.logparser import LogParser
+from src.core.pattern_engine import PatternEngine
+from src.parse.pom_model import PomReactor
+from src.utils.package_index import PackageIndex
+
+
+def make_context(path):
+    context = JobContext()
+    context.config.download_path = path
+    context.config.patterns_loaded = True
+    context.config.simple_pats = {r"No package '([\w.-]+)' found": "pkgconfig"}
+    context.config.make_failed_pats = [r"(\w+): command not found", r"checking for (\w+)\.\.\. no"]
+    context.config.failed_commands = {"flex": "flex", "bison": "bison"}
+    return context
+
+
+class TestPatternEngine(unittest.TestCase):
+    def test_first_match_in_table_order(self):
+        engine = PatternEngine()
+        engine.add_table("make", [r"checking for (\w+)\.\.\. no", r"(\w+)\.\.\. no"])
+        matched = engine.search("checking for flex... no\n", "make")
+        self.assertEqual(matched.pattern, r"checking for (\w+)\.\.\. no")
+        self.assertEqual(matched.match.group(1), "flex")
+        self.assertIsNone(engine.search("checking for gcc... yes\n", "make"))
+
+    def test_prefilter(self):
+        engine = PatternEngine()
+        engine.add_table("simple", {r"No package '([\w.-]+)' found": "pkgconfig", r"^\w+$": "word"})
+        self.assertTrue(engine.may_match("No package 'glib-2.0' found", ["simple"]))
+        self.assertTrue(engine.may_match("word", ["simple"]))
+        self.assertFalse(engine.may_match("gcc -c a.c -o a.o", ["simple"]))
+
+    def test_invalid_pattern_skipped(self):
+        engine = PatternEngine()
+        entries = engine.add_table("perl", [r"you may need to install the ([\w-:\.]*) module", r"(\w+) not found"])
+        self.assertEqual(len(entries), 1)
+
+    def test_scan_text(self):
+        engine = PatternEngine()
+        engine.add_table("make", [r"(\w+): command not found"])
+        text = "gcc a.c\nbash: flex: command not found\nmake: *** [all] Error 1\nbison: command not found"
+        found = [(line.strip(), matches[0].match.group(1)) for line, matches in engine.scan(text, ["make"])]
+        self.assertEqual(found, [("bash: flex: command not found", "flex"), ("bison: command not found", "bison")])
+
+
+class TestLogParser(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.context = make_context(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_log(self, content):
+        with open(os.path.join(self.tmp.name, "build.log"), "w") as f:
+            f.write(content)
+
+    def test_make_failed_command(self):
+        self.write_log("gcc -c a.c\n./configure: line 10: flex: command not found\n")
+        log_parser = LogParser({"buildRequires": []}, {}, compilation="autotools", context=self.context)
+        metadata = log_parser.parse_build_log()
+        self.assertTrue(log_parser.restart)
+        self.assertEqual(metadata["buildRequires"], ["flex"])
+
+    def fake_dnf(self):
+        """PATH中放一个记录调用的dnf，用于确认分析日志时没有调用dnf"""
+        bin_dir = os.path.join(self.tmp.name, "bin")
+        os.makedirs(bin_dir)
+        marker = os.path.join(self.tmp.name, "dnf-called")
+        with open(os.path.join(bin_dir, "dnf"), "w") as f:
+            f.write(f"#!/bin/sh\ntouch {marker}\n")
+        os.chmod(os.path.join(bin_dir, "dnf"), 0o755)
+        path = os.environ.get("PATH", "")
+        os.environ["PATH"] = bin_dir + os.pathsep + path
+        self.addCleanup(os.environ.__setitem__, "PATH", path)
+        return marker
+
+    def test_make_failed_command_from_index(self):
+        marker = self.fake_dnf()
+        self.context.package_index = PackageIndex(os.path.join(self.tmp.name, "packages.db"))
+        conn = self.context.package_index.connect()
+        conn.execute("INSERT INTO packages (id, repo, name) VALUES (1, 'r', 'gperf')")
+        conn.execute("INSERT INTO files (path, package) VALUES ('/usr/bin/gperf', 1)")
+        log_parser = LogParser({"buildRequires": []}, {}, compilation="autotools", context=self.context)
+        log_parser.feed_lines(["bash: gperf: command not found\n", "bash: unknown: command not found\n"])
+        self.context.package_index.close()
+        # failed_commands中没有映射的命令通过索引找到所属的包，索引中没有的命令不调用dnf
+        self.assertEqual(log_parser.metadata["buildRequires"], ["gperf"])
+        self.assertFalse(os.path.exists(marker))
+
+    def test_make_failed_command_without_index(self):
+        marker = self.fake_dnf()
+        log_parser = LogParser({"buildRequires": []}, {}, compilation="autotools", context=self.context)
+        log_parser.feed_lines(["bash: gperf: command not found\n"])
+        self.assertFalse(log_parser.restart)
+        self.assertEqual(log_parser.metadata["buildRequires"], [])
+        self.assertFalse(os.path.exists(marker))
+
+    def test_simple_pattern(self):
+        self.write_log("checking for GLIB...\nNo package 'glib-2.0' found\n")
+        log_parser = LogParser({}, {}, compilation="meson", context=self.context)
+        metadata = log_parser.parse_build_log()
+        self.assertTrue(log_parser.restart)
+        self.assertEqual(metadata["buildRequires"], ["pkgconfig"])
+
+    def test_engine_built_once(self):
+        LogParser({}, {}, compilation="make", context=self.context)
+        engine = self.context.pattern_engine
+        LogParser({}, {}, compilation="make", context=self.context)
+        self.assertIs(self.context.pattern_engine, engine)
+
+    def test_feed_stops_running_build(self):
+        self.context.config.early_abort_grace_seconds = 0
+        log_parser = LogParser({}, {}, compilation="autotools", context=self.context)
+        log_path = os.path.join(self.tmp.name, "0-build.log")
+        cmd = "for i in $(seq 1 50); do echo compiling $i; sleep 0.1; " \
+              "if [ $i = 3 ]; then echo 'bison: command not found'; fi; done"
+        start = time.time()
+        aborted = stream_build(cmd, log_path, log_parser.feed)
+        self.assertTrue(aborted)
+        self.assertLess(time.time() - start, 4)
+        self.assertEqual(log_parser.metadata["buildRequires"], ["bison"])
+        with open(log_path, "r") as f:
+            self.assertTrue(f.read().endswith("bison: command not found\n"))
+
+    def test_collect_all_fixes(self):
+        self.write_log("bash: flex: command not found\nNo package 'glib-2.0' found\n"
+                       "bash: flex: command not found\nbash: bison: command not found\n")
+        log_parser = LogParser({"buildRequires": []}, {}, compilation="autotools", context=self.context)
+        metadata = log_parser.parse_build_log()
+        self.assertEqual(metadata["buildRequires"], ["flex", "pkgconfig", "bison"])
+        self.assertEqual([fix["value"] for fix in log_parser.fixes], ["flex", "pkgconfig", "bison"])
+        # 上一轮已经添加过的依赖不再触发重新构建
+        log_parser = LogParser(metadata, {}, compilation="autotools", context=self.context)
+        log_parser.parse_build_log()
+        self.assertFalse(log_parser.restart)
+
+    def test_feed_grace_window(self):
+        self.context.config.early_abort_grace_lines = 3
+        log_parser = LogParser({}, {}, compilation="autotools", context=self.context)
+        self.assertFalse(log_parser.feed("bash: flex: command not found\n"))
+        self.assertFalse(log_parser.feed("compiling\n"))
+        self.assertFalse(log_parser.feed("bash: bison: command not found\n"))
+        self.assertFalse(log_parser.feed("compiling\n"))
+        self.assertTrue(log_parser.feed("compiling\n"))
+        self.assertEqual(log_parser.metadata["buildRequires"], ["flex", "bison"])
+
+    def test_stream_build_without_abort(self):
+        log_path = os.path.join(self.tmp.name, "0-build.log")
+        self.assertFalse(stream_build("echo one; echo two", log_path, lambda line: False))
+        with open(log_path, "r") as f:
+            self.assertEqual(f.read(), "one\ntwo\n")
+
+    def test_maven_analysis_reused(self):
+        self.write_log("[INFO] Building demo 1.0\n"
+                       "[ERROR] Failed to execute goal org.apache.maven.plugins:maven-enforcer-plugin:3.0.0:enforce "
+                       "(enforce) on project demo: Some Enforcer rules have failed.\n")
+        with open(os.path.join(self.tmp.name, "pom.xml"), "w") as f:
+            f.write("<project><artifactId>demo</artifactId><build><plugins><plugin>"
+                    "<artifactId>maven-enforcer-plugin</artifactId></plugin></plugins></build></project>")
+        self.context.pom_reactor = PomReactor(self.tmp.name)
+        metadata = {"buildRequires": []}
+        log_parser = LogParser(metadata, {}, compilation="maven", context=self.context)
+        self.assertFalse(log_parser.feed("[INFO] Compiling 12 source files\n"))
+        self.assertIsNone(log_parser.maven_analysis)
+        self.assertFalse(log_parser.feed("[ERROR] COMPILATION ERROR\n"))
+        analysis = log_parser.maven_analysis
+        log_parser.parse_build_log()
+        self.assertTrue(log_parser.restart)
+        self.assertIs(log_parser.maven_analysis, analysis)
+        self.assertIn("maven-enforcer-plugin", self.context.config.maven_remove_plugins)
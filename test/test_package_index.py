@@ -0,0 +1,72 @@
+import os
+import gzip
+import tempfile
+import unittest
+from src.utils.cmd_util import get_package_by_file
+from src.utils.package_index import PackageIndex
+
+primary = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://linux.duke.edu/metadata/common" xmlns:rpm="http://linux.duke.edu/metadata/rpm" packages="3">
+<package type="rpm"><name>zlib-devel</name><arch>x86_64</arch>
+<format><rpm:provides><rpm:entry name="zlib-devel"/><rpm:entry name="pkgconfig(zlib)"/></rpm:provides>
+<file>/usr/include/zlib.h</file></format></package>
+<package type="rpm"><name>openssl-devel</name><arch>x86_64</arch>
+<format><rpm:provides><rpm:entry name="pkgconfig(openssl)"/></rpm:provides></format></package>
+<package type="rpm"><name>zlib</name><arch>src</arch><format></format></package>
+</metadata>
+"""
+
+filelists = """<?xml version="1.0" encoding="UTF-8"?>
+<filelists xmlns="http://linux.duke.edu/metadata/filelists" packages="2">
+<package pkgid="1" name="zlib-devel" arch="x86_64"><file>/usr/include/zlib.h</file>
+<file>/usr/lib64/libz.so</file></package>
+<package pkgid="2" name="openssl-devel" arch="x86_64"><file>/usr/include/openssl/ssl.h</file></package>
+</filelists>
+"""
+
+repomd = """<?xml version="1.0" encoding="UTF-8"?>
+<repomd xmlns="http://linux.duke.edu/metadata/repo"><revision>{revision}</revision>
+<data type="primary"><checksum type="sha256">p{revision}</checksum><location href="repodata/primary.xml.gz"/></data>
+<data type="filelists"><checksum type="sha256">f{revision}</checksum><location href="repodata/filelists.xml.gz"/>
+</data></repomd>
+"""
+
+
+class TestPackageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmp.name, "repo")
+        os.makedirs(os.path.join(self.repo, "repodata"))
+        self.write_repo("1", primary, filelists)
+        self.index = PackageIndex(os.path.join(self.tmp.name, "packages.db"))
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def write_repo(self, revision, primary_xml, filelists_xml):
+        with gzip.open(os.path.join(self.repo, "repodata", "primary.xml.gz"), "wt") as f:
+            f.write(primary_xml)
+        with gzip.open(os.path.join(self.repo, "repodata", "filelists.xml.gz"), "wt") as f:
+            f.write(filelists_xml)
+        with open(os.path.join(self.repo, "repodata", "repomd.xml"), "w") as f:
+            f.write(repomd.format(revision=revision))
+
+    def test_lookup(self):
+        self.assertEqual(self.index.refresh([self.repo]), 1)
+        self.assertEqual(get_package_by_file("/usr/lib64/libz.so", index=self.index), "zlib-devel")
+        self.assertEqual(get_package_by_file("/usr/lib64/libnone.so", index=self.index, use_dnf=False), "")
+        self.assertEqual(self.index.lookup_files(["/usr/include/zlib.h", "/usr/include/openssl/ssl.h", "/none"]),
+                         {"/usr/include/zlib.h": "zlib-devel", "/usr/include/openssl/ssl.h": "openssl-devel"})
+        self.assertEqual(self.index.lookup_provide("pkgconfig(openssl)"), "openssl-devel")
+        self.assertEqual(self.index.connect().execute("SELECT COUNT(*) FROM files").fetchone()[0], 3)
+
+    def test_incremental_refresh(self):
+        self.index.refresh([self.repo])
+        self.assertEqual(self.index.refresh([self.repo]), 0)
+        self.assertEqual(self.index.refresh([self.repo], ttl=3600), 0)
+        self.write_repo("2", primary.replace("openssl-devel", "libssl-devel"),
+                        filelists.replace("openssl-devel", "libssl-devel"))
+        self.assertEqual(self.index.refresh([self.repo]), 1)
+        self.assertEqual(self.index.lookup_file("/usr/include/openssl/ssl.h"), "libssl-devel")
+        self.assertEqual(self.index.connect().execute("SELECT COUNT(*) FROM packages").fetchone()[0], 2)
@@ -0,0 +1,85 @@
+import os
+import time
+import tempfile
+import unittest
+from src.config.config import BuildConfig
+from src.config.pattern_store import PatternStore
+
+
+class FakeEs:
+    def __init__(self, mappings):
+        self.mappings = mappings
+        self.calls = 0
+
+    def query(self, index_name):
+        self.calls += 1
+        return [["name", "value"], self.mappings]
+
+
+class TestPatternStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "patterns.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot_reused(self):
+        es = FakeEs([["cmake", "cmake", ""]])
+        store = PatternStore(self.path, es.query)
+        self.assertEqual(store.get("failed_commands"), [["cmake", "cmake", ""]])
+        self.assertEqual(store.get("failed_commands"), [["cmake", "cmake", ""]])
+        self.assertEqual(es.calls, 1)
+
+    def test_offline_without_database(self):
+        es = FakeEs([["cmake", "cmake", ""]])
+        PatternStore(self.path, es.query).get("failed_commands")
+        offline = PatternStore(self.path, None, offline=True)
+        self.assertEqual(offline.get("failed_commands"), [["cmake", "cmake", ""]])
+        self.assertIsNone(offline.get("simple_patterns"))
+
+    def test_expired_snapshot_refreshed_in_background(self):
+        es = FakeEs([["gcc", "gcc", ""]])
+        store = PatternStore(self.path, es.query, ttl=0)
+        store.get("failed_commands")
+        _, old_version, _ = store.load("failed_commands")
+        es.mappings = [["g++", "gcc-c++", ""]]
+        time.sleep(0.01)
+        self.assertEqual(store.get("failed_commands"), [["gcc", "gcc", ""]])
+        for _ in range(100):
+            if store.load("failed_commands")[1] != old_version:
+                break
+            time.sleep(0.05)
+        self.assertEqual(store.load("failed_commands")[0], [["g++", "gcc-c++", ""]])
+
+    def test_setup_patterns_once(self):
+        es = FakeEs([["pkg-config", "pkgconf", ""]])
+        config = BuildConfig()
+        config.pattern_cache_path = self.path
+        store = PatternStore(self.path, es.query)
+        for name in ["make_failed_patterns", "failed_commands"]:
+            store.get(f"autopkg_openeuler_2403_{name}")
+        config.offline = True
+        config.setup_patterns()
+        config.patterns_loaded = False
+        config.setup_patterns()
+        self.assertEqual(config.make_failed_pats, ["pkg-config"])
+        self.assertEqual(config.failed_commands, {"pkg-config": "pkgconf"})
+        self.assertEqual(BuildConfig().make_failed_pats, [])
+
+    def test_setup_patterns_retry(self):
+        es = FakeEs([["Core", "Core", ""]])
+        config = BuildConfig()
+        config.pattern_cache_path = self.path
+        config.offline = True
+        store = PatternStore(self.path, es.query)
+        store.get("autopkg_openeuler_2403_qt_modules")
+        # 部分规则表没有读取到时不标记为已加载，下次调用时重试
+        self.assertFalse(config.setup_patterns())
+        self.assertFalse(config.patterns_loaded)
+        for name in ["failed_commands", "failed_flags", "cmake_modules", "pkgconfig_patterns", "simple_patterns",
+                     "make_failed_patterns", "pkgconfig_failed_patterns"]:
+            store.get(f"autopkg_openeuler_2403_{name}")
+        self.assertTrue(config.setup_patterns())
+        self.assertTrue(config.patterns_loaded)
+        self.assertEqual(config.qt_modules, {"Core": "Qt5Core"})
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from src.parse.pom_model import PomReactor, PropertyResolver, pre_resolve
+from src.utils.package_index import PackageIndex
+
+root_pom = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <groupId>org.demo</groupId>
+  <artifactId>demo-parent</artifactId>
+  <version>1.0</version>
+  <packaging>pom</packaging>
+  <properties>
+    <guava.version>32.0</guava.version>
+    <junit.group>junit</junit.group>
+  </properties>
+  <modules><module>core</module><module>app</module></modules>
+  <dependencyManagement><dependencies>
+    <dependency><groupId>com.google.guava</groupId><artifactId>guava</artifactId><version>${guava.version}</version></dependency>
+    <dependency><groupId>${junit.group}</groupId><artifactId>junit</artifactId><version>4.13</version><scope>test</scope></dependency>
+  </dependencies></dependencyManagement>
+  <build><plugins>
+    <plugin><artifactId>maven-compiler-plugin</artifactId></plugin>
+    <plugin><artifactId>maven-enforcer-plugin</artifactId></plugin>
+    <plugin><groupId>org.codehaus.mojo</groupId><artifactId>build-helper-maven-plugin</artifactId></plugin>
+  </plugins></build>
+</project>
+"""
+
+core_pom = """<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <parent><groupId>org.demo</groupId><artifactId>demo-parent</artifactId><version>1.0</version></parent>
+  <artifactId>demo-core</artifactId>
+  <dependencies>
+    <dependency><groupId>com.google.guava</groupId><artifactId>guava</artifactId></dependency>
+    <dependency><groupId>junit</groupId><artifactId>junit</artifactId></dependency>
+  </dependencies>
+</project>
+"""
+
+app_pom = """<project xmlns="http://maven.apache.org/POM/4.0.0">
+  <parent><groupId>org.demo</groupId><artifactId>demo-parent</artifactId><version>1.0</version></parent>
+  <artifactId>demo-app</artifactId>
+  <dependencies>
+    <dependency><groupId>${project.groupId}</groupId><artifactId>demo-core</artifactId></dependency>
+    <dependency><groupId>org.slf4j</groupId><artifactId>slf4j-api</artifactId></dependency>
+  </dependencies>
+</project>
+"""
+
+
+class TestPomModel(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "src")
+        for path, content in (("pom.xml", root_pom), ("core/pom.xml", core_pom), ("app/pom.xml", app_pom),
+                              ("core/src/test/resources/pom.xml", "<project><artifactId>fixture</artifactId></project>")):
+            os.makedirs(os.path.dirname(os.path.join(self.root, path)), exist_ok=True)
+            with open(os.path.join(self.root, path), "w") as f:
+                f.write(content)
+        self.reactor = PomReactor(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_inheritance(self):
+        self.assertEqual([model.path for model in self.reactor.modules], ["pom.xml", "core/pom.xml", "app/pom.xml"])
+        core = self.reactor.models["core/pom.xml"]
+        deps = {dep["artifactId"]: (dep["groupId"], dep["version"], dep["scope"])
+                for dep in self.reactor.dependencies(core)}
+        self.assertEqual(deps, {"guava": ("com.google.guava", "32.0", "compile"), "junit": ("junit", "4.13", "test")})
+        self.assertIn("org.demo:demo-core", self.reactor.artifacts())
+
+    def test_pre_resolve_without_index(self):
+        requires, remove_plugins = pre_resolve(self.reactor)
+        # 没有索引时不确认插件是否存在，插件既不加入buildRequires也不删除
+        self.assertEqual(requires, ["mvn(com.google.guava:guava)", "mvn(org.slf4j:slf4j-api)"])
+        self.assertEqual(remove_plugins, [])
+
+    def test_pre_resolve_with_index(self):
+        index = PackageIndex(os.path.join(self.tmp.name, "packages.db"))
+        conn = index.connect()
+        conn.execute("INSERT INTO packages (id, repo, name) VALUES (1, 'r', 'guava'), (2, 'r', 'junit'), "
+                     "(3, 'r', 'build-helper-maven-plugin')")
+        conn.execute("INSERT INTO provides (name, package) VALUES ('mvn(com.google.guava:guava)', 1), "
+                     "('mvn(junit:junit)', 2), ('mvn(org.codehaus.mojo:build-helper-maven-plugin)', 3)")
+        requires, remove_plugins = pre_resolve(self.reactor, index)
+        index.close()
+        self.assertEqual(requires, ["mvn(com.google.guava:guava)", "mvn(junit:junit)",
+                                    "mvn(org.codehaus.mojo:build-helper-maven-plugin)"])
+        # 只删除索引确认不存在的插件，生命周期插件不删除
+        self.assertEqual(remove_plugins, ["maven-enforcer-plugin"])
+
+    def test_parallel_read(self):
+        paths = ["pom.xml", "core/pom.xml", "app/pom.xml", "missing/pom.xml"]
+        for i in range(40):
+            os.makedirs(os.path.join(self.root, f"m{i}"))
+            with open(os.path.join(self.root, f"m{i}", "pom.xml"), "w") as f:
+                f.write(f"<project><artifactId>m{i}</artifactId></project>")
+            paths.append(f"m{i}/pom.xml")
+        reactor = PomReactor(self.root, paths=paths, workers=2)
+        self.assertEqual(len(reactor.models), 43)
+        self.assertEqual(reactor.models["m39/pom.xml"].artifact_id, "m39")
+        self.assertEqual(reactor.models["pom.xml"].properties, {"guava.version": "32.0", "junit.group": "junit"})
+        self.assertEqual(reactor.models["pom.xml"].modules, ["core", "app"])
+        self.assertEqual(reactor.models["core/pom.xml"].parent, ("org.demo", "demo-parent", "1.0", "../pom.xml"))
+
+    def test_property_resolver(self):
+        parent = PropertyResolver({"lib.version": "${major}.${minor}", "major": "1", "minor": "0",
+                                   "a": "${b}", "b": "${a}"})
+        child = PropertyResolver({"minor": "2", "revision": "3.0"}, parent, {"project.version": "${revision}"})
+        # 父pom中定义的属性在子模块的作用域中解析
+        self.assertEqual(parent.interpolate("${lib.version}"), "1.0")
+        self.assertEqual(child.interpolate("${lib.version}/${lib.version}"), "1.2/1.2")
+        self.assertEqual(child.interpolate("${project.version}-${unknown}"), "3.0-${unknown}")
+        self.assertEqual(child.cache["lib.version"], "1.2")
+        # 循环引用保持原样
+        self.assertEqual(child.interpolate("${a}"), "${a}")
+
+    def test_reactor_resolver(self):
+        with open(os.path.join(self.root, "core", "pom.xml"), "w") as f:
+            f.write(core_pom.replace("<artifactId>demo-core</artifactId>", "<artifactId>demo-core</artifactId>"
+                                     "<properties><guava.version>33.0</guava.version></properties>"))
+        reactor = PomReactor(self.root)
+        core = reactor.models["core/pom.xml"]
+        self.assertIs(reactor.resolver(core).parent, reactor.resolver(reactor.models["pom.xml"]))
+        deps = {dep["artifactId"]: dep["version"] for dep in reactor.dependencies(core)}
+        self.assertEqual(deps["guava"], "33.0")
+        self.assertEqual(reactor.resolver(core).interpolate("${project.groupId}:${project.version}"), "org.demo:1.0")
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from src.config.config import BuildConfig
+from src.core.source_index import SourceIndex
+from src.parse.static_requires import StaticRequires, scan_static_requires
+from src.utils.package_index import PackageIndex
+
+cmake_lists = """
+cmake_minimum_required(VERSION 3.10)
+find_package(ZLIB REQUIRED)
+find_package(Doxygen)  # find_package(Unused REQUIRED)
+find_package(Qt5 5.15 REQUIRED COMPONENTS Core Widgets)
+find_package(${DEP} REQUIRED)
+pkg_check_modules(GLIB REQUIRED IMPORTED_TARGET glib-2.0>=2.56 gio-2.0)
+"""
+
+configure_ac = """
+PKG_CHECK_MODULES([XML], [libxml-2.0 >= 2.9])
+PKG_CHECK_MODULES([SSL], [openssl], [have_ssl=yes], [have_ssl=no])
+AC_CHECK_LIB([z], [inflate], [], [AC_MSG_ERROR([zlib is required])])
+AC_CHECK_HEADERS([zlib.h], [], [AC_MSG_ERROR([zlib.h not found])])
+dnl PKG_CHECK_MODULES([OLD], [old])
+"""
+
+meson_build = """
+glib = dependency('glib-2.0', version: '>= 2.56')
+threads = dependency('threads')
+gtk = dependency('gtk+-3.0', required: get_option('gui'))
+flex = find_program('flex')
+"""
+
+
+class TestStaticRequires(unittest.TestCase):
+    def setUp(self):
+        self.config = BuildConfig()
+        self.config.cmake_modules = {"ZLIB": "zlib-devel"}
+        self.config.failed_commands = {"flex": "flex"}
+
+    def test_cmake(self):
+        scanner = StaticRequires(self.config)
+        scanner.scan_cmake(cmake_lists)
+        # 没有索引时无法确认cmake(...)是否存在，只添加映射的包和pkgconfig
+        self.assertEqual(scanner.requires, ["zlib-devel", "pkgconfig(glib-2.0)", "pkgconfig(gio-2.0)"])
+        with tempfile.TemporaryDirectory() as tmp:
+            index = PackageIndex(os.path.join(tmp, "packages.db"))
+            conn = index.connect()
+            conn.execute("INSERT INTO packages (id, repo, name) VALUES (1, 'r', 'qt5-qtbase-devel')")
+            conn.execute("INSERT INTO provides (name, package) VALUES ('cmake(Qt5Core)', 1), ('cmake(Qt5Widgets)', 1)")
+            scanner = StaticRequires(self.config, index)
+            scanner.scan_cmake(cmake_lists)
+            index.close()
+        self.assertEqual(scanner.requires, ["zlib-devel", "cmake(Qt5Core)", "cmake(Qt5Widgets)"])
+
+    def test_configure_ac_with_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = PackageIndex(os.path.join(tmp, "packages.db"))
+            conn = index.connect()
+            conn.execute("INSERT INTO packages (id, repo, name) VALUES (1, 'r', 'zlib-devel'), (2, 'r', 'libxml2-devel')")
+            conn.execute("INSERT INTO files (path, package) VALUES ('/usr/lib64/libz.so', 1), "
+                         "('/usr/include/zlib.h', 1)")
+            conn.execute("INSERT INTO packages (id, repo, name) VALUES (3, 'r', 'openssl-devel')")
+            conn.execute("INSERT INTO provides (name, package) VALUES ('pkgconfig(libxml-2.0)', 2), "
+                         "('pkgconfig(openssl)', 3)")
+            scanner = StaticRequires(self.config, index)
+            scanner.scan_configure_ac(configure_ac)
+            # 可选的pkgconfig(openssl)即使在索引中存在也不添加
+            self.assertEqual(scanner.requires, ["pkgconfig(libxml-2.0)", "zlib-devel"])
+            self.config.static_requires_optional = True
+            scanner = StaticRequires(self.config, index)
+            scanner.scan_configure_ac(configure_ac)
+            self.assertEqual(scanner.requires, ["pkgconfig(libxml-2.0)", "pkgconfig(openssl)", "zlib-devel"])
+            self.config.static_requires_optional = False
+            index.close()
+        scanner = StaticRequires(self.config)
+        scanner.scan_configure_ac(configure_ac)
+        self.assertEqual(scanner.requires, ["pkgconfig(libxml-2.0)"])
+
+    def test_meson_from_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "meson.build"), "w") as f:
+                f.write(meson_build)
+            index = SourceIndex(tmp, ["meson.build"])
+            self.assertEqual(scan_static_requires("meson", index, self.config), ["pkgconfig(glib-2.0)", "flex"])
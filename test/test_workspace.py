@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from src.builder.workspace import WorkspaceProvider, trash_prefix
+
+
+class TestWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "demo-1.0")
+        os.makedirs(os.path.join(self.source, "src"))
+        with open(os.path.join(self.source, "configure"), "w") as f:
+            f.write("#!/bin/sh\necho ok\n")
+        os.chmod(os.path.join(self.source, "configure"), 0o755)
+        with open(os.path.join(self.source, "src", "main.c"), "w") as f:
+            f.write("int main() { return 0; }\n")
+        os.symlink("src/main.c", os.path.join(self.source, "main.c"))
+        self.target = os.path.join(self.tmp.name, "workspace")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_rounds(self, method):
+        provider = WorkspaceProvider(self.source, self.target, method=method, workers=2)
+        provider.prepare()
+        with open(os.path.join(self.target, "src", "main.c"), "a") as f:
+            f.write("broken\n")
+        with open(os.path.join(self.target, "config.status"), "w") as f:
+            f.write("generated\n")
+        provider.prepare()
+        provider.release()
+        with open(os.path.join(self.target, "src", "main.c"), "r") as f:
+            self.assertEqual(f.read(), "int main() { return 0; }\n")
+        self.assertFalse(os.path.exists(os.path.join(self.target, "config.status")))
+        self.assertEqual(os.readlink(os.path.join(self.target, "main.c")), "src/main.c")
+        self.assertTrue(os.access(os.path.join(self.target, "configure"), os.X_OK))
+        with open(os.path.join(self.source, "src", "main.c"), "r") as f:
+            self.assertEqual(f.read(), "int main() { return 0; }\n")
+
+    def test_copy(self):
+        self.check_rounds("copy")
+
+    def test_reflink_falls_back(self):
+        self.check_rounds("reflink")
+
+    def test_old_workspace_removed(self):
+        provider = WorkspaceProvider(self.source, self.target, method="copy")
+        provider.prepare()
+        provider.prepare()
+        provider.release()
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["demo-1.0", "workspace"])
+
+    def test_stale_trash_removed(self):
+        # 上一个进程退出时没有删完的目录
+        stale = os.path.join(self.tmp.name, trash_prefix + "old")
+        os.makedirs(os.path.join(stale, "src"))
+        with open(os.path.join(stale, "src", "main.o"), "w") as f:
+            f.write("object\n")
+        provider = WorkspaceProvider(self.source, self.target, method="copy")
+        provider.prepare()
+        provider.release()
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["demo-1.0", "workspace"])
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+from src.utils import yaml_loader
+from src.utils.yaml_loader import load_template
+
+
+class TestYamlLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cmake.yaml")
+        with open(self.path, "w") as f:
+            f.write("buildSystem: cmake\nbuildRequires:\n- cmake\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        yaml_loader.clear_cache()
+
+    def test_copies_are_independent(self):
+        first = load_template(self.tmp.name, "cmake")
+        first["buildRequires"].append("gcc")
+        second = load_template(self.tmp.name, "cmake")
+        self.assertEqual(second, {"buildSystem": "cmake", "buildRequires": ["cmake"]})
+        self.assertIn(os.path.abspath(self.path), yaml_loader._cache)
+
+    def test_reload_after_change(self):
+        load_template(self.tmp.name, "cmake")
+        with open(self.path, "w") as f:
+            f.write("buildSystem: cmake\nbuildRequires:\n- cmake\n- ninja-build\n")
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        self.assertEqual(load_template(self.tmp.name, "cmake")["buildRequires"], ["cmake", "ninja-build"])